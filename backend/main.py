@@ -1,16 +1,24 @@
 # main.py
 # main.py
-from flask import Flask, request, jsonify, send_from_directory
+import time
+_startup_started = time.perf_counter() # For the import-time budget in /api/startup-report
+from flask import Flask, Response, request, jsonify, send_from_directory
 from flask_cors import CORS
+import io
 import json
 import os
 import sqlite3
+import threading
 import pandas as pd
 from datetime import datetime # Import the datetime object specifically
 from apscheduler.schedulers.background import BackgroundScheduler
 
 # --- Import your logic functions ---
-from models.classification import predict_water_quality, features as classification_features
+from models.classification import predict_water_quality_coalesced, predict_water_quality_batch, predict_water_quality_frame, features as classification_features
+from models.classification import warmup as warmup_classifier, get_load_report as get_classifier_load_report, get_memo_stats
+from models.classification import ensure_loaded as ensure_classifier_loaded
+from models import classification
+from models.artifacts import load_artifact, variant_etag, COMPRESSED_VARIANTS
 # from update_pipeline import fetch_and_update_data
 
 # --- (NEW) Define Absolute Path for Backend Directory ---
@@ -19,6 +27,7 @@ BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
 # --- CONFIGURATION (Using Absolute Paths) ---
 DB_PATH = os.path.join(BACKEND_DIR, "database/water_quality.db")
 TABLE_NAME = "water_records"
+LATEST_TABLE_NAME = "station_latest" # Maintained by update_pipeline (see models/measurement_store.py)
 LOCATIONS_CSV_PATH = os.path.join(BACKEND_DIR, "data/cpcb_station_locations.csv")
 # --- (MODIFIED) Use BACKEND_DIR to make STATIC_DIR absolute ---
 STATIC_DIR = os.path.join(BACKEND_DIR, "static")
@@ -32,15 +41,92 @@ WEEKLY_DETAILS_DIR = os.path.join(STATIC_DIR, "predictions/weekly_details")
 DAILY_SUMMARY_PATH = os.path.join(STATIC_DIR, "predictions/daily_summary_predictions.json")
 WEEKLY_SUMMARY_PATH = os.path.join(STATIC_DIR, "predictions/weekly_summary_predictions.json")
 
+# /api/classify/batch: rows per forward pass, and the largest accepted upload
+CLASSIFY_BATCH_CHUNK_SIZE = int(os.environ.get("CLASSIFY_BATCH_CHUNK_SIZE", 2048))
+CLASSIFY_BATCH_MAX_ROWS = int(os.environ.get("CLASSIFY_BATCH_MAX_ROWS", 100000))
+CSV_MIMETYPES = ('text/csv', 'application/csv')
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl', 'application/x-jsonlines')
+
+# Classifier loading: "background" (default) loads it in a thread at startup,
+# "eager" blocks startup until it is loaded, "lazy" waits for the first request
+CLASSIFIER_WARMUP = os.environ.get("CLASSIFIER_WARMUP", "background")
+
 # --- FLASK APP SETUP ---
 # Use the absolute STATIC_DIR path for static_folder
 app = Flask(__name__, static_folder=STATIC_DIR)
 CORS(app)
 
-# --- Endpoint to get Station List ---
-@app.route('/api/stations', methods=['GET'])
-def get_stations():
-    # ... (Keep the existing get_stations function code - it's okay) ...
+IMPORT_SECONDS = round(time.perf_counter() - _startup_started, 3)
+print(f"✅ App imported in {IMPORT_SECONDS:.2f}s (classifier: {CLASSIFIER_WARMUP} load).")
+if CLASSIFIER_WARMUP == "eager":
+    warmup_classifier()
+elif CLASSIFIER_WARMUP == "background":
+    warmup_classifier(background=True)
+
+# --- LATEST SNAPSHOT CACHE ---
+# /api/stations and /api/latest-cpcb-data only change when the update pipeline
+# writes to the database, so their merged payloads are built once per data
+# version (DB + locations CSV file stamps, plus the classifier's model version,
+# since /api/stations includes each station's class) and reused by every poll until then.
+_snapshot_cache = {}
+_snapshot_lock = threading.Lock()
+
+def get_data_version():
+    """
+    Returns a marker that changes whenever the database or locations CSV is
+    rewritten, or a different classification model is loaded.
+    """
+    version = []
+    for path in (DB_PATH, LOCATIONS_CSV_PATH):
+        try:
+            st = os.stat(path)
+            version.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            version.append(None)
+    version.append(classification.model_version)
+    return tuple(version)
+
+def get_cached_snapshot(name, builder):
+    """
+    Returns (payload, status) for a snapshot, rebuilding it with builder()
+    only when the data version has changed. builder() returns (payload, status)
+    or (payload, status, cacheable); error and non-cacheable results are not cached.
+    """
+    version = get_data_version()
+    cached = _snapshot_cache.get(name)
+    if cached is not None and cached[0] == version:
+        return cached[1], 200
+    with _snapshot_lock:
+        cached = _snapshot_cache.get(name)
+        if cached is not None and cached[0] == version:
+            return cached[1], 200
+        payload, status, *cacheable = builder()
+        if status == 200 and all(cacheable):
+            _snapshot_cache[name] = (version, payload)
+        return payload, status
+
+def read_latest_records(con):
+    """
+    Returns the latest record for each station. Reads the station_latest table
+    kept by the update pipeline; falls back to the MAX(timestampDate) self-join
+    on databases that have not been migrated yet.
+    """
+    try:
+        return pd.read_sql_query(f"SELECT * FROM {LATEST_TABLE_NAME}", con)
+    except Exception:
+        # Query to get the row with the maximum timestampDate for each stationId
+        query = f"""
+        SELECT t1.*
+        FROM {TABLE_NAME} t1
+        INNER JOIN (
+            SELECT stationId, MAX(timestampDate) as MaxTimestamp
+            FROM {TABLE_NAME}
+            GROUP BY stationId
+        ) t2 ON t1.stationId = t2.stationId AND t1.timestampDate = t2.MaxTimestamp
+        """
+        return pd.read_sql_query(query, con)
+
+def build_stations_snapshot():
     try:
         locations_df = pd.read_csv(LOCATIONS_CSV_PATH)
         locations_df = locations_df[['station_id', 'station_name', 'latitude', 'longitude', 'state']].rename(columns={
@@ -49,50 +135,153 @@ def get_stations():
         locations_df['stationId'] = locations_df['stationId'].astype(int)
     except Exception as e:
         print(f"🔴 ERROR loading locations CSV '{LOCATIONS_CSV_PATH}': {e}")
-        return jsonify({"error": "Failed to load station location data."}), 500
+        return {"error": "Failed to load station location data."}, 500
+    con = None
     try:
         con = sqlite3.connect(DB_PATH)
-        query = f"""
-        SELECT t1.* FROM {TABLE_NAME} t1 INNER JOIN (SELECT stationId, MAX(timestampDate) as MaxTimestamp FROM {TABLE_NAME} GROUP BY stationId) t2
-        ON t1.stationId = t2.stationId AND t1.timestampDate = t2.MaxTimestamp
-        """
-        latest_df = pd.read_sql_query(query, con)
+        latest_df = read_latest_records(con)
         latest_df['stationId'] = latest_df['stationId'].astype(int)
     except Exception as e:
         print(f"🔴 ERROR fetching latest station data: {e}")
-        return jsonify({"error": "Failed to fetch station data."}), 500
+        return {"error": "Failed to fetch station data."}, 500
     finally:
-        con.close()
+        if con is not None:
+            con.close()
     if latest_df.empty:
         print("🟡 WARNING: No recent station data found.")
         locations_df['quality'] = 'Medium'
-        return jsonify(locations_df.to_dict('records'))
+        return locations_df.to_dict('records'), 200
+    # Classify every station's latest reading in one batched model call.
+    # Without a loaded model every station falls back to 'Medium'; that is served but not
+    # cached, so the real classes appear as soon as the model loads.
+    model_loaded = ensure_classifier_loaded()
+    input_records = latest_df.reindex(columns=classification_features).fillna(0).to_dict('records')
+    quality_results = predict_water_quality_batch(input_records)
     classified_qualities = {}
-    for index, row in latest_df.iterrows():
-        station_id = int(row['stationId'])
-        input_data = {feat: row.get(feat, 0) if pd.notna(row.get(feat)) else 0 for feat in classification_features}
-        quality_result = predict_water_quality(input_data)
+    for station_id, quality_result in zip(latest_df['stationId'].astype(int), quality_results):
         classified_qualities[station_id] = quality_result['class'] if quality_result['status'] == 'success' else 'Medium'
         if quality_result['status'] != 'success': print(f"⚠️ Failed classify {station_id}: {quality_result.get('message')}")
     locations_df['quality'] = locations_df['stationId'].map(classified_qualities).fillna('Medium')
     final_station_list = locations_df[locations_df['stationId'].isin(latest_df['stationId'].unique())].to_dict('records')
     if final_station_list: print(f"\n--- DEBUG Stations: First item: {final_station_list[0]} ---\n")
     else: print("\n--- DEBUG Stations: final_station_list is empty! ---\n")
-    return jsonify(final_station_list)
+    return final_station_list, 200, model_loaded
+
+# --- Endpoint to get Station List ---
+@app.route('/api/stations', methods=['GET'])
+def get_stations():
+    payload, status = get_cached_snapshot('stations', build_stations_snapshot)
+    return jsonify(payload), status
 
 
 # --- LIVE PREDICTION API ---
 @app.route('/api/classify', methods=['POST'])
 def handle_classification():
     user_input = request.json
-    result = predict_water_quality(user_input)
+    result = predict_water_quality_coalesced(user_input) # Batched with concurrent requests
     if result['status'] == 'error':
         print(f"🔴 ERROR IN /api/classify: {result.get('message', 'Unknown error')}")
         return jsonify(result), 400
     return jsonify(result)
 
+def read_classify_batch_body():
+    """
+    Parses a bulk classification body into a DataFrame (one row per sample):
+    a JSON array of objects (or {"records": [...]}), CSV with a header row,
+    or NDJSON. Raises ValueError for anything else.
+    """
+    mimetype = request.mimetype
+    if mimetype in CSV_MIMETYPES:
+        return pd.read_csv(io.BytesIO(request.get_data()))
+    if mimetype in NDJSON_MIMETYPES:
+        body = request.get_data()
+        return pd.read_json(io.BytesIO(body), lines=True) if body.strip() else pd.DataFrame()
+
+    payload = request.get_json(silent=True)
+    if isinstance(payload, dict):
+        payload = payload.get('records')
+    if not isinstance(payload, list) or not all(isinstance(item, dict) for item in payload):
+        raise ValueError("Expected a JSON array of objects, {\"records\": [...]}, CSV or NDJSON.")
+    return pd.DataFrame.from_records(payload)
+
+
+@app.route('/api/classify/batch', methods=['POST'])
+def handle_batch_classification():
+    """
+    Classifies many samples in one request. Rows are validated and scored in
+    chunks of CLASSIFY_BATCH_CHUNK_SIZE, and results are streamed back as they
+    are ready, in input order, each with its row "index". The response is a
+    JSON array, or NDJSON with ?format=ndjson (or Accept: application/x-ndjson).
+    """
+    try:
+        samples_df = read_classify_batch_body()
+    except Exception as e:
+        return jsonify({"status": "error", "message": f"Could not parse request body: {e}"}), 400
+
+    n_rows = len(samples_df)
+    if n_rows == 0:
+        return jsonify({"status": "error", "message": "No samples in request body."}), 400
+    if n_rows > CLASSIFY_BATCH_MAX_ROWS:
+        return jsonify({"status": "error", "message": f"Too many samples ({n_rows}); the limit is {CLASSIFY_BATCH_MAX_ROWS}."}), 413
+
+    ndjson = (request.args.get('format') == 'ndjson'
+              or request.accept_mimetypes.best_match(['application/json', 'application/x-ndjson']) == 'application/x-ndjson')
+
+    def generate():
+        if not ndjson:
+            yield '['
+        for start in range(0, n_rows, CLASSIFY_BATCH_CHUNK_SIZE):
+            chunk_results = predict_water_quality_frame(samples_df.iloc[start:start + CLASSIFY_BATCH_CHUNK_SIZE])
+            lines = [json.dumps(dict(result, index=start + offset)) for offset, result in enumerate(chunk_results)]
+            if ndjson:
+                yield '\n'.join(lines) + '\n'
+            else:
+                yield (',' if start else '') + ','.join(lines)
+        if not ndjson:
+            yield ']'
+
+    response = Response(generate(), mimetype='application/x-ndjson' if ndjson else 'application/json')
+    response.headers['X-Total-Rows'] = str(n_rows)
+    return response
+
+@app.route('/api/classify/stats', methods=['GET'])
+def get_classification_stats():
+    """Hit/miss counters of the classification result memo."""
+    return jsonify(get_memo_stats())
+
 # --- PRE-GENERATED PLOT APIs ---
 
+def serve_artifact(path, not_found_message):
+    """
+    Serves a batch-generated JSON artifact as stored bytes (no re-parsing),
+    using a precomputed compressed variant when the client accepts it and
+    answering 304 when the client's ETag still matches.
+    """
+    try:
+        artifact = load_artifact(path)
+    except FileNotFoundError:
+        return jsonify({"error": not_found_message}), 404
+    except Exception as e:
+        return jsonify({"error": f"Read error: {e}"}), 500
+
+    body, encoding = artifact['data'], None
+    for candidate, _ in COMPRESSED_VARIANTS:
+        if candidate in artifact['variants'] and request.accept_encodings[candidate]:
+            body, encoding = artifact['variants'][candidate], candidate
+            break
+    etag = variant_etag(artifact['etag'], encoding)
+
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype='application/json')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+    response.set_etag(etag)
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = 'no-cache' # Always revalidate; 304 keeps it cheap
+    return response
+
 # --- (MODIFIED) Daily Prediction Endpoint with Debug Prints ---
 @app.route('/api/predictions/daily/<station_id>', methods=['GET'])
 def get_daily_prediction(station_id):
@@ -100,77 +289,49 @@ def get_daily_prediction(station_id):
     Fetches the pre-generated daily prediction JSON for a station.
     """
     plot_path = os.path.join(DAILY_PRED_DIR, f"daily_pred_station_{station_id}.json")
-    if not os.path.exists(plot_path):
-        return jsonify({"error": "Prediction plot not found for this station."}), 404
-    
-    try:
-        with open(plot_path, 'r') as f:
-            return json.load(f)
-    except Exception as e:
-        return jsonify({"error": f"Failed to read plot file: {e}"}), 500
+    return serve_artifact(plot_path, "Prediction plot not found for this station.")
 # --- (END MODIFIED) ---
 
 @app.route('/api/predictions/weekly/<station_id>', methods=['GET'])
 def get_weekly_prediction(station_id):
     filename = f"weekly_pred_station_{station_id}.json"
-    plot_path = os.path.join(WEEKLY_PRED_DIR, filename)
-    abs_plot_path = os.path.abspath(plot_path) # Use absolute path
+    abs_plot_path = os.path.abspath(os.path.join(WEEKLY_PRED_DIR, filename)) # Use absolute path
     print(f"DEBUG Weekly: Checking for {abs_plot_path}")
-    if not os.path.exists(abs_plot_path): return jsonify({"error": "Plot not found."}), 404
-    try:
-        with open(abs_plot_path, 'r') as f: return json.load(f)
-    except Exception as e: return jsonify({"error": f"Read error: {e}"}), 500
+    return serve_artifact(abs_plot_path, "Plot not found.")
 
 @app.route('/api/predictions/weekly_details/<station_id>', methods=['GET'])
 def get_weekly_details(station_id):
     filename = f"weekly_details_station_{station_id}.json"
-    plot_path = os.path.join(WEEKLY_DETAILS_DIR, filename)
-    abs_plot_path = os.path.abspath(plot_path) # Use absolute path
+    abs_plot_path = os.path.abspath(os.path.join(WEEKLY_DETAILS_DIR, filename)) # Use absolute path
     print(f"DEBUG Weekly Details: Checking for {abs_plot_path}")
-    if not os.path.exists(abs_plot_path): return jsonify({"error": "Details not found."}), 404
-    try:
-        with open(abs_plot_path, 'r') as f: return json.load(f)
-    except Exception as e: return jsonify({"error": f"Read error: {e}"}), 500
+    return serve_artifact(abs_plot_path, "Details not found.")
 
 @app.route('/api/predictions/summary/daily', methods=['GET'])
 def get_daily_summary():
     abs_path = os.path.abspath(DAILY_SUMMARY_PATH) # Use absolute path
     print(f"DEBUG Daily Summary: Checking for {abs_path}")
-    if not os.path.exists(abs_path): return jsonify({"error": "File not found."}), 404
-    try:
-        with open(abs_path, 'r') as f: return json.load(f)
-    except Exception as e: return jsonify({"error": f"Read error: {e}"}), 500
+    return serve_artifact(abs_path, "File not found.")
 
 @app.route('/api/predictions/summary/weekly', methods=['GET'])
 def get_weekly_summary():
     abs_path = os.path.abspath(WEEKLY_SUMMARY_PATH) # Use absolute path
     print(f"DEBUG Weekly Summary: Checking for {abs_path}")
-    if not os.path.exists(abs_path): return jsonify({"error": "File not found."}), 404
-    try:
-        with open(abs_path, 'r') as f: return json.load(f)
-    except Exception as e: return jsonify({"error": f"Read error: {e}"}), 500
+    return serve_artifact(abs_path, "File not found.")
 
 @app.route('/api/anomaly-heatmap', methods=['GET'])
 def get_anomaly_map():
     abs_path = os.path.abspath(ANOMALY_PLOT_PATH) # Use absolute path
     print(f"DEBUG Anomaly Heatmap: Checking for {abs_path}")
-    if not os.path.exists(abs_path): return jsonify({"error": "File not found."}), 404
-    try:
-        with open(abs_path, 'r') as f: return json.load(f)
-    except Exception as e: return jsonify({"error": f"Read error: {e}"}), 500
+    return serve_artifact(abs_path, "File not found.")
 
 @app.route('/api/correlation/<station_id>', methods=['GET'])
 def get_correlation_plot(station_id):
     method = request.args.get('method', 'spearman').lower()
     if method not in ['pearson', 'spearman', 'kendall']: method = 'spearman'
     filename = f"correlation_station_{station_id}_{method}.json"
-    plot_path = os.path.join(CORRELATION_DIR, filename)
-    abs_plot_path = os.path.abspath(plot_path) # Use absolute path
+    abs_plot_path = os.path.abspath(os.path.join(CORRELATION_DIR, filename)) # Use absolute path
     print(f"DEBUG Correlation ({method}): Checking for {abs_plot_path}")
-    if not os.path.exists(abs_plot_path): return jsonify({"error": f"Plot ({method}) not found."}), 404
-    try:
-        with open(abs_plot_path, 'r') as f: return json.load(f)
-    except Exception as e: return jsonify({"error": f"Read error: {e}"}), 500
+    return serve_artifact(abs_plot_path, f"Plot ({method}) not found.")
 
 # --- STATIC FILE ENDPOINTS ---
 @app.route('/api/daynight/list', methods=['GET'])
@@ -190,17 +351,13 @@ def list_daynight_plots():
         return jsonify({"error": f"Failed to list files: {e}"}), 500
 
 # --- (MODIFIED) Endpoint to Read Latest Records from Database ---
-@app.route('/api/latest-cpcb-data', methods=['GET'])
-def get_latest_db_data():
+def build_latest_records_snapshot():
     """
-    Reads the latest record for each station directly from the database,
-    merges with location info, and returns the data.
+    Reads the latest record for each station directly from the database
+    and merges it with location info.
     """
-    print("DEBUG: Request received for latest DB data...")
-
-    # --- 1. Load Location Data from CSV (Cached or loaded fresh) ---
+    # --- 1. Load Location Data from CSV ---
     try:
-        # Consider caching this if performance is an issue
         locations_df = pd.read_csv(LOCATIONS_CSV_PATH)
         locations_df = locations_df[['station_id', 'station_name', 'state']].rename(columns={
             'station_id': 'stationId',
@@ -210,47 +367,36 @@ def get_latest_db_data():
         locations_df['stationId'] = locations_df['stationId'].astype(int)
     except Exception as e:
         print(f"🔴 ERROR loading locations CSV '{LOCATIONS_CSV_PATH}': {e}")
-        return jsonify({"error": "Failed to load station location reference data."}), 500
+        return {"error": "Failed to load station location reference data."}, 500
 
     # --- 2. Query Latest Record per Station from DB ---
+    con = None
     try:
         con = sqlite3.connect(DB_PATH)
-        # Query to get the row with the maximum timestampDate for each stationId
-        query = f"""
-        SELECT t1.*
-        FROM {TABLE_NAME} t1
-        INNER JOIN (
-            SELECT stationId, MAX(timestampDate) as MaxTimestamp
-            FROM {TABLE_NAME}
-            GROUP BY stationId
-        ) t2 ON t1.stationId = t2.stationId AND t1.timestampDate = t2.MaxTimestamp
-        """
-        latest_records_df = pd.read_sql_query(query, con)
+        latest_records_df = read_latest_records(con)
         # Ensure stationId is integer for joining
         latest_records_df['stationId'] = latest_records_df['stationId'].astype(int)
         # Convert timestampDate to string for JSON compatibility if it's not already
         if 'timestampDate' in latest_records_df.columns:
              latest_records_df['timestamp'] = pd.to_datetime(latest_records_df['timestampDate']).dt.strftime('%Y-%m-%d %H:%M:%S')
-             # Drop the original if needed, or keep both
-             # latest_records_df = latest_records_df.drop(columns=['timestampDate'])
 
     except Exception as e:
         print(f"🔴 ERROR fetching latest station data from DB: {e}")
-        return jsonify({"error": "Failed to fetch latest data from database."}), 500
+        return {"error": "Failed to fetch latest data from database."}, 500
     finally:
-        con.close()
+        if con is not None:
+            con.close()
 
     if latest_records_df.empty:
         print("🟡 WARNING: No records found in the database.")
-        return jsonify({"data": [], "last_fetched": datetime.now().isoformat()})
+        return [], 200
 
     # --- 3. Merge DB Data with Location Data ---
     try:
         # Merge based on stationId, keeping only records present in the DB
         merged_df = pd.merge(latest_records_df, locations_df, on='stationId', how='left')
 
-        # Select and potentially reorder columns for the final output
-        # Define desired columns (adjust based on actual columns in your DB + CSV)
+        # Select and reorder columns for the final output
         desired_columns = ['stationId', 'stationName', 'location', 'timestamp']
         # Add parameter columns dynamically (all columns except known non-parameter ones)
         non_param_cols = ['stationId', 'stationName', 'location', 'timestamp', 'timestampDate', 'id'] # Add any other meta cols
@@ -262,21 +408,41 @@ def get_latest_db_data():
         final_df = merged_df[final_columns_present]
 
         # Convert DataFrame to list of dictionaries
-        data_list = final_df.to_dict('records')
-
-        fetch_time = datetime.now().isoformat()
-        print(f"DEBUG: Returning {len(data_list)} latest records from DB. Fetch time: {fetch_time}")
-
-        return jsonify({
-            "data": data_list,
-            "last_fetched": fetch_time # Use current time as fetch time
-        })
+        return final_df.to_dict('records'), 200
 
     except Exception as e:
         print(f"🔴 ERROR merging or formatting data: {e}")
-        return jsonify({"error": f"Failed to process data: {e}"}), 500
+        return {"error": f"Failed to process data: {e}"}, 500
+
+@app.route('/api/latest-cpcb-data', methods=['GET'])
+def get_latest_db_data():
+    """
+    Returns the latest record for each station, merged with location info.
+    The merged records are cached until the database is next written.
+    """
+    print("DEBUG: Request received for latest DB data...")
+    data_list, status = get_cached_snapshot('latest_records', build_latest_records_snapshot)
+    if status != 200:
+        return jsonify(data_list), status
+
+    fetch_time = datetime.now().isoformat()
+    print(f"DEBUG: Returning {len(data_list)} latest records from DB. Fetch time: {fetch_time}")
+    return jsonify({
+        "data": data_list,
+        "last_fetched": fetch_time # Use current time as fetch time
+    })
     
 
+@app.route('/api/startup-report', methods=['GET'])
+def get_startup_report():
+    """Import-time budget of this worker and the classifier's lazy loading steps."""
+    return jsonify({
+        "import_seconds": IMPORT_SECONDS,
+        "classifier_warmup": CLASSIFIER_WARMUP,
+        "classifier": get_classifier_load_report()
+    })
+
+
 # --- START THE SCHEDULER & APP ---
 if __name__ == '__main__':
     abs_locations_path = os.path.abspath(LOCATIONS_CSV_PATH) # Use absolute path
@@ -1,7 +1,6 @@
 # models/anomaly_detection.py
 import pandas as pd
 import numpy as np
-import sqlite3
 from keras.models import Sequential
 from keras.layers import LSTM, RepeatVector, TimeDistributed, Dense
 from sklearn.preprocessing import MinMaxScaler
@@ -9,6 +8,9 @@ import plotly.graph_objects as go
 import json
 import os
 import warnings
+from models.artifacts import write_compressed_variants
+from models.data_access import load_water_records, get_parameter_columns, iter_station_slices
+from models.incremental import run_incremental_per_station
 
 # Suppress TensorFlow warnings
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'
@@ -24,8 +26,72 @@ DB_PATH = os.path.join(BACKEND_DIR, "database/water_quality.db")
 TABLE_NAME = "water_records"
 OUTPUT_JSON = os.path.join(BACKEND_DIR, "static/anomaly/anomaly_heatmap.json")
 WINDOW_SIZE = 30 # How many hours to look at for one anomaly
+JOB_VERSION = "1" # Bump to retrain every station after changing the model or threshold
 
-def run_anomaly_detection():
+def create_sequences(data, window_size):
+    return np.array([data[i:i + window_size] for i in range(len(data) - window_size)])
+
+def detect_station_anomalies(station, station_slice, params):
+    """
+    Trains the LSTM Autoencoder on one station's readings and returns its
+    anomalies as a list of {stationId, timestamp, Parameter} dicts.
+    """
+    print(f"   Processing anomalies for station: {station}...")
+    station_anomalies = []
+    station_df = station_slice.copy()
+
+    if len(station_df) < WINDOW_SIZE * 2:
+        print(f"   ⏭️ Skipping station {station}: not enough data.")
+        return []
+
+    scaler = MinMaxScaler(feature_range=(0, 1))
+    station_df[params] = scaler.fit_transform(station_df[params])
+
+    sequences = create_sequences(station_df[params].values, WINDOW_SIZE)
+    if sequences.shape[0] == 0:
+        print(f"   ⏭️ Skipping station {station}: failed to create sequences.")
+        return []
+
+    X_train = sequences
+
+    # Define and train model
+    model = Sequential([
+        LSTM(64, activation='relu', input_shape=(WINDOW_SIZE, len(params)), return_sequences=False),
+        RepeatVector(WINDOW_SIZE),
+        LSTM(64, activation='relu', return_sequences=True),
+        TimeDistributed(Dense(len(params)))
+    ])
+    model.compile(optimizer='adam', loss='mae')
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        model.fit(X_train, X_train, epochs=20, batch_size=32, verbose=0)
+        X_pred = model.predict(X_train, verbose=0)
+
+    # Calculate reconstruction error
+    mae = np.mean(np.abs(X_pred - X_train), axis=1)
+
+    # Find anomalies
+    threshold = np.quantile(mae, 0.95) # 95th percentile
+
+    for i in range(len(mae)): # Loop through each sequence
+        if mae[i].mean() > threshold: # If the *sequence* is anomalous
+            # Get the timestamp from the end of the sequence
+            anomaly_timestamp = station_df.iloc[i + WINDOW_SIZE - 1]['timestampDate']
+
+            # Find *which parameter* caused the anomaly
+            for param_idx, param in enumerate(params):
+                param_mae = mae[i, param_idx]
+                if param_mae > threshold: # If this specific param is bad
+                    station_anomalies.append({
+                        "stationId": station,
+                        "timestamp": anomaly_timestamp, # Use the parsed datetime
+                        "Parameter": param
+                    })
+
+    return station_anomalies
+
+def run_anomaly_detection(workers=None):
     """
     Trains an LSTM Autoencoder, finds anomalies, and saves a 
     single Plotly heatmap as a JSON file.
@@ -36,92 +102,32 @@ def run_anomaly_detection():
     os.makedirs(os.path.dirname(OUTPUT_JSON), exist_ok=True)
     
     # --- 1. Load and Preprocess Data ---
-    conn = None # Initialize conn
     try:
-        conn = sqlite3.connect(DB_PATH)
-        # Use timestampDate for parsing, as 'timestamp' is the raw string
-        df = pd.read_sql_query(f"SELECT * FROM {TABLE_NAME}", conn) # Read as text
-        df['timestampDate'] = pd.to_datetime(df['timestampDate'], errors='coerce') # Convert manually
+        df = load_water_records(DB_PATH) # Shared, typed frame (read once per run)
     except Exception as e:
         print(f"🔴 ERROR: Could not read from database. {e}")
         return # Exit if data can't be read
-    finally:
-        if conn: # Only close if connection was successful
-            conn.close()
 
-    df = df.dropna(subset=['stationId', 'timestampDate'])
-    
     # Get all numeric parameter columns
-    exclude_cols = ['stationId', 'timestamp', 'timestampDate']
-    params = [c for c in df.columns if c not in exclude_cols and pd.api.types.is_numeric_dtype(df[c])]
+    params = get_parameter_columns(df)
     
     if not params:
         print("🔴 ERROR: No numeric parameters found for anomaly detection.")
         return
 
-    # Use timestampDate for sorting
-    df = df.groupby(['stationId', 'timestampDate'], as_index=False)[params].mean()
-    df = df.sort_values(['stationId', 'timestampDate'])
-
-    def create_sequences(data, window_size):
-        return np.array([data[i:i + window_size] for i in range(len(data) - window_size)])
+    # Average duplicate readings per station/timestamp
+    df = df.groupby(['stationId', 'timestampDate'], as_index=False, observed=True)[params].mean()
 
     all_anomalies = []
-    stations = df['stationId'].unique()
     
     # --- 2. Train Model and Detect Anomalies (Per Station) ---
-    for station in stations:
-        print(f"   Processing anomalies for station: {station}...")
-        station_df = df[df['stationId'] == station].copy()
-        
-        if len(station_df) < WINDOW_SIZE * 2:
-            print(f"   ⏭️ Skipping station {station}: not enough data.")
-            continue
-            
-        scaler = MinMaxScaler(feature_range=(0, 1))
-        station_df[params] = scaler.fit_transform(station_df[params])
-        
-        sequences = create_sequences(station_df[params].values, WINDOW_SIZE)
-        if sequences.shape[0] == 0:
-            print(f"   ⏭️ Skipping station {station}: failed to create sequences.")
-            continue
-        
-        X_train = sequences
-        
-        # Define and train model
-        model = Sequential([
-            LSTM(64, activation='relu', input_shape=(WINDOW_SIZE, len(params)), return_sequences=False),
-            RepeatVector(WINDOW_SIZE),
-            LSTM(64, activation='relu', return_sequences=True),
-            TimeDistributed(Dense(len(params)))
-        ])
-        model.compile(optimizer='adam', loss='mae')
-        
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore")
-            model.fit(X_train, X_train, epochs=20, batch_size=32, verbose=0)
-            X_pred = model.predict(X_train, verbose=0)
-        
-        # Calculate reconstruction error
-        mae = np.mean(np.abs(X_pred - X_train), axis=1)
-        
-        # Find anomalies
-        threshold = np.quantile(mae, 0.95) # 95th percentile
-        
-        for i in range(len(mae)): # Loop through each sequence
-            if mae[i].mean() > threshold: # If the *sequence* is anomalous
-                # Get the timestamp from the end of the sequence
-                anomaly_timestamp = station_df.iloc[i + WINDOW_SIZE - 1]['timestampDate']
-                
-                # Find *which parameter* caused the anomaly
-                for param_idx, param in enumerate(params):
-                    param_mae = mae[i, param_idx]
-                    if param_mae > threshold: # If this specific param is bad
-                        all_anomalies.append({
-                            "stationId": station,
-                            "timestamp": anomaly_timestamp, # Use the parsed datetime
-                            "Parameter": param
-                        })
+    # Stations with unchanged readings reuse the anomalies found on the last run
+    station_slices = iter_station_slices(df, sort_by=['timestampDate'])
+    for station_anomalies in run_incremental_per_station(
+        "anomaly", detect_station_anomalies, station_slices, args=(params,), workers=workers,
+        version=f"{JOB_VERSION}|{WINDOW_SIZE}"
+    ):
+        all_anomalies.extend(station_anomalies or [])
 
     if not all_anomalies:
         print("⚠️ No anomalies found across all stations.")
@@ -130,7 +136,7 @@ def run_anomaly_detection():
     # --- 3. Create Plotly Heatmap ---
     print("   Aggregating anomalies for heatmap...")
     anomaly_df = pd.DataFrame(all_anomalies)
-    anomaly_df['date'] = anomaly_df['timestamp'].dt.strftime('%Y-%m-%d')
+    anomaly_df['date'] = pd.to_datetime(anomaly_df['timestamp']).dt.strftime('%Y-%m-%d') # ISO strings from the manifest
     
     summary_data = anomaly_df.groupby(['stationId', 'Parameter'])['date'].agg(
         Anomaly_Count='count',
@@ -200,6 +206,7 @@ def run_anomaly_detection():
     try:
         with open(OUTPUT_JSON, 'w') as f:
             json.dump(fig_dict, f, indent=2)
+        write_compressed_variants(OUTPUT_JSON)
     except TypeError as e:
         print(f"🔴 ERROR: JSON serialization failed AFTER conversions: {e}")
     except Exception as e:
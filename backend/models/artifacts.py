@@ -0,0 +1,111 @@
+# models/artifacts.py
+import os
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Brotli is optional: without it only gzip variants are written/served
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    brotli = None
+    BROTLI_AVAILABLE = False
+
+# --- CONFIGURATION ---
+ARTIFACT_CACHE_SIZE = 256 # Max number of artifact files kept in memory
+# Content-Encoding -> file suffix of the precomputed variant, in preference order
+COMPRESSED_VARIANTS = [('br', '.br'), ('gzip', '.gz')]
+
+_artifact_cache = OrderedDict()
+_artifact_lock = threading.Lock()
+
+
+def write_compressed_variants(path):
+    """
+    Writes precomputed .gz (and .br, if brotli is installed) copies next to a
+    generated artifact so the API can serve them without compressing per request.
+    """
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+        # mtime=0 keeps the gzip bytes deterministic, so unchanged artifacts stay unchanged
+        with open(path + '.gz', 'wb') as f:
+            f.write(gzip.compress(data, compresslevel=9, mtime=0))
+        if BROTLI_AVAILABLE:
+            with open(path + '.br', 'wb') as f:
+                f.write(brotli.compress(data))
+    except Exception as e:
+        print(f"⚠️ Could not write compressed variants for {path}: {e}")
+
+
+def _decompress(encoding, variant):
+    if encoding == 'gzip':
+        return gzip.decompress(variant)
+    return brotli.decompress(variant) if BROTLI_AVAILABLE else None
+
+
+def _read_fresh_variant(path, encoding, suffix, data):
+    """
+    Reads a precomputed variant only if it decompresses to the current source
+    bytes. File mtimes are not used: after a git checkout they say nothing
+    about which of the two files was written last.
+    """
+    try:
+        with open(path + suffix, 'rb') as f:
+            variant = f.read()
+        return variant if _decompress(encoding, variant) == data else None
+    except Exception: # Missing, unreadable or corrupt variant
+        return None
+
+
+def load_artifact(path):
+    """
+    Returns a dict with the raw bytes, ETag (of the raw bytes; see
+    variant_etag) and compressed variants of an artifact file. Entries are
+    cached (LRU) by (path, mtime, size), so a file rewritten by a batch job
+    is picked up on the next request.
+    Raises FileNotFoundError if the artifact does not exist.
+    """
+    st = os.stat(path)
+    key = (path, st.st_mtime_ns, st.st_size)
+
+    with _artifact_lock:
+        artifact = _artifact_cache.get(key)
+        if artifact is not None:
+            _artifact_cache.move_to_end(key)
+            return artifact
+
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    variants = {}
+    for encoding, suffix in COMPRESSED_VARIANTS:
+        variant = _read_fresh_variant(path, encoding, suffix, data)
+        if variant is not None:
+            variants[encoding] = variant
+    if 'gzip' not in variants:
+        # No precomputed copy: compress once here and keep it with the entry
+        variants['gzip'] = gzip.compress(data, mtime=0)
+
+    artifact = {
+        'data': data,
+        'etag': hashlib.sha1(data).hexdigest(),
+        'variants': variants,
+    }
+
+    with _artifact_lock:
+        # Drop stale entries for the same path before inserting the new one
+        for stale_key in [k for k in _artifact_cache if k[0] == path]:
+            del _artifact_cache[stale_key]
+        _artifact_cache[key] = artifact
+        while len(_artifact_cache) > ARTIFACT_CACHE_SIZE:
+            _artifact_cache.popitem(last=False)
+    return artifact
+
+
+def variant_etag(etag, encoding):
+    """ETag of one representation: the compressed bytes differ, so each encoding gets its own tag."""
+    suffix = dict(COMPRESSED_VARIANTS).get(encoding)
+    return f"{etag}-{suffix.lstrip('.')}" if suffix else etag
@@ -1,51 +1,165 @@
 # models/classification.py
+import time
+_import_started = time.perf_counter()
 import os
 import json
 import joblib
+import queue
+import hashlib
+import threading
 import numpy as np
 import pandas as pd
-from keras.models import load_model
 import warnings
+from collections import OrderedDict
+from models.lstm_engine import load_fresh_npz, dense_stack_forward, file_sha1
 
 # Suppress TensorFlow warnings
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'
 warnings.filterwarnings('ignore', category=UserWarning, module='tensorflow')
 
-# --- PART 1: LOAD PRE-TRAINED MODELS (ONCE) ---
-MODEL_DIR = "models_store/classification" 
-print("Loading classification models...")
+# --- Build Absolute Paths ---
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(SCRIPT_DIR)
 
+# --- CONFIGURATION (Using Absolute Paths) ---
+MODEL_DIR = os.path.join(BACKEND_DIR, "models_store/classification")
+MODEL_PATH = os.path.join(MODEL_DIR, 'classification_model.h5')
+SCALER_PATH = os.path.join(MODEL_DIR, 'classification_scaler.pkl')
+ENCODER_PATH = os.path.join(MODEL_DIR, 'classification_label_encoder.pkl')
+FEATURES_PATH = os.path.join(MODEL_DIR, 'classification_features.json')
+
+# Micro-batching for concurrent single-sample requests (see predict_water_quality_coalesced):
+# requests arriving within CLASSIFY_MAX_WAIT_MS of each other share one forward pass
+CLASSIFY_MAX_BATCH = int(os.environ.get("CLASSIFY_MAX_BATCH", 64))
+CLASSIFY_MAX_WAIT_MS = float(os.environ.get("CLASSIFY_MAX_WAIT_MS", 5))
+# Seconds a queued request waits for the batch before scoring itself directly
+CLASSIFY_QUEUE_TIMEOUT_S = float(os.environ.get("CLASSIFY_QUEUE_TIMEOUT_S", 10))
+
+# Memo of classification results (see _classify_rows): max entries (0 disables) and
+# the decimals inputs are rounded to for the key (unset = exact values)
+CLASSIFY_MEMO_SIZE = int(os.environ.get("CLASSIFY_MEMO_SIZE", 4096))
+CLASSIFY_MEMO_DECIMALS = os.environ.get("CLASSIFY_MEMO_DECIMALS")
+CLASSIFY_MEMO_DECIMALS = int(CLASSIFY_MEMO_DECIMALS) if CLASSIFY_MEMO_DECIMALS not in (None, "") else None
+
+# Seconds before a failed model load is tried again (e.g. while the model files are being deployed)
+CLASSIFY_LOAD_RETRY_SECONDS = float(os.environ.get("CLASSIFY_LOAD_RETRY_SECONDS", 60))
+
+# --- PART 1: LOAD PRE-TRAINED MODELS (LAZILY, ONCE) ---
+# Only the feature list is read at import time (callers need the column order).
+# The model, scaler and encoder are loaded on the first prediction or by
+# warmup(), so importing this module does not import TensorFlow.
 try:
-    # --- Load all 4 files you downloaded ---
-    model_path = os.path.join(MODEL_DIR, 'classification_model.h5')
-    scaler_path = os.path.join(MODEL_DIR, 'classification_scaler.pkl')
-    encoder_path = os.path.join(MODEL_DIR, 'classification_label_encoder.pkl')
-    features_path = os.path.join(MODEL_DIR, 'classification_features.json')
-
-    # 1. Load the Keras Model
-    model = load_model(model_path, compile=False) # compile=False makes loading faster
-    
-    # 2. Load the Scaler
-    scaler = joblib.load(scaler_path)
-    
-    # 3. Load the Label Encoder
-    label_encoder = joblib.load(encoder_path)
-    
-    # 4. Load the Feature List
-    with open(features_path, 'r') as f:
+    with open(FEATURES_PATH, 'r') as f:
         features = json.load(f)
-        
-    print("✅ Classification model, scaler, and encoder loaded successfully.")
-    
 except Exception as e:
-    print(f"🔴 CRITICAL ERROR: Failed to load classification model from '{MODEL_DIR}'.")
-    print(f"Error: {e}")
-    print("➡️ Make sure 'classification_model.h5', 'classification_scaler.pkl', 'classification_label_encoder.pkl', and 'classification_features.json' are in the 'models' folder.")
-    model, scaler, label_encoder, features = None, None, None, []
+    print(f"🔴 ERROR: Could not read classification features from '{FEATURES_PATH}': {e}")
+    features = []
+
+model, scaler, label_encoder = None, None, None
+model_version = None # Hash of the model, scaler and encoder files; part of every memo key
+_load_lock = threading.Lock()
+_retry_load_after = 0.0 # time.monotonic() before which a failed load is not retried
+# Seconds spent on each loading step, plus the outcome (see get_load_report)
+_load_report = {"status": "not_loaded", "backend": None, "steps": {}, "total_seconds": None, "error": None}
+
+
+def _timed(step, func):
+    start = time.perf_counter()
+    result = func()
+    _load_report["steps"][step] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def _load_keras_model():
+    from keras.models import load_model
+    return load_model(MODEL_PATH, compile=False) # compile=False makes loading faster
+
+
+def ensure_loaded():
+    """
+    Loads the model, scaler and label encoder on first call (thread-safe;
+    concurrent callers wait for the same load). Returns True if they are usable.
+    After a failed load, calls return False for CLASSIFY_LOAD_RETRY_SECONDS
+    and the next call after that tries again.
+    """
+    global model, scaler, label_encoder, model_version, _retry_load_after
+    if model is not None or time.monotonic() < _retry_load_after:
+        return model is not None
+    with _load_lock:
+        if model is not None or time.monotonic() < _retry_load_after:
+            return model is not None
+        print("Loading classification models...")
+        start = time.perf_counter()
+        try:
+            # The NumPy export if it is current (no TensorFlow import), else Keras
+            loaded_model = _timed("model_npz", lambda: load_fresh_npz(MODEL_PATH))
+            if loaded_model is not None:
+                _load_report["backend"] = "numpy"
+            else:
+                loaded_model = _timed("model_keras", _load_keras_model)
+                _load_report["backend"] = "keras"
+            loaded_scaler = _timed("scaler", lambda: joblib.load(SCALER_PATH))
+            loaded_encoder = _timed("label_encoder", lambda: joblib.load(ENCODER_PATH))
+            if not features:
+                raise ValueError(f"feature list '{FEATURES_PATH}' is missing or empty")
+
+            loaded_version = _timed("version_hash", lambda: hashlib.sha1(
+                ''.join(file_sha1(path) for path in (MODEL_PATH, SCALER_PATH, ENCODER_PATH) if os.path.exists(path)).encode()
+            ).hexdigest()[:12])
+
+            # model last: a non-None model tells other threads everything is ready
+            scaler, label_encoder, model_version = loaded_scaler, loaded_encoder, loaded_version
+            clear_memo()
+            model = loaded_model
+            _load_report.update(status="loaded", error=None)
+            print(f"✅ Classification model, scaler, and encoder loaded successfully ({_load_report['backend']}).")
+        except Exception as e:
+            _load_report["status"] = "failed"
+            _load_report["error"] = str(e)
+            print(f"🔴 CRITICAL ERROR: Failed to load classification model from '{MODEL_DIR}'.")
+            print(f"Error: {e}")
+            print("➡️ Make sure 'classification_model.h5', 'classification_scaler.pkl', 'classification_label_encoder.pkl', and 'classification_features.json' are in that folder.")
+            print(f"⏭️ Retrying the load in {CLASSIFY_LOAD_RETRY_SECONDS:g}s.")
+            _retry_load_after = time.monotonic() + CLASSIFY_LOAD_RETRY_SECONDS
+        _load_report["total_seconds"] = round(time.perf_counter() - start, 3)
+    return model is not None
+
+
+def warmup(background=False):
+    """
+    Loads the classifier ahead of the first request. With background=True
+    the load runs in a daemon thread and this returns immediately.
+    """
+    if background:
+        thread = threading.Thread(target=ensure_loaded, name="classifier-warmup", daemon=True)
+        thread.start()
+        return thread
+    return ensure_loaded()
+
+
+def reset_classifier():
+    """Forgets the loaded model so the next prediction reloads it (e.g. after retraining)."""
+    global model, scaler, label_encoder, model_version, _retry_load_after
+    with _load_lock:
+        model, scaler, label_encoder, model_version = None, None, None, None
+        clear_memo()
+        _retry_load_after = 0.0
+        _load_report.update(status="not_loaded", backend=None, steps={}, total_seconds=None, error=None)
+
+
+def get_load_report():
+    """Import/load timing report: module import time plus each lazy loading step."""
+    return dict(_load_report, import_seconds=IMPORT_SECONDS, steps=dict(_load_report["steps"]))
 
 
 # --- PART 2: PREDICTION FUNCTIONS (FOR YOUR API) ---
 
+def _predict_probs(scaled_input):
+    """Class probabilities for scaled rows, from the NumPy engine or Keras."""
+    if isinstance(model, dict):
+        return dense_stack_forward(model, scaled_input)
+    return model.predict(scaled_input, batch_size=len(scaled_input), verbose=0)
+
 def get_insights(predicted_class):
     """Generates simple insights based on the predicted class."""
     if predicted_class == 'Bad' or predicted_class == 'Very Bad':
@@ -57,12 +171,99 @@ def get_insights(predicted_class):
     else:
         return "Prediction uncertain."
 
+# --- RESULT MEMO ---
+_memo = OrderedDict() # (model_version, feature vector bytes) -> success result
+_memo_lock = threading.Lock()
+_memo_stats = {"hits": 0, "misses": 0}
+
+
+def _memo_key(row):
+    if CLASSIFY_MEMO_DECIMALS is not None:
+        row = np.round(row, CLASSIFY_MEMO_DECIMALS)
+    return (model_version, np.ascontiguousarray(row, dtype=np.float64).tobytes())
+
+
+def clear_memo():
+    with _memo_lock:
+        _memo.clear()
+        _memo_stats.update(hits=0, misses=0)
+
+
+def get_memo_stats():
+    """Hit/miss counters and size of the classification memo."""
+    with _memo_lock:
+        lookups = _memo_stats["hits"] + _memo_stats["misses"]
+        return {
+            **_memo_stats,
+            "hit_rate": round(_memo_stats["hits"] / lookups, 4) if lookups else None,
+            "size": len(_memo),
+            "max_size": CLASSIFY_MEMO_SIZE,
+            "decimals": CLASSIFY_MEMO_DECIMALS,
+            "model_version": model_version,
+        }
+
+
+def _classify_rows(input_array):
+    """
+    Scores validated rows (N x features, training column order) and returns
+    one success dict per row. Rows already seen (same values and model
+    version) come from the memo; the rest share one forward pass.
+    """
+    keys = [_memo_key(row) for row in input_array] if CLASSIFY_MEMO_SIZE > 0 else [None] * len(input_array)
+    results = [None] * len(keys)
+    if CLASSIFY_MEMO_SIZE > 0:
+        with _memo_lock:
+            for i, key in enumerate(keys):
+                cached = _memo.get(key)
+                if cached is not None:
+                    _memo.move_to_end(key)
+                    results[i] = cached
+            hits = sum(result is not None for result in results)
+            _memo_stats["hits"] += hits
+            _memo_stats["misses"] += len(keys) - hits
+
+    # Score each distinct missing vector once
+    to_score = {}
+    for i, result in enumerate(results):
+        if result is None:
+            to_score.setdefault(keys[i] if keys[i] is not None else i, []).append(i)
+    if to_score:
+        first_rows = [indices[0] for indices in to_score.values()]
+        scaled_input = scaler.transform(input_array[first_rows])
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore") # Suppress prediction warnings
+            prediction_probs = _predict_probs(scaled_input)
+
+        predicted_labels = label_encoder.inverse_transform(np.argmax(prediction_probs, axis=1))
+        class_labels = label_encoder.inverse_transform(np.arange(prediction_probs.shape[1]))
+        fresh = {}
+        for key, label, probs in zip(to_score, predicted_labels, prediction_probs):
+            result = {
+                "status": "success",
+                "class": label,
+                "insights": get_insights(label),
+                "probabilities": {class_labels[i]: float(prob) for i, prob in enumerate(probs)}
+            }
+            fresh[key] = result
+            for i in to_score[key]:
+                results[i] = result
+
+        if CLASSIFY_MEMO_SIZE > 0:
+            with _memo_lock:
+                _memo.update(fresh)
+                while len(_memo) > CLASSIFY_MEMO_SIZE:
+                    _memo.popitem(last=False)
+
+    # Copies, so callers adding fields do not change the memo
+    return [dict(result, probabilities=dict(result["probabilities"])) for result in results]
+
+
 def predict_water_quality(user_input_dict):
     """
     Takes user input as a dictionary and returns a prediction dictionary.
     This is the function your main.py will call.
     """
-    if model is None:
+    if not ensure_loaded():
         return {"status": "error", "message": "Model not loaded. Server error."}
         
     try:
@@ -81,39 +282,133 @@ def predict_water_quality(user_input_dict):
             missing = input_df_numeric.columns[input_df_numeric.isnull().any()].tolist()
             return {"status": "error", "message": f"Missing or invalid numeric value for: {', '.join(missing)}"}
 
-        input_array = input_df_numeric.values
-        
-        # Scale the user's input
-        scaled_input = scaler.transform(input_array)
-        
-        # Make the prediction
-        with warnings.catch_warnings():
-             warnings.simplefilter("ignore") # Suppress prediction warnings
-             prediction_probs = model.predict(scaled_input)
-             
-        predicted_class_index = np.argmax(prediction_probs, axis=1)[0]
-        
-        # Decode the prediction
-        predicted_class_label = label_encoder.inverse_transform([predicted_class_index])[0]
+        input_array = input_df_numeric.to_numpy(dtype=float)
         
-        # Generate insights
-        insights = get_insights(predicted_class_label)
+        # Scale, predict and decode (or reuse the memoized result for this input)
+        return _classify_rows(input_array)[0]
+    except Exception as e:
+        return {"status": "error", "message": f"Prediction failed: {e}. Check input values."}
 
-        # Create a nice dictionary of probabilities
-        class_probs = {label_encoder.inverse_transform([i])[0]: float(prob) for i, prob in enumerate(prediction_probs[0])}
+def predict_water_quality_batch(records, raise_errors=False):
+    """
+    Takes a list of input dictionaries and returns a list of prediction
+    dictionaries (same shape as predict_water_quality), running validation,
+    scaling and the model forward pass once for the whole N x features matrix.
+    With raise_errors=True a failure of the whole batch raises instead of
+    returning one error dictionary per row.
+    """
+    records = list(records)
+    if not records:
+        return []
+    return predict_water_quality_frame(pd.DataFrame.from_records(records), raise_errors)
 
-        return {
-            "status": "success",
-            "class": predicted_class_label,
-            "insights": insights,
-            "probabilities": class_probs
-        }
+def predict_water_quality_frame(samples_df, raise_errors=False):
+    """
+    Same as predict_water_quality_batch for samples already in a DataFrame
+    (one row per sample, e.g. parsed from CSV/NDJSON); extra columns are ignored.
+    """
+    n_rows = len(samples_df)
+    if not ensure_loaded():
+        return [{"status": "error", "message": "Model not loaded. Server error."} for _ in range(n_rows)]
+    if n_rows == 0:
+        return []
+
+    try:
+        # Build the N x features matrix in the training column order.
+        # Missing keys become NaN and are reported per row below.
+        input_df = samples_df.reindex(columns=features)
+        input_array = input_df.apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+
+        invalid_mask = np.isnan(input_array)
+        valid_rows = ~invalid_mask.any(axis=1)
+
+        results = [None] * n_rows
+        for i in np.flatnonzero(~valid_rows):
+            missing = [features[j] for j in np.flatnonzero(invalid_mask[i])]
+            results[i] = {"status": "error", "message": f"Missing or invalid numeric value for: {', '.join(missing)}"}
+
+        if valid_rows.any():
+            # One forward pass for every valid row not already in the memo
+            for row_idx, result in zip(np.flatnonzero(valid_rows), _classify_rows(input_array[valid_rows])):
+                results[row_idx] = result
+        return results
     except Exception as e:
-        return {"status": "error", "message": f"Prediction failed: {e}. Check input values."}
+        if raise_errors:
+            raise
+        return [{"status": "error", "message": f"Prediction failed: {e}. Check input values."} for _ in range(n_rows)]
+
+# --- PART 3: REQUEST COALESCING ---
+_request_queue = queue.Queue()
+_coalescer_lock = threading.Lock()
+_coalescer_thread = None
+
+
+def _collect_batch():
+    """Blocks for one request, then gathers more until the batch is full or the wait expires."""
+    batch = [_request_queue.get()]
+    deadline = time.perf_counter() + CLASSIFY_MAX_WAIT_MS / 1000.0
+    while len(batch) < CLASSIFY_MAX_BATCH:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            break
+        try:
+            batch.append(_request_queue.get(timeout=remaining))
+        except queue.Empty:
+            break
+    return batch
+
+
+def _coalescer_loop():
+    while True:
+        # Callers that timed out have already scored their sample themselves
+        batch = [item for item in _collect_batch() if not item["abandoned"]]
+        if not batch:
+            continue
+        try:
+            results = predict_water_quality_batch([item["input"] for item in batch], raise_errors=True)
+        except Exception:
+            # One malformed sample can fail the whole matrix; score each on its own instead
+            results = [predict_water_quality(item["input"]) for item in batch]
+        for item, result in zip(batch, results):
+            item["result"] = result
+            item["done"].set()
+
+
+def _ensure_coalescer():
+    global _coalescer_thread
+    with _coalescer_lock:
+        if _coalescer_thread is None or not _coalescer_thread.is_alive():
+            _coalescer_thread = threading.Thread(target=_coalescer_loop, name="classify-coalescer", daemon=True)
+            _coalescer_thread.start()
+
+
+def predict_water_quality_coalesced(user_input_dict):
+    """
+    Drop-in for predict_water_quality under concurrent load: the sample is
+    queued, batched with other requests arriving within CLASSIFY_MAX_WAIT_MS
+    (up to CLASSIFY_MAX_BATCH samples) and scored in one forward pass.
+    Blocks until this sample's result is ready; if the batch has not answered
+    within CLASSIFY_QUEUE_TIMEOUT_S, the sample is scored on its own instead.
+    """
+    if not isinstance(user_input_dict, dict) or CLASSIFY_MAX_BATCH <= 1:
+        return predict_water_quality(user_input_dict)
+    if not ensure_loaded(): # Don't queue behind a model that cannot load
+        return {"status": "error", "message": "Model not loaded. Server error."}
+
+    _ensure_coalescer()
+    item = {"input": user_input_dict, "result": None, "done": threading.Event(), "abandoned": False}
+    _request_queue.put(item)
+    if not item["done"].wait(CLASSIFY_QUEUE_TIMEOUT_S):
+        item["abandoned"] = True # So the coalescer does not score it a second time
+        print(f"⚠️ Coalesced classification did not answer within {CLASSIFY_QUEUE_TIMEOUT_S:g}s; scoring the sample directly.")
+        return predict_water_quality(user_input_dict)
+    return item["result"]
+
+IMPORT_SECONDS = round(time.perf_counter() - _import_started, 3)
 
 # --- This block is for testing the script directly ---
 if __name__ == "__main__":
-    if model:
+    if ensure_loaded():
         print("\n--- 🧪 Testing model with sample data ---")
         # Create sample data based on your features
         sample_data = {
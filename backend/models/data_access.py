@@ -0,0 +1,150 @@
+# models/data_access.py
+import pandas as pd
+import numpy as np
+import sqlite3
+import threading
+import os
+from models.measurement_store import WIDE_VIEW_NAME
+
+# --- Build Absolute Paths ---
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(SCRIPT_DIR)
+
+# --- CONFIGURATION (Using Absolute Paths) ---
+DB_PATH = os.path.join(BACKEND_DIR, "database/water_quality.db")
+TABLE_NAME = "water_records"
+META_COLS = ['stationId', 'stationName', 'location', 'timestamp', 'timestampDate', 'id']
+NUMERIC_SQL_TYPES = ('REAL', 'INT', 'FLOAT', 'NUM', 'DOUBLE')
+# Full-resolution ingest (see cpcb_scraper.py) keeps every feed sample in the long-format
+# store and only the hourly snapshot in water_records, so the jobs read the store's wide view
+FULL_RESOLUTION = os.environ.get("SCRAPER_FULL_RESOLUTION", "0") == "1"
+
+# One entry per (db_path, source, mtime, size): a batch run reads the table once and
+# every job shares the same frame; a rewritten database is re-read.
+_records_cache = {}
+_cache_lock = threading.Lock()
+
+
+def records_source(db_path):
+    """
+    Table the jobs read: the long store's wide view (water_records_wide) in
+    full-resolution mode, water_records otherwise (or if the view does not exist yet).
+    """
+    if not FULL_RESOLUTION:
+        return TABLE_NAME
+    conn = sqlite3.connect(db_path)
+    try:
+        has_view = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'view' AND name = ?", (WIDE_VIEW_NAME,)
+        ).fetchone() is not None
+    finally:
+        conn.close()
+    if not has_view:
+        print(f"⚠️ Full-resolution mode, but '{WIDE_VIEW_NAME}' does not exist yet; reading '{TABLE_NAME}'.")
+        return TABLE_NAME
+    return WIDE_VIEW_NAME
+
+
+def _read_water_records(db_path, source=TABLE_NAME):
+    """Reads water_records (or its wide view) with typed columns, sorted by station then time."""
+    conn = sqlite3.connect(db_path)
+    try:
+        table_info = conn.execute(f'PRAGMA table_info("{source}")').fetchall()
+        if not table_info:
+            raise ValueError(f"table '{source}' not found in {db_path}")
+        # The view's pivoted columns have no declared type; all of them are values
+        param_cols = [
+            row[1] for row in table_info
+            if row[1] not in META_COLS and (source == WIDE_VIEW_NAME or any(t in (row[2] or '').upper() for t in NUMERIC_SQL_TYPES))
+        ]
+        quoted_cols = ', '.join(f'"{col}"' for col in ['stationId', 'timestampDate'] + param_cols)
+        df = pd.read_sql_query(f'SELECT {quoted_cols} FROM "{source}"', conn)
+    finally:
+        conn.close()
+
+    df['timestampDate'] = pd.to_datetime(df['timestampDate'], errors='coerce', format='mixed')
+    df = df.dropna(subset=['stationId', 'timestampDate'])
+    df[param_cols] = df[param_cols].apply(pd.to_numeric, errors='coerce').astype('float32')
+    df['stationId'] = df['stationId'].astype(str).astype('category')
+    df = df.sort_values(['stationId', 'timestampDate'], kind='mergesort').reset_index(drop=True)
+
+    # Precomputed group index: rows of each station are contiguous after the sort
+    station_index = {station_id: (start, stop) for station_id, start, stop in station_offsets(df)}
+    return df, station_index
+
+
+def station_offsets(df):
+    """
+    Returns [(stationId, start, stop), ...] for a frame whose rows are already
+    grouped by stationId, found with one vectorized pass over the column.
+    """
+    station_col = df['stationId']
+    if isinstance(station_col.dtype, pd.CategoricalDtype):
+        keys = station_col.cat.codes.to_numpy()
+    else:
+        keys = station_col.to_numpy()
+    if len(keys) == 0:
+        return []
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    stops = np.r_[starts[1:], len(keys)]
+    return [(str(station_col.iat[start]), int(start), int(stop)) for start, stop in zip(starts, stops)]
+
+
+def iter_station_slices(df, sort_by=None):
+    """
+    Yields (stationId, station_df) for any frame with a stationId column.
+    The frame is stable-sorted once by stationId (then sort_by columns) and
+    each station is a contiguous row slice, so the whole split is O(rows)
+    instead of one boolean mask per station.
+    """
+    df = df.sort_values(['stationId'] + list(sort_by or []), kind='mergesort').reset_index(drop=True)
+    for station_id, start, stop in station_offsets(df):
+        yield station_id, df.iloc[start:stop]
+
+
+def _load_entry(db_path):
+    st = os.stat(db_path)
+    source = records_source(db_path)
+    key = (db_path, source, st.st_mtime_ns, st.st_size)
+    with _cache_lock:
+        entry = _records_cache.get(key)
+        if entry is None:
+            # Drop frames read from an older version of the same database
+            for stale_key in [k for k in _records_cache if k[0] == db_path]:
+                del _records_cache[stale_key]
+            entry = _read_water_records(db_path, source)
+            _records_cache[key] = entry
+            print(f"Loaded {len(entry[0])} rows for {len(entry[1])} stations from '{source}'.")
+    return entry
+
+
+def load_water_records(db_path=DB_PATH):
+    """
+    Returns water_records (every stored sample in full-resolution mode, see
+    records_source) as a DataFrame: categorical stationId, datetime64
+    timestampDate and float32 parameter columns, sorted by station and time.
+    The frame is cached and shared between jobs, so treat it as read-only
+    (copy a station view before modifying it).
+    """
+    return _load_entry(db_path)[0]
+
+
+def get_parameter_columns(df):
+    """Returns the numeric parameter columns of a loaded frame."""
+    return [c for c in df.columns if c not in META_COLS and pd.api.types.is_numeric_dtype(df[c])]
+
+
+def iter_station_views(db_path=DB_PATH):
+    """
+    Yields (stationId, station_df) for every station, where station_df is a
+    contiguous row slice of the cached frame (no boolean mask, no copy).
+    """
+    df, station_index = _load_entry(db_path)
+    for station_id, (start, stop) in station_index.items():
+        yield station_id, df.iloc[start:stop]
+
+
+def clear_cache():
+    """Releases cached frames (e.g. at the end of a batch run)."""
+    with _cache_lock:
+        _records_cache.clear()
@@ -0,0 +1,94 @@
+# models/export_weights.py
+# Exports the Keras .h5 models to .npz weight files for the NumPy engine
+# (models/lstm_engine.py) and checks each export against Keras.
+# Run from backend/:  python -m models.export_weights [--no-check]
+import os
+import sys
+import argparse
+import warnings
+import numpy as np
+from models import model_registry
+from models.lstm_engine import (
+    extract_lstm_dense, extract_dense_stack, lstm_dense_forward, dense_stack_forward,
+    save_weights_npz, npz_path_for, file_sha1
+)
+
+os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+
+# --- Build Absolute Paths ---
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(SCRIPT_DIR)
+
+# --- CONFIGURATION (Using Absolute Paths) ---
+CLASSIFICATION_MODEL_PATH = os.path.join(BACKEND_DIR, "models_store/classification/classification_model.h5")
+PARITY_SAMPLES = 32     # Random inputs compared against Keras per model
+PARITY_TOLERANCE = 1e-4 # Max abs difference accepted (float32 round-off)
+
+
+def _parity_error(model, forward, weights, input_shape):
+    """Max abs difference between Keras and the NumPy engine on random scaled inputs."""
+    rng = np.random.default_rng(0)
+    X = rng.random((PARITY_SAMPLES,) + tuple(input_shape), dtype=np.float32)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        expected = model.predict(X, verbose=0)
+    return float(np.max(np.abs(forward(weights, X) - expected)))
+
+
+def export_model(model_path, extract, forward, check=True):
+    """Exports one .h5 model; returns True if the .npz was written (and passed the check)."""
+    from tensorflow.keras.models import load_model
+
+    npz_path = npz_path_for(model_path)
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            model = load_model(model_path, compile=False)
+        weights = extract(model)
+    except Exception as e:
+        print(f"🔴 ERROR exporting {os.path.basename(model_path)}: {e}")
+        return False
+
+    if check:
+        error = _parity_error(model, forward, weights, model.input_shape[1:])
+        if error > PARITY_TOLERANCE:
+            print(f"🔴 {os.path.basename(model_path)}: NumPy output differs from Keras by {error:.2e}; not exported.")
+            if os.path.exists(npz_path):
+                os.remove(npz_path) # Never leave an export that disagrees with the model
+            return False
+        print(f"✅ {os.path.basename(npz_path)} (max diff vs Keras {error:.1e})")
+    else:
+        print(f"✅ {os.path.basename(npz_path)}")
+
+    save_weights_npz(weights, npz_path, file_sha1(model_path))
+    return True
+
+
+def export_all(check=True):
+    """Exports every daily/weekly forecaster and the classifier. Returns the number of failures."""
+    failures = 0
+    for kind in model_registry.MODEL_KINDS:
+        station_ids = model_registry.list_stations(kind)
+        print(f"--- Exporting {len(station_ids)} {kind} model(s) ---")
+        for station_id in station_ids:
+            model_path = model_registry.get_metadata(kind, station_id)["model_path"]
+            failures += not export_model(model_path, extract_lstm_dense, lstm_dense_forward, check)
+
+    print("--- Exporting classification model ---")
+    if os.path.exists(CLASSIFICATION_MODEL_PATH):
+        failures += not export_model(CLASSIFICATION_MODEL_PATH, extract_dense_stack, dense_stack_forward, check)
+    else:
+        print(f"⚠️ Classification model not found: {CLASSIFICATION_MODEL_PATH}")
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export Keras models to .npz for the NumPy inference engine.")
+    parser.add_argument("--no-check", action="store_true", help="Skip the parity check against Keras")
+    args = parser.parse_args()
+
+    failures = export_all(check=not args.no_check)
+    if failures:
+        print(f"--- 🔴 {failures} model(s) failed to export ---")
+        sys.exit(1)
+    print("--- ✅ All models exported ---")
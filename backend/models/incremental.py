@@ -0,0 +1,161 @@
+# models/incremental.py
+import os
+import json
+import time
+import hashlib
+import threading
+import pandas as pd
+import numpy as np
+from datetime import date, datetime
+from models.station_scheduler import run_per_station
+
+# --- Build Absolute Paths ---
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(SCRIPT_DIR)
+
+# --- CONFIGURATION (Using Absolute Paths) ---
+# One manifest per job: {stationId: {"fingerprint", "version", "result"}}
+MANIFEST_DIR = os.path.join(BACKEND_DIR, "database/batch_manifest")
+FINGERPRINT_TAIL_ROWS = 50 # Trailing rows hashed per station (catches revised recent readings)
+# Set by `run_all_batch_jobs.py --force` (or BATCH_FORCE_RECOMPUTE=1) to ignore the manifests
+FORCE_RECOMPUTE = os.environ.get("BATCH_FORCE_RECOMPUTE", "0") == "1"
+
+_digest_cache = {}
+_digest_lock = threading.Lock()
+
+
+def station_fingerprint(station_df, tail_rows=FINGERPRINT_TAIL_ROWS):
+    """
+    Cheap fingerprint of one station's input rows: row count, latest
+    timestamp and a hash of the last tail_rows rows (all columns).
+    """
+    if station_df.empty:
+        return "0"
+    tail = station_df.iloc[-tail_rows:]
+    tail_hash = hashlib.sha1(pd.util.hash_pandas_object(tail, index=False).to_numpy().tobytes())
+    tail_hash.update(','.join(map(str, station_df.columns)).encode())
+    return f"{len(station_df)}|{station_df['timestampDate'].max()}|{tail_hash.hexdigest()}"
+
+
+def file_digest(*paths):
+    """SHA-1 over the contents of the given files ('missing' for absent ones), cached by mtime/size."""
+    digest = hashlib.sha1()
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            digest.update(f"{os.path.basename(path)}:missing".encode())
+            continue
+        key = (path, st.st_mtime_ns, st.st_size)
+        with _digest_lock:
+            file_hash = _digest_cache.get(key)
+        if file_hash is None:
+            with open(path, 'rb') as f:
+                file_hash = hashlib.sha1(f.read()).hexdigest()
+            with _digest_lock:
+                _digest_cache[key] = file_hash
+        digest.update(f"{os.path.basename(path)}:{file_hash}".encode())
+    return digest.hexdigest()
+
+
+def _manifest_path(job_name):
+    return os.path.join(MANIFEST_DIR, f"{job_name}.json")
+
+
+def load_manifest(job_name):
+    try:
+        with open(_manifest_path(job_name), 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        print(f"⚠️ Could not read manifest for '{job_name}', recomputing all stations: {e}")
+        return {}
+
+
+def save_manifest(job_name, manifest):
+    try:
+        os.makedirs(MANIFEST_DIR, exist_ok=True)
+        tmp_path = _manifest_path(job_name) + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, _manifest_path(job_name))
+    except Exception as e:
+        print(f"⚠️ Could not write manifest for '{job_name}': {e}")
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (pd.Timestamp, datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _to_json_value(result):
+    """Round-trips a station result through JSON so cached and fresh results look alike."""
+    return json.loads(json.dumps(result, default=_json_default))
+
+
+def run_incremental_per_station(job_name, func, station_items, args=(), workers=None,
+                                version="1", outputs=None, batched=False):
+    """
+    Like run_per_station, but skips stations whose input fingerprint and
+    version match the job's manifest (and whose outputs still exist), reusing
+    the result stored for them. Returns results in input order.
+
+    version: a string, or a callable(station_id) -> string (e.g. a model file hash).
+    outputs: optional callable(station_id) -> list of files the station writes.
+    A station is recorded once this run wrote its outputs (or, without outputs, once it
+    returns a result), so failed stations are retried on the next run.
+    batched: call func(changed_station_items, *args) once instead of once per
+    station; it must return one result per station, in order.
+    """
+    station_items = list(station_items)
+    manifest = {} if FORCE_RECOMPUTE else load_manifest(job_name)
+
+    results = [None] * len(station_items)
+    pending, keys = [], {}
+    for i, (station_id, station_df) in enumerate(station_items):
+        key = {
+            "fingerprint": station_fingerprint(station_df),
+            "version": version(station_id) if callable(version) else version,
+        }
+        entry = manifest.get(str(station_id))
+        unchanged = (
+            entry is not None
+            and entry.get("fingerprint") == key["fingerprint"]
+            and entry.get("version") == key["version"]
+            and all(os.path.exists(p) for p in (outputs(station_id) if outputs else []))
+        )
+        if unchanged:
+            results[i] = entry.get("result")
+        else:
+            pending.append(i)
+            keys[i] = key
+
+    print(f"   {job_name}: {len(pending)} station(s) changed, {len(station_items) - len(pending)} unchanged (skipped).")
+    if not pending:
+        return results
+
+    run_started = time.time() - 1 # Tolerate coarse filesystem timestamps
+    changed_items = [station_items[i] for i in pending]
+    if batched:
+        fresh = func(changed_items, *args)
+    else:
+        fresh = run_per_station(func, changed_items, args=args, workers=workers)
+    for i, result in zip(pending, fresh):
+        station_id = station_items[i][0]
+        if outputs:
+            # Only outputs written by this run count (not ones left from an older run)
+            done = all(os.path.exists(p) and os.path.getmtime(p) >= run_started for p in outputs(station_id))
+        else:
+            done = result is not None
+        results[i] = _to_json_value(result)
+        if done:
+            manifest[str(station_id)] = dict(keys[i], result=results[i])
+        else:
+            manifest.pop(str(station_id), None)
+
+    save_manifest(job_name, manifest)
+    return results
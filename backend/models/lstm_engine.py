@@ -0,0 +1,320 @@
+# models/lstm_engine.py
+# NumPy forward passes for the saved Keras models (LSTM+Dense forecasters and
+# the Dense classifier), so inference does not need TensorFlow.
+import os
+import sys
+import json
+import hashlib
+import numpy as np
+
+
+def _softmax(x):
+    e = np.exp(x - x.max(axis=-1, keepdims=True))
+    return e / e.sum(axis=-1, keepdims=True)
+
+
+# Activations used by the saved Keras models (Keras names)
+ACTIVATIONS = {
+    'linear': lambda x: x,
+    'relu': lambda x: np.maximum(x, 0),
+    'tanh': np.tanh,
+    'sigmoid': lambda x: 1.0 / (1.0 + np.exp(-x)),
+    'hard_sigmoid': lambda x: np.clip(x / 6.0 + 0.5, 0.0, 1.0), # Keras 3 definition
+    'hard_sigmoid_keras2': lambda x: np.clip(0.2 * x + 0.5, 0.0, 1.0), # tf.keras 2.x definition
+    'softmax': _softmax,
+}
+# Layers that do nothing at inference time
+INFERENCE_NOOP_LAYERS = ('InputLayer', 'Dropout')
+
+
+def _activation(name):
+    if name not in ACTIVATIONS:
+        raise ValueError(f"Unsupported activation '{name}'")
+    return ACTIVATIONS[name]
+
+
+def _keras_version(model):
+    """
+    Version of the Keras package the model object comes from. That package is
+    already imported (the model exists), so this never imports TensorFlow.
+    """
+    package = sys.modules.get(type(model).__module__.split('.')[0])
+    return getattr(package, '__version__', None)
+
+
+def _keras_activation(name, keras_version):
+    """
+    Engine name for a Keras activation. Keras 2 and 3 define hard_sigmoid
+    differently, so the name records which one the model ran with
+    (keras_version None: taken as Keras 3).
+    """
+    if name == 'hard_sigmoid' and keras_version and int(keras_version.split('.')[0]) < 3:
+        return 'hard_sigmoid_keras2'
+    return name
+
+
+def extract_lstm_dense(model):
+    """
+    Reads the weights of a Sequential [LSTM, Dense] Keras model (the daily and
+    weekly forecasters) into a dict of NumPy arrays.
+    Raises ValueError for any other architecture.
+    """
+    layers = [layer for layer in model.layers if layer.__class__.__name__ != 'InputLayer']
+    kinds = [layer.__class__.__name__ for layer in layers]
+    if kinds != ['LSTM', 'Dense']:
+        raise ValueError(f"Expected [LSTM, Dense] layers, got {kinds}")
+    lstm, dense = layers
+    lstm_config, dense_config = lstm.get_config(), dense.get_config()
+    if lstm_config.get('return_sequences') or lstm_config.get('go_backwards') or not lstm_config.get('use_bias', True):
+        raise ValueError("Only forward, bias-enabled LSTMs returning the last state are supported")
+
+    kernel, recurrent_kernel, bias = lstm.get_weights()
+    dense_weights = dense.get_weights()
+    keras_version = _keras_version(model)
+    return {
+        'keras_version': keras_version,
+        'activation': _keras_activation(lstm_config.get('activation', 'tanh'), keras_version),
+        'recurrent_activation': _keras_activation(lstm_config.get('recurrent_activation', 'sigmoid'), keras_version),
+        'dense_activation': _keras_activation(dense_config.get('activation', 'linear'), keras_version),
+        'kernel': np.asarray(kernel, dtype=np.float32),                     # (features, 4*units)
+        'recurrent_kernel': np.asarray(recurrent_kernel, dtype=np.float32), # (units, 4*units)
+        'bias': np.asarray(bias, dtype=np.float32),                         # (4*units,)
+        'dense_kernel': np.asarray(dense_weights[0], dtype=np.float32),     # (units, outputs)
+        'dense_bias': (np.asarray(dense_weights[1], dtype=np.float32) if len(dense_weights) > 1
+                       else np.zeros(dense_weights[0].shape[1], dtype=np.float32)),
+    }
+
+
+def stack_weights(weight_dicts):
+    """
+    Stacks the weights of same-shaped, same-activation models along a new
+    leading station axis, so they can be evaluated in one pass.
+    """
+    first = weight_dicts[0]
+    for weights in weight_dicts[1:]:
+        for name in ('activation', 'recurrent_activation', 'dense_activation'):
+            if weights[name] != first[name]:
+                raise ValueError(f"Cannot stack models with different {name}")
+    stacked = {name: first[name] for name in ('activation', 'recurrent_activation', 'dense_activation')}
+    for name in ('kernel', 'recurrent_kernel', 'bias', 'dense_kernel', 'dense_bias'):
+        stacked[name] = np.stack([weights[name] for weights in weight_dicts])
+    return stacked
+
+
+def stack_signature(weights):
+    """Models with the same signature can share one stack."""
+    return (weights['activation'], weights['recurrent_activation'], weights['dense_activation'],
+            weights['kernel'].shape, weights['dense_kernel'].shape)
+
+
+def _recurrent_pass(x_proj, recurrent_matmul, act, rec_act, units):
+    """Runs the LSTM over pre-projected inputs x_proj: (B, T, 4*units); returns the last h."""
+    h = np.zeros(x_proj.shape[:1] + (units,), dtype=np.float32)
+    c = np.zeros_like(h)
+    for t in range(x_proj.shape[1]):
+        z = x_proj[:, t] + recurrent_matmul(h)
+        i = rec_act(z[:, :units])
+        f = rec_act(z[:, units:2 * units])
+        g = act(z[:, 2 * units:3 * units])
+        o = rec_act(z[:, 3 * units:])
+        c = f * c + i * g
+        h = o * act(c)
+    return h
+
+
+def stacked_forward(stacked, X):
+    """
+    Evaluates S stacked LSTM+Dense models on their own input sequences.
+    X: (S, seq_length, features), one sequence per model.
+    Returns (S, outputs). Matches Keras' LSTM (gate order i, f, c, o).
+    """
+    X = np.asarray(X, dtype=np.float32)
+    units = stacked['recurrent_kernel'].shape[1]
+    dense_act = _activation(stacked['dense_activation'])
+    # Input projections for every time step at once: (S, T, 4*units)
+    x_proj = np.einsum('stf,sfg->stg', X, stacked['kernel']) + stacked['bias'][:, None, :]
+    h = _recurrent_pass(x_proj, lambda h: np.einsum('su,sug->sg', h, stacked['recurrent_kernel']),
+                        _activation(stacked['activation']), _activation(stacked['recurrent_activation']), units)
+    return dense_act(np.einsum('su,suo->so', h, stacked['dense_kernel']) + stacked['dense_bias'])
+
+
+def lstm_dense_forward(weights, X):
+    """
+    Evaluates one LSTM+Dense model (weights from extract_lstm_dense or
+    load_weights_npz) on a batch of sequences X: (N, seq_length, features).
+    Returns (N, outputs), like model.predict(X).
+    """
+    X = np.asarray(X, dtype=np.float32)
+    units = weights['recurrent_kernel'].shape[0]
+    dense_act = _activation(weights['dense_activation'])
+    x_proj = X @ weights['kernel'] + weights['bias'] # (N, T, 4*units)
+    h = _recurrent_pass(x_proj, lambda h: h @ weights['recurrent_kernel'],
+                        _activation(weights['activation']), _activation(weights['recurrent_activation']), units)
+    return dense_act(h @ weights['dense_kernel'] + weights['dense_bias'])
+
+
+def _rollout(weights, X, steps, project, recurrent_matmul, dense):
+    """
+    Autoregressive rollout shared by the single-model and stacked versions.
+    The window and its input projections live in preallocated buffers of
+    length seq_length + steps: each step projects only the newly predicted
+    row and reads the next window as a slice (no re-stacking of the input).
+    """
+    X = np.asarray(X, dtype=np.float32)
+    batch, seq_length, n_features = X.shape
+    units = weights['recurrent_kernel'].shape[-2]
+    act = _activation(weights['activation'])
+    rec_act = _activation(weights['recurrent_activation'])
+
+    proj_buffer = np.empty((batch, seq_length + steps, 4 * units), dtype=np.float32)
+    proj_buffer[:, :seq_length] = project(X)
+    outputs = np.empty((batch, steps, weights['dense_kernel'].shape[-1]), dtype=np.float32)
+    for step in range(steps):
+        h = _recurrent_pass(proj_buffer[:, step:step + seq_length], recurrent_matmul, act, rec_act, units)
+        outputs[:, step] = dense(h)
+        if step + 1 < steps:
+            if outputs.shape[-1] != n_features:
+                raise ValueError("Rollout needs a model whose outputs are its next input row")
+            proj_buffer[:, seq_length + step] = project(outputs[:, step:step + 1])[:, 0]
+    return outputs
+
+
+def lstm_dense_rollout(weights, X, steps):
+    """
+    Feeds one LSTM+Dense model its own predictions for `steps` steps.
+    X: (N, seq_length, features) -> (N, steps, outputs); same as calling
+    model.predict on a sliding window `steps` times.
+    """
+    dense_act = _activation(weights['dense_activation'])
+    return _rollout(
+        weights, X, steps,
+        project=lambda x: x @ weights['kernel'] + weights['bias'],
+        recurrent_matmul=lambda h: h @ weights['recurrent_kernel'],
+        dense=lambda h: dense_act(h @ weights['dense_kernel'] + weights['dense_bias']),
+    )
+
+
+def stacked_rollout(stacked, X, steps):
+    """
+    Rollout of S stacked models at once (see stack_weights).
+    X: (S, seq_length, features), one sequence per model -> (S, steps, outputs).
+    """
+    dense_act = _activation(stacked['dense_activation'])
+    return _rollout(
+        stacked, X, steps,
+        project=lambda x: np.einsum('stf,sfg->stg', x, stacked['kernel']) + stacked['bias'][:, None, :],
+        recurrent_matmul=lambda h: np.einsum('su,sug->sg', h, stacked['recurrent_kernel']),
+        dense=lambda h: dense_act(np.einsum('su,suo->so', h, stacked['dense_kernel']) + stacked['dense_bias']),
+    )
+
+
+def extract_dense_stack(model):
+    """
+    Reads a Sequential model made of Dense layers (Dropout/InputLayer are
+    skipped) into {'layers': [{'kernel', 'bias', 'activation'}, ...], 'keras_version'}.
+    Raises ValueError for any other layer type.
+    """
+    keras_version = _keras_version(model)
+    layers = []
+    for layer in model.layers:
+        kind = layer.__class__.__name__
+        if kind in INFERENCE_NOOP_LAYERS:
+            continue
+        if kind != 'Dense':
+            raise ValueError(f"Unsupported layer {kind} in a Dense stack")
+        layer_weights = layer.get_weights()
+        kernel = np.asarray(layer_weights[0], dtype=np.float32)
+        layers.append({
+            'kernel': kernel,
+            'bias': (np.asarray(layer_weights[1], dtype=np.float32) if len(layer_weights) > 1
+                     else np.zeros(kernel.shape[1], dtype=np.float32)),
+            'activation': _keras_activation(layer.get_config().get('activation', 'linear'), keras_version),
+        })
+    return {'layers': layers, 'keras_version': keras_version}
+
+
+def dense_stack_forward(weights, X):
+    """Evaluates a Dense stack on X: (N, features) -> (N, outputs), like model.predict(X)."""
+    out = np.asarray(X, dtype=np.float32)
+    for layer in weights['layers']:
+        out = _activation(layer['activation'])(out @ layer['kernel'] + layer['bias'])
+    return out
+
+
+# --- .npz EXPORT ---
+
+def file_sha1(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def npz_path_for(model_path):
+    """daily_model_station_X.h5 -> daily_model_station_X.npz (next to the source model)."""
+    return os.path.splitext(model_path)[0] + '.npz'
+
+
+def save_weights_npz(weights, path, source_sha1):
+    """
+    Writes weights from extract_lstm_dense / extract_dense_stack to an .npz,
+    recording the SHA-1 of the .h5 they came from and the Keras version they
+    were extracted with.
+    """
+    arrays = {}
+    if 'layers' in weights:
+        meta = {'type': 'dense_stack', 'activations': [layer['activation'] for layer in weights['layers']],
+                'keras_version': weights.get('keras_version')}
+        for i, layer in enumerate(weights['layers']):
+            arrays[f'kernel_{i}'] = layer['kernel']
+            arrays[f'bias_{i}'] = layer['bias']
+    else:
+        meta = {'type': 'lstm_dense'}
+        for name, value in weights.items():
+            if isinstance(value, np.ndarray):
+                arrays[name] = value
+            else:
+                meta[name] = value
+    meta['source_sha1'] = source_sha1
+    np.savez(path, __meta__=np.array(json.dumps(meta)), **arrays)
+
+
+def load_weights_npz(path):
+    """
+    Reads an .npz written by save_weights_npz back into a weights dict (plus
+    'source_sha1'). Activations are resolved with the Keras version in the
+    export's metadata, so loading never needs Keras or TensorFlow.
+    """
+    with np.load(path, allow_pickle=False) as data:
+        meta = json.loads(str(data['__meta__']))
+        keras_version = meta.get('keras_version')
+        if meta.pop('type') == 'dense_stack':
+            weights = {'layers': [
+                {'kernel': data[f'kernel_{i}'], 'bias': data[f'bias_{i}'], 'activation': _keras_activation(activation, keras_version)}
+                for i, activation in enumerate(meta['activations'])
+            ]}
+            weights['source_sha1'] = meta['source_sha1']
+            weights['keras_version'] = keras_version
+            return weights
+        weights = {name: data[name] for name in data.files if name != '__meta__'}
+    weights.update(meta)
+    for name in ('activation', 'recurrent_activation', 'dense_activation'):
+        weights[name] = _keras_activation(weights[name], keras_version)
+    return weights
+
+
+def load_fresh_npz(model_path):
+    """
+    Returns the exported weights for a .h5 model if its .npz exists and was
+    exported from the current .h5 contents; None otherwise.
+    """
+    path = npz_path_for(model_path)
+    if not os.path.exists(path):
+        return None
+    try:
+        weights = load_weights_npz(path)
+    except Exception as e:
+        print(f"⚠️ Could not read exported weights {path}: {e}")
+        return None
+    if not os.path.exists(model_path) or weights.get('source_sha1') != file_sha1(model_path):
+        print(f"⚠️ Exported weights {os.path.basename(path)} are stale; re-run `python -m models.export_weights`.")
+        return None
+    return weights
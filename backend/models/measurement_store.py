@@ -0,0 +1,299 @@
+# models/measurement_store.py
+import pandas as pd
+import sqlite3
+import os
+
+# --- Build Absolute Paths ---
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(SCRIPT_DIR)
+
+# --- CONFIGURATION (Using Absolute Paths) ---
+DB_PATH = os.path.join(BACKEND_DIR, "database/water_quality.db")
+WIDE_TABLE_NAME = "water_records"
+STATIONS_TABLE = "stations"
+PARAMETERS_TABLE = "parameters"
+MEASUREMENTS_TABLE = "measurements"
+# Wide-shaped view over the long store, same columns as water_records
+WIDE_VIEW_NAME = "water_records_wide"
+# Latest water_records row per station, kept current by the ingest pipeline
+LATEST_TABLE_NAME = "station_latest"
+WIDE_INDEX_NAME = "idx_water_records_station_ts"
+# Parameter-first index for range scans across all stations (read_parameter_series)
+PARAMETER_INDEX_NAME = "idx_measurements_parameter_ts"
+META_COLS = ['stationId', 'stationName', 'location', 'timestamp', 'timestampDate', 'id']
+
+
+def to_epoch_seconds(timestamps):
+    """Converts timestamp strings/datetimes to integer epoch seconds (the stored 'ts')."""
+    parsed = pd.to_datetime(timestamps, errors='coerce')
+    return (parsed - pd.Timestamp("1970-01-01")) // pd.Timedelta(seconds=1)
+
+
+def ensure_measurement_store(con):
+    """
+    Creates the long-format store: station/parameter dictionaries with integer
+    keys and a WITHOUT ROWID measurements table clustered on (station, parameter, ts).
+    The first time it is created next to an existing water_records table, the
+    wide history is copied in once (flagged backfilled, see backfill_from_wide_table).
+    """
+    con.execute(f"""
+    CREATE TABLE IF NOT EXISTS "{STATIONS_TABLE}" (
+        "station_key" INTEGER PRIMARY KEY,
+        "stationId" TEXT NOT NULL UNIQUE
+    );
+    """)
+    con.execute(f"""
+    CREATE TABLE IF NOT EXISTS "{PARAMETERS_TABLE}" (
+        "parameter_key" INTEGER PRIMARY KEY,
+        "name" TEXT NOT NULL UNIQUE
+    );
+    """)
+    con.execute(f"""
+    CREATE TABLE IF NOT EXISTS "{MEASUREMENTS_TABLE}" (
+        "station_key" INTEGER NOT NULL,
+        "parameter_key" INTEGER NOT NULL,
+        "ts" INTEGER NOT NULL,
+        "value" REAL NOT NULL,
+        "backfilled" INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY ("station_key", "parameter_key", "ts")
+    ) WITHOUT ROWID;
+    """)
+    measurement_cols = [row[1] for row in con.execute(f'PRAGMA table_info("{MEASUREMENTS_TABLE}")').fetchall()]
+    if "backfilled" not in measurement_cols:
+        # Store created before the flag: its copied and measured rows cannot be told
+        # apart, so all are flagged; the next measured sample of a key clears it
+        print(f"Adding the 'backfilled' flag to '{MEASUREMENTS_TABLE}' (one-time)...")
+        con.execute(f'ALTER TABLE "{MEASUREMENTS_TABLE}" ADD COLUMN "backfilled" INTEGER NOT NULL DEFAULT 0')
+        con.execute(f'UPDATE "{MEASUREMENTS_TABLE}" SET "backfilled" = 1')
+    con.execute(f'CREATE INDEX IF NOT EXISTS "{PARAMETER_INDEX_NAME}" ON "{MEASUREMENTS_TABLE}" ("parameter_key", "ts")')
+    if con.execute(f'SELECT 1 FROM "{MEASUREMENTS_TABLE}" LIMIT 1').fetchone() is None:
+        backfill_from_wide_table(con)
+    if con.execute("SELECT 1 FROM sqlite_master WHERE type = 'view' AND name = ?", (WIDE_VIEW_NAME,)).fetchone() is None:
+        refresh_wide_view(con)
+
+
+def backfill_from_wide_table(con):
+    """
+    One-time copy of water_records into the long store. water_records holds
+    clean_and_fill's output, where missing readings were replaced by station or
+    global means, and those imputed values cannot be told apart from measured
+    ones any more. Every copied value is therefore stored with backfilled = 1:
+    read_parameter_series(include_backfilled=False) leaves them out, and a
+    measured sample for the same key (append_samples) replaces the value and
+    clears the flag. The wide view (water_records_wide, read by the batch jobs
+    in full-resolution mode through models.data_access) keeps them, so the jobs
+    see the same history water_records gives them outside that mode.
+    """
+    table_info = con.execute(f'PRAGMA table_info("{WIDE_TABLE_NAME}")').fetchall()
+    param_cols = [
+        row[1] for row in table_info
+        if row[1] not in META_COLS and any(t in (row[2] or '').upper() for t in ('REAL', 'INT', 'FLOAT', 'NUM', 'DOUBLE'))
+    ]
+    if not param_cols:
+        return
+    print(f"Backfilling '{MEASUREMENTS_TABLE}' from '{WIDE_TABLE_NAME}' (one-time)...")
+    con.execute(f"""
+    INSERT OR IGNORE INTO "{STATIONS_TABLE}" ("stationId")
+    SELECT DISTINCT CAST("stationId" AS TEXT) FROM "{WIDE_TABLE_NAME}" WHERE "stationId" IS NOT NULL
+    """)
+    con.executemany(f'INSERT OR IGNORE INTO "{PARAMETERS_TABLE}" ("name") VALUES (?)', [(col,) for col in param_cols])
+    for col in param_cols:
+        con.execute(f"""
+        INSERT OR IGNORE INTO "{MEASUREMENTS_TABLE}" ("station_key", "parameter_key", "ts", "value", "backfilled")
+        SELECT s."station_key", p."parameter_key", CAST(strftime('%s', w."timestampDate") AS INTEGER), w."{col}", 1
+        FROM "{WIDE_TABLE_NAME}" w
+        JOIN "{STATIONS_TABLE}" s ON s."stationId" = CAST(w."stationId" AS TEXT)
+        JOIN "{PARAMETERS_TABLE}" p ON p."name" = ?
+        WHERE w."{col}" IS NOT NULL AND strftime('%s', w."timestampDate") IS NOT NULL
+        """, (col,))
+    refresh_wide_view(con)
+
+
+def refresh_wide_view(con):
+    """
+    (Re)creates the wide compatibility view from the parameter dictionary.
+    Adding a parameter only changes this view, never a table schema.
+    """
+    parameters = con.execute(f'SELECT "parameter_key", "name" FROM "{PARAMETERS_TABLE}" ORDER BY "name"').fetchall()
+    pivot_cols = ''.join(
+        f',\n        MAX(CASE WHEN m."parameter_key" = {key} THEN m."value" END) AS "{name}"'
+        for key, name in parameters
+    )
+    con.execute(f'DROP VIEW IF EXISTS "{WIDE_VIEW_NAME}"')
+    con.execute(f"""
+    CREATE VIEW "{WIDE_VIEW_NAME}" AS
+    SELECT
+        s."stationId" AS "stationId",
+        strftime('%Y-%m-%d %H:%M:%S', m."ts", 'unixepoch') AS "timestamp",
+        strftime('%Y-%m-%dT%H:%M:%S', m."ts", 'unixepoch') AS "timestampDate"{pivot_cols}
+    FROM "{MEASUREMENTS_TABLE}" m
+    JOIN "{STATIONS_TABLE}" s ON s."station_key" = m."station_key"
+    GROUP BY m."station_key", m."ts"
+    """)
+
+
+def _lookup_keys(con, table, key_col, name_col, names):
+    """Returns {name: key} for names, inserting any that are not in the dictionary yet."""
+    con.executemany(f'INSERT OR IGNORE INTO "{table}" ("{name_col}") VALUES (?)', [(n,) for n in names])
+    placeholders = ', '.join(['?'] * len(names))
+    rows = con.execute(f'SELECT "{name_col}", "{key_col}" FROM "{table}" WHERE "{name_col}" IN ({placeholders})', list(names))
+    return dict(rows.fetchall())
+
+
+def append_samples(con, samples: pd.DataFrame):
+    """
+    Appends long-format samples (stationId, parameter, timestampDate, value)
+    to the store, deduplicated on (station, parameter, ts): repeats within the
+    batch keep the last value, and stored samples are only rewritten when the
+    value changed or was backfilled (the measured value replaces it and the
+    flag is cleared). New parameters are added to the dictionary and the wide
+    view is refreshed. Returns the number of samples inserted or changed.
+    """
+    ensure_measurement_store(con)
+    samples = samples[['stationId', 'parameter', 'timestampDate', 'value']].copy()
+    samples['value'] = pd.to_numeric(samples['value'], errors='coerce')
+    samples['ts'] = to_epoch_seconds(samples['timestampDate'])
+    samples['stationId'] = samples['stationId'].astype(str)
+    samples = samples.dropna(subset=['value', 'ts']).drop_duplicates(['stationId', 'parameter', 'ts'], keep='last')
+    if samples.empty:
+        return 0
+
+    known_params = {row[0] for row in con.execute(f'SELECT "name" FROM "{PARAMETERS_TABLE}"')}
+    new_params = sorted(set(samples['parameter']) - known_params)
+
+    station_keys = _lookup_keys(con, STATIONS_TABLE, 'station_key', 'stationId', sorted(samples['stationId'].unique()))
+    parameter_keys = _lookup_keys(con, PARAMETERS_TABLE, 'parameter_key', 'name', sorted(samples['parameter'].unique()))
+
+    rows = zip(
+        samples['stationId'].map(station_keys).tolist(),
+        samples['parameter'].map(parameter_keys).tolist(),
+        samples['ts'].astype('int64').tolist(),
+        samples['value'].astype(float).tolist()
+    )
+    changes_before = con.total_changes
+    con.executemany(f"""
+    INSERT INTO "{MEASUREMENTS_TABLE}" ("station_key", "parameter_key", "ts", "value") VALUES (?, ?, ?, ?)
+    ON CONFLICT ("station_key", "parameter_key", "ts") DO UPDATE SET "value" = excluded."value", "backfilled" = 0
+    WHERE "value" IS NOT excluded."value" OR "backfilled" = 1
+    """, rows)
+    written = con.total_changes - changes_before
+    if new_params:
+        print(f"New parameters added to the measurement store: {', '.join(new_params)}")
+        refresh_wide_view(con)
+    return written
+
+
+def store_measurements(con, df: pd.DataFrame, param_cols):
+    """
+    Upserts the non-null parameter values of a wide batch (stationId,
+    timestampDate, <param columns>) into the long store (see append_samples).
+    Pass the values as measured: the store holds no NaN-filled values.
+    Returns the number of measurements inserted or changed.
+    """
+    long_df = df[['stationId', 'timestampDate'] + list(param_cols)].melt(
+        id_vars=['stationId', 'timestampDate'], var_name='parameter', value_name='value'
+    )
+    return append_samples(con, long_df)
+
+
+def ensure_station_latest(con):
+    """
+    Migration step for the latest-reading lookup: indexes water_records on
+    (stationId, timestampDate) and creates station_latest (one row per station,
+    same columns as water_records), populating it once from the full table.
+    Returns False if water_records does not exist yet.
+    """
+    table_info = con.execute(f'PRAGMA table_info("{WIDE_TABLE_NAME}")').fetchall()
+    if not table_info:
+        return False
+    con.execute(f'CREATE INDEX IF NOT EXISTS "{WIDE_INDEX_NAME}" ON "{WIDE_TABLE_NAME}" ("stationId", "timestampDate")')
+
+    latest_exists = con.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (LATEST_TABLE_NAME,)
+    ).fetchone() is not None
+    if latest_exists:
+        return True
+
+    print(f"Creating '{LATEST_TABLE_NAME}' from '{WIDE_TABLE_NAME}' (one-time)...")
+    col_defs = ', '.join(
+        f'"{name}" TEXT PRIMARY KEY' if name == 'stationId' else f'"{name}" {col_type}'
+        for _, name, col_type, *_ in table_info
+    )
+    con.execute(f'CREATE TABLE "{LATEST_TABLE_NAME}" ({col_defs})')
+    quoted_cols = ', '.join(f't1."{row[1]}"' for row in table_info)
+    con.execute(f"""
+    INSERT OR REPLACE INTO "{LATEST_TABLE_NAME}"
+    SELECT {quoted_cols} FROM "{WIDE_TABLE_NAME}" t1 INNER JOIN (
+        SELECT "stationId", MAX("timestampDate") AS MaxTimestamp FROM "{WIDE_TABLE_NAME}" GROUP BY "stationId"
+    ) t2 ON t1."stationId" = t2."stationId" AND t1."timestampDate" = t2.MaxTimestamp
+    """)
+    return True
+
+
+def refresh_station_latest(con, station_ids):
+    """
+    Re-points station_latest at the newest water_records row of each given
+    station. Run after a batch is written, inside the same transaction.
+    """
+    if not ensure_station_latest(con):
+        return
+    latest_cols = [row[1] for row in con.execute(f'PRAGMA table_info("{LATEST_TABLE_NAME}")').fetchall()]
+    quoted_cols = ', '.join(f'"{col}"' for col in latest_cols)
+    con.executemany(f"""
+    INSERT OR REPLACE INTO "{LATEST_TABLE_NAME}" ({quoted_cols})
+    SELECT {quoted_cols} FROM "{WIDE_TABLE_NAME}"
+    WHERE "stationId" = ? ORDER BY "timestampDate" DESC LIMIT 1
+    """, [(str(sid),) for sid in set(station_ids)])
+
+
+def run_migrations(db_path=DB_PATH):
+    """Creates/backfills the long-format store and the latest-reading table."""
+    con = sqlite3.connect(db_path)
+    try:
+        ensure_measurement_store(con)
+        ensure_station_latest(con)
+        con.commit()
+        print("✅ Database migrations complete.")
+    finally:
+        con.close()
+
+
+def read_parameter_series(parameter, station_id=None, start=None, end=None, db_path=DB_PATH, include_backfilled=True):
+    """
+    Range-scans one parameter (optionally one station and a time window) from
+    the long store. Returns a DataFrame with stationId, timestampDate and value.
+    include_backfilled=False returns measured samples only, without the values
+    copied from water_records (which may be imputed, see backfill_from_wide_table).
+    """
+    query = f"""
+    SELECT s."stationId" AS "stationId", m."ts" AS "ts", m."value" AS "value"
+    FROM "{MEASUREMENTS_TABLE}" m
+    JOIN "{STATIONS_TABLE}" s ON s."station_key" = m."station_key"
+    JOIN "{PARAMETERS_TABLE}" p ON p."parameter_key" = m."parameter_key"
+    WHERE p."name" = ?
+    """
+    params = [parameter]
+    if not include_backfilled:
+        query += ' AND m."backfilled" = 0'
+    if station_id is not None:
+        query += ' AND s."stationId" = ?'
+        params.append(str(station_id))
+    if start is not None:
+        query += ' AND m."ts" >= ?'
+        params.append(int(to_epoch_seconds(pd.Series([start])).iloc[0]))
+    if end is not None:
+        query += ' AND m."ts" <= ?'
+        params.append(int(to_epoch_seconds(pd.Series([end])).iloc[0]))
+    query += ' ORDER BY m."station_key", m."ts"'
+
+    con = sqlite3.connect(db_path)
+    try:
+        df = pd.read_sql_query(query, con, params=params)
+    finally:
+        con.close()
+    df['timestampDate'] = pd.to_datetime(df.pop('ts'), unit='s')
+    return df[['stationId', 'timestampDate', 'value']]
+
+
+if __name__ == "__main__":
+    run_migrations()
@@ -0,0 +1,276 @@
+# models/model_registry.py
+import os
+import re
+import json
+import time
+import threading
+import warnings
+from collections import OrderedDict
+from models.incremental import file_digest
+
+# --- Build Absolute Paths ---
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(SCRIPT_DIR)
+
+# --- CONFIGURATION (Using Absolute Paths) ---
+MODEL_KINDS = {
+    "daily": {
+        "dir": os.path.join(BACKEND_DIR, "models_store/lstm_daily"),
+        "features_file": "daily_features.json",
+    },
+    "weekly": {
+        "dir": os.path.join(BACKEND_DIR, "models_store/lstm_weekly"),
+        "features_file": "weekly_features.json",
+    },
+}
+# Max (model, scaler) pairs kept in memory per process
+MODEL_CACHE_SIZE = int(os.environ.get("MODEL_CACHE_SIZE", 64))
+
+_index = {}                  # kind -> {station_id: {"model_path", "scaler_path"}}
+_features = {}               # kind -> feature list
+_loaded = OrderedDict()      # (kind, station_id, mtime_ns) -> {"model", "scaler", "metadata"}
+_registry_lock = threading.Lock()
+_load_locks = {}             # (kind, station_id) -> lock, so a model is loaded once even under threads
+_exported = {}               # (kind, station_id, mtime_ns) -> weights from a fresh .npz export (or None)
+_scalers = {}                # (kind, station_id, mtime_ns) -> scaler loaded without the Keras model
+_extracted = {}              # (kind, station_id, mtime_ns) -> weights extracted from the loaded Keras model
+
+
+def _file_pattern(kind):
+    return re.compile(rf"^{kind}_model_station_(.+)\.h5$")
+
+
+def _build_index(kind):
+    """Scans the kind's model directory once for model/scaler pairs."""
+    model_dir = MODEL_KINDS[kind]["dir"]
+    pattern = _file_pattern(kind)
+    stations = {}
+    try:
+        file_names = os.listdir(model_dir)
+    except FileNotFoundError:
+        print(f"⚠️ Model directory not found: {model_dir}")
+        file_names = []
+    for file_name in file_names:
+        match = pattern.match(file_name)
+        if not match:
+            continue
+        station_id = match.group(1)
+        scaler_path = os.path.join(model_dir, f"{kind}_scaler_station_{station_id}.pkl")
+        if os.path.exists(scaler_path):
+            stations[station_id] = {
+                "model_path": os.path.join(model_dir, file_name),
+                "scaler_path": scaler_path,
+            }
+    return stations
+
+
+def _get_index(kind):
+    if kind not in MODEL_KINDS:
+        raise ValueError(f"Unknown model kind '{kind}'. Available: {', '.join(MODEL_KINDS)}")
+    with _registry_lock:
+        if kind not in _index:
+            _index[kind] = _build_index(kind)
+        return _index[kind]
+
+
+def list_stations(kind):
+    """Station ids that have both a model and a scaler for this kind."""
+    return sorted(_get_index(kind))
+
+
+def has_model(kind, station_id):
+    return str(station_id) in _get_index(kind)
+
+
+def get_features(kind):
+    """Feature list the kind's models were trained on ([] if it cannot be read)."""
+    with _registry_lock:
+        if kind not in _features:
+            path = os.path.join(MODEL_KINDS[kind]["dir"], MODEL_KINDS[kind]["features_file"])
+            try:
+                with open(path, 'r') as f:
+                    _features[kind] = json.load(f)
+            except Exception as e:
+                print(f"🔴 {kind.capitalize()} features NOT loaded: {e}")
+                _features[kind] = []
+        return _features[kind]
+
+
+def file_hash(kind, station_id):
+    """Hash of the station's model, scaler and the kind's features file."""
+    paths = _get_index(kind).get(str(station_id))
+    features_path = os.path.join(MODEL_KINDS[kind]["dir"], MODEL_KINDS[kind]["features_file"])
+    if paths is None:
+        return file_digest(features_path) + ":no-model"
+    return file_digest(paths["model_path"], paths["scaler_path"], features_path)
+
+
+def get_model(kind, station_id):
+    """
+    Returns (model, scaler) for a station, loading them on first use and
+    keeping the most recently used MODEL_CACHE_SIZE pairs in memory.
+    Raises KeyError if the station has no model of this kind.
+    """
+    station_id = str(station_id)
+    paths = _get_index(kind).get(station_id)
+    if paths is None:
+        raise KeyError(f"No {kind} model/scaler for station {station_id}")
+    key = (kind, station_id, os.stat(paths["model_path"]).st_mtime_ns)
+
+    with _registry_lock:
+        entry = _loaded.get(key)
+        if entry is not None:
+            _loaded.move_to_end(key)
+            return entry["model"], entry["scaler"]
+        load_lock = _load_locks.setdefault((kind, station_id), threading.Lock())
+
+    with load_lock:
+        with _registry_lock:
+            entry = _loaded.get(key)
+        if entry is None:
+            entry = _load_entry(kind, station_id, paths)
+            with _registry_lock:
+                for stale_key in [k for k in _loaded if k[:2] == (kind, station_id)]:
+                    del _loaded[stale_key]
+                _loaded[key] = entry
+                while len(_loaded) > MODEL_CACHE_SIZE:
+                    _loaded.popitem(last=False)
+    return entry["model"], entry["scaler"]
+
+
+def _load_entry(kind, station_id, paths):
+    # TensorFlow is imported on first load, not when the registry is imported
+    import joblib
+    from tensorflow.keras.models import load_model
+
+    start = time.perf_counter()
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        model = load_model(paths["model_path"], compile=False)
+    scaler = joblib.load(paths["scaler_path"])
+    metadata = {
+        "kind": kind,
+        "stationId": station_id,
+        "model_path": paths["model_path"],
+        "scaler_path": paths["scaler_path"],
+        "features": get_features(kind),
+        "file_hash": file_hash(kind, station_id),
+        "loaded_at": time.strftime('%Y-%m-%dT%H:%M:%S'),
+        "load_seconds": round(time.perf_counter() - start, 3),
+    }
+    return {"model": model, "scaler": scaler, "metadata": metadata}
+
+
+def get_exported_weights(kind, station_id):
+    """
+    Weights from the station's .npz export (models/export_weights.py) if it
+    matches the current .h5, else None. Needs no TensorFlow.
+    """
+    from models.lstm_engine import load_fresh_npz
+
+    station_id = str(station_id)
+    paths = _get_index(kind).get(station_id)
+    if paths is None:
+        return None
+    key = (kind, station_id, os.stat(paths["model_path"]).st_mtime_ns)
+    with _registry_lock:
+        if key in _exported:
+            return _exported[key]
+    weights = load_fresh_npz(paths["model_path"])
+    with _registry_lock:
+        _exported[key] = weights
+    return weights
+
+
+def get_scaler(kind, station_id):
+    """The station's scaler alone (for NumPy inference, without loading the Keras model)."""
+    import joblib
+
+    station_id = str(station_id)
+    paths = _get_index(kind).get(station_id)
+    if paths is None:
+        raise KeyError(f"No {kind} model/scaler for station {station_id}")
+    key = (kind, station_id, os.stat(paths["scaler_path"]).st_mtime_ns)
+    with _registry_lock:
+        scaler = _scalers.get(key)
+    if scaler is None:
+        scaler = joblib.load(paths["scaler_path"])
+        with _registry_lock:
+            _scalers[key] = scaler
+    return scaler
+
+
+def get_lstm_weights(kind, station_id):
+    """
+    NumPy weights of a station's LSTM+Dense model (see models.lstm_engine):
+    the .npz export when it is current, otherwise extracted once from the
+    loaded Keras model. Raises ValueError for other architectures.
+    """
+    from models.lstm_engine import extract_lstm_dense
+
+    weights = get_exported_weights(kind, station_id)
+    if weights is not None:
+        return weights
+
+    station_id = str(station_id)
+    paths = _get_index(kind).get(station_id)
+    if paths is None:
+        raise KeyError(f"No {kind} model/scaler for station {station_id}")
+    key = (kind, station_id, os.stat(paths["model_path"]).st_mtime_ns)
+    with _registry_lock:
+        weights = _extracted.get(key)
+        if weights is not None:
+            return weights
+        load_lock = _load_locks.setdefault((kind, station_id), threading.Lock())
+
+    # Extracted weights are small and kept apart from the model LRU, so an
+    # evicted model does not take them along (and they are never written
+    # into a shared entry)
+    model, _ = get_model(kind, station_id)
+    with load_lock:
+        with _registry_lock:
+            weights = _extracted.get(key)
+        if weights is None:
+            weights = extract_lstm_dense(model)
+            with _registry_lock:
+                for stale_key in [k for k in _extracted if k[:2] == (kind, station_id)]:
+                    del _extracted[stale_key]
+                _extracted[key] = weights
+    return weights
+
+
+def get_metadata(kind, station_id):
+    """
+    Metadata for a station's model: paths, feature list and file hash, plus
+    load time once it has been loaded in this process. None if there is no model.
+    """
+    station_id = str(station_id)
+    paths = _get_index(kind).get(station_id)
+    if paths is None:
+        return None
+    with _registry_lock:
+        for key, entry in _loaded.items():
+            if key[:2] == (kind, station_id):
+                return dict(entry["metadata"])
+    return {
+        "kind": kind,
+        "stationId": station_id,
+        "model_path": paths["model_path"],
+        "scaler_path": paths["scaler_path"],
+        "features": get_features(kind),
+        "file_hash": file_hash(kind, station_id),
+        "loaded_at": None,
+        "load_seconds": None,
+    }
+
+
+def clear_registry():
+    """Forgets the index and every loaded model (e.g. after retraining)."""
+    with _registry_lock:
+        _index.clear()
+        _features.clear()
+        _loaded.clear()
+        _load_locks.clear()
+        _exported.clear()
+        _scalers.clear()
+        _extracted.clear()
@@ -1,15 +1,17 @@
 # models/predictions.py
 import pandas as pd
 import numpy as np
-import sqlite3
 import plotly.graph_objects as go
-from sklearn.preprocessing import MinMaxScaler
-from tensorflow.keras.models import load_model
-import joblib
-import json
 import os
 import warnings
-from datetime import datetime, timedelta
+from datetime import timedelta
+from models.artifacts import write_compressed_variants
+from models.data_access import iter_station_views
+from models.incremental import run_incremental_per_station
+from models import model_registry
+from models.lstm_engine import (
+    stack_weights, stack_signature, stacked_forward, stacked_rollout, lstm_dense_forward, lstm_dense_rollout
+)
 
 # Suppress TensorFlow warnings
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'
@@ -26,29 +28,187 @@ WEEKLY_MODEL_DIR = os.path.join(BACKEND_DIR, "models_store/lstm_weekly")
 DB_PATH = os.path.join(BACKEND_DIR, "database/water_quality.db")
 STATIC_PRED_DIR = os.path.join(BACKEND_DIR, "static/predictions")
 SEQ_LENGTH = 10 
+WEEKLY_HORIZON = 7 # Days rolled out autoregressively by the weekly model
+JOB_VERSION = "1" # Bump to recompute every station after changing the prediction logic
+# All stations in one stacked NumPy pass (see predict_daily_batched / predict_weekly_batched)
+BATCHED_DAILY = os.environ.get("DAILY_BATCHED_INFERENCE", "0") == "1"
+BATCHED_WEEKLY = os.environ.get("WEEKLY_BATCHED_INFERENCE", "0") == "1"
 
 # --- (NEW) Ensure DB directory exists before loading features ---
 os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
 
-# --- Load features ---
-try:
-    with open(os.path.join(DAILY_MODEL_DIR, "daily_features.json"), 'r') as f:
-        DAILY_FEATURES = json.load(f)
+# --- Load features (models/scalers are loaded lazily through the registry) ---
+DAILY_FEATURES = model_registry.get_features("daily")
+if DAILY_FEATURES:
     print("✅ Daily features loaded.")
-except Exception as e:
-    print(f"🔴 Daily features NOT loaded: {e}")
-    DAILY_FEATURES = []
 
-try:
-    with open(os.path.join(WEEKLY_MODEL_DIR, "weekly_features.json"), 'r') as f:
-        WEEKLY_FEATURES = json.load(f)
+WEEKLY_FEATURES = model_registry.get_features("weekly")
+if WEEKLY_FEATURES:
     print("✅ Weekly features loaded.")
-except Exception as e:
-    print(f"🔴 Weekly features NOT loaded: {e}")
-    WEEKLY_FEATURES = []
 
 
-def create_daily_prediction_plots(output_json_dir=os.path.join(STATIC_PRED_DIR, "daily")):
+def get_forecaster(kind, station_id):
+    """
+    Returns (predict, scaler) for a station, where predict(X) behaves like
+    model.predict(X). Uses the NumPy engine when the model has a current .npz
+    export (no TensorFlow needed), otherwise the Keras model.
+    """
+    weights = model_registry.get_exported_weights(kind, station_id)
+    if weights is not None:
+        return (lambda X: lstm_dense_forward(weights, X)), model_registry.get_scaler(kind, station_id)
+    model, scaler = model_registry.get_model(kind, station_id)
+    return (lambda X: model.predict(X, verbose=0)), scaler
+
+
+def _keras_rollout(model, X, steps):
+    """
+    Autoregressive rollout through a Keras model: calls the model directly
+    (no per-call model.predict setup) on windows of a preallocated buffer.
+    """
+    n_seq, seq_length, n_features = X.shape
+    buffer = np.empty((n_seq, seq_length + steps, n_features), dtype=np.float32)
+    buffer[:, :seq_length] = X
+    outputs = np.empty((n_seq, steps, n_features), dtype=np.float32)
+    for step in range(steps):
+        outputs[:, step] = np.asarray(model(buffer[:, step:step + seq_length], training=False))
+        if step + 1 < steps:
+            buffer[:, seq_length + step] = outputs[:, step]
+    return outputs
+
+
+def get_rollout(kind, station_id):
+    """
+    Returns (rollout, scaler) for a station, where rollout(X, steps) feeds the
+    model its own predictions and returns (N, steps, features). NumPy engine
+    when a current .npz export exists, otherwise the Keras model.
+    """
+    weights = model_registry.get_exported_weights(kind, station_id)
+    if weights is not None:
+        return (lambda X, steps: lstm_dense_rollout(weights, X, steps)), model_registry.get_scaler(kind, station_id)
+    model, scaler = model_registry.get_model(kind, station_id)
+    return (lambda X, steps: _keras_rollout(model, X, steps)), scaler
+
+
+def _collect_stackable(kind, station_items, prepare, fallback):
+    """
+    Loads weights/scalers for a batched job and groups stations whose models
+    can share one stack. prepare(station_id, station_df, scaler) returns the
+    station's (context, scaled_input) or None; stations whose model cannot be
+    stacked get fallback(station_id, station_df).
+    Returns (results, groups) with groups: signature -> [(index, station_id, context, scaler, weights, X)].
+    """
+    results = [None] * len(station_items)
+    groups = {}
+    for i, (station_id, station_df) in enumerate(station_items):
+        if not model_registry.has_model(kind, station_id):
+            print(f"⏭️ Skipping {station_id} ({kind.capitalize()}): model or scaler file not found.")
+            continue
+        try:
+            weights = model_registry.get_lstm_weights(kind, station_id)
+            scaler = model_registry.get_scaler(kind, station_id)
+        except ValueError as e:
+            print(f"⚠️ {station_id} ({kind.capitalize()}): model cannot be stacked ({e}); predicting on its own.")
+            results[i] = fallback(station_id, station_df)
+            continue
+        except Exception as e:
+            print(f"🔴 ERROR loading model for {station_id} ({kind.capitalize()}): {e}")
+            continue
+
+        prepared = prepare(station_id, station_df, scaler)
+        if prepared is None:
+            continue
+        context, scaled_input = prepared
+        groups.setdefault(stack_signature(weights), []).append((i, station_id, context, scaler, weights, scaled_input))
+    return results, groups
+
+
+def _daily_input(station_id, station_df, scaler):
+    """Daily averages and the scaled last SEQ_LENGTH days for one station (None if too short)."""
+    dates = station_df['timestampDate'].dt.date.rename('date')
+    daily_avg = station_df.groupby(dates)[DAILY_FEATURES].mean().dropna().reset_index()
+
+    if len(daily_avg) < SEQ_LENGTH:
+        print(f"⏭️ Skipping {station_id} (Daily): not enough data in DB ({len(daily_avg)} days).")
+        return None
+
+    last_sequence_df = daily_avg.iloc[-SEQ_LENGTH:][DAILY_FEATURES]
+    return daily_avg, scaler.transform(last_sequence_df)
+
+
+def _write_daily_outputs(station_id, daily_avg, future_pred_inv, output_json_dir):
+    """Writes the daily plot JSON for one station and returns its summary row."""
+    actual_today_inv = daily_avg[DAILY_FEATURES].values[-1]
+    prediction_date = (daily_avg['date'].max() + timedelta(days=1)).strftime('%Y-%m-%d')
+
+    pred_dict = {'stationId': station_id, 'date': prediction_date}
+    pred_dict.update({param: future_pred_inv[i] for i, param in enumerate(DAILY_FEATURES)})
+
+    fig = go.Figure()
+    fig.add_trace(go.Bar(x=DAILY_FEATURES, y=actual_today_inv, name=f'Actual (Today)', marker_color='blue'))
+    fig.add_trace(go.Bar(x=DAILY_FEATURES, y=future_pred_inv, name=f'Predicted (Tomorrow)', marker_color='orange'))
+    fig.update_layout(
+        title=f"Station {station_id} - Daily Prediction for {prediction_date}",
+        barmode='group', xaxis_tickangle=-45
+    )
+    output_path = os.path.join(output_json_dir, f"daily_pred_station_{station_id}.json")
+    fig.write_json(output_path)
+    write_compressed_variants(output_path)
+    print(f"✅ Saved plot for {station_id} (Daily)")
+
+    return pred_dict
+
+
+def predict_daily_for_station(station_id, station_df, output_json_dir):
+    """Next-day prediction and plot for one station; returns its summary row (or None)."""
+    if not model_registry.has_model("daily", station_id):
+        print(f"⏭️ Skipping {station_id} (Daily): model or scaler file not found.")
+        return None
+
+    try:
+        predict, scaler = get_forecaster("daily", station_id)
+    except Exception as e:
+        print(f"🔴 ERROR loading model for {station_id} (Daily): {e}")
+        return None
+
+    prepared = _daily_input(station_id, station_df, scaler)
+    if prepared is None:
+        return None
+    daily_avg, last_sequence_scaled = prepared
+    X_pred = np.array([last_sequence_scaled])
+
+    with warnings.catch_warnings():
+         warnings.simplefilter("ignore")
+         future_pred_scaled = predict(X_pred)
+
+    future_pred_inv = scaler.inverse_transform(future_pred_scaled)
+    return _write_daily_outputs(station_id, daily_avg, future_pred_inv[0], output_json_dir)
+
+
+def predict_daily_batched(station_items, output_json_dir):
+    """
+    Next-day predictions for many stations with one stacked forward pass per
+    group of same-shaped models (see models.lstm_engine) instead of one
+    model.predict per station. Stations whose model cannot be stacked fall
+    back to predict_daily_for_station. Returns one summary row (or None) per station.
+    """
+    results, groups = _collect_stackable(
+        "daily", station_items, _daily_input,
+        fallback=lambda sid, df: predict_daily_for_station(sid, df, output_json_dir)
+    )
+    for members in groups.values():
+        stacked = stack_weights([member[4] for member in members])
+        future_pred_scaled = stacked_forward(stacked, np.stack([member[5] for member in members]))
+        print(f"   Predicted {len(members)} station(s) in one stacked pass.")
+        for (i, station_id, daily_avg, scaler, _, _), pred_scaled in zip(members, future_pred_scaled):
+            try:
+                future_pred_inv = scaler.inverse_transform(pred_scaled[None, :])
+                results[i] = _write_daily_outputs(station_id, daily_avg, future_pred_inv[0], output_json_dir)
+            except Exception as e:
+                print(f"🔴 ERROR processing station {station_id} in predict_daily_batched: {e}")
+    return results
+
+
+def create_daily_prediction_plots(output_json_dir=os.path.join(STATIC_PRED_DIR, "daily"), workers=None, batched=None):
     print("--- Starting Daily Prediction Batch Job ---")
     os.makedirs(output_json_dir, exist_ok=True)
     
@@ -56,83 +216,142 @@ def create_daily_prediction_plots(output_json_dir=os.path.join(STATIC_PRED_DIR,
         print("🔴 Cannot run daily predictions: feature list not loaded.")
         return
 
-    conn = None # Initialize conn
     try:
-        conn = sqlite3.connect(DB_PATH)
-        df = pd.read_sql_query("SELECT * FROM water_records", conn) # Read as text
-        df['timestampDate'] = pd.to_datetime(df['timestampDate'], errors='coerce') # Convert manually
+        station_views = list(iter_station_views(DB_PATH)) # Shared, typed frame (read once per run)
     except Exception as e:
         print(f"🔴 ERROR: Could not read from database. {e}")
         return # Exit if data can't be read
-    finally:
-        if conn: # Only close if connection was successful
-            conn.close()
-            
-    df['date'] = pd.to_datetime(df['timestampDate']).dt.date
-    stations = df['stationId'].unique()
-
-    all_daily_predictions = [] 
-
-    for station_id in stations:
-        model_path = os.path.join(DAILY_MODEL_DIR, f"daily_model_station_{station_id}.h5")
-        scaler_path = os.path.join(DAILY_MODEL_DIR, f"daily_scaler_station_{station_id}.pkl")
-        
-        if not (os.path.exists(model_path) and os.path.exists(scaler_path)):
-            print(f"⏭️ Skipping {station_id} (Daily): model or scaler file not found.")
-            continue
-            
-        try:
-            model = load_model(model_path, compile=False)
-            scaler = joblib.load(scaler_path)
-        except Exception as e:
-            print(f"🔴 ERROR loading model for {station_id} (Daily): {e}")
-            continue
 
-        station_df = df[df['stationId'] == station_id].sort_values('date')
-        daily_avg = station_df.groupby('date', as_index=False)[DAILY_FEATURES].mean().dropna()
-
-        if len(daily_avg) < SEQ_LENGTH:
-            print(f"⏭️ Skipping {station_id} (Daily): not enough data in DB ({len(daily_avg)} days).")
-            continue
-            
-        last_sequence_df = daily_avg.iloc[-SEQ_LENGTH:][DAILY_FEATURES]
-        last_sequence_scaled = scaler.transform(last_sequence_df)
-        X_pred = np.array([last_sequence_scaled])
-
-        with warnings.catch_warnings():
-             warnings.simplefilter("ignore")
-             future_pred_scaled = model.predict(X_pred)
-             
-        future_pred_inv = scaler.inverse_transform(future_pred_scaled)
-        actual_today_inv = daily_avg[DAILY_FEATURES].values[-1]
-        prediction_date = (daily_avg['date'].max() + timedelta(days=1)).strftime('%Y-%m-%d')
-        
-        pred_dict = {'stationId': station_id, 'date': prediction_date}
-        pred_dict.update({param: future_pred_inv[0][i] for i, param in enumerate(DAILY_FEATURES)})
-        all_daily_predictions.append(pred_dict)
-
-        fig = go.Figure()
-        fig.add_trace(go.Bar(x=DAILY_FEATURES, y=actual_today_inv, name=f'Actual (Today)', marker_color='blue'))
-        fig.add_trace(go.Bar(x=DAILY_FEATURES, y=future_pred_inv[0], name=f'Predicted (Tomorrow)', marker_color='orange'))
-        fig.update_layout(
-            title=f"Station {station_id} - Daily Prediction for {prediction_date}",
-            barmode='group', xaxis_tickangle=-45
-        )
-        output_path = os.path.join(output_json_dir, f"daily_pred_station_{station_id}.json")
-        fig.write_json(output_path)
-        print(f"✅ Saved plot for {station_id} (Daily)")
+    # Stations with unchanged readings and model files reuse last run's summary row
+    batched = BATCHED_DAILY if batched is None else batched
+    results = run_incremental_per_station(
+        "daily_predictions", predict_daily_batched if batched else predict_daily_for_station,
+        station_views, args=(output_json_dir,), workers=workers, batched=batched,
+        version=lambda sid: f"{JOB_VERSION}|{model_registry.file_hash('daily', sid)}",
+        outputs=lambda sid: [os.path.join(output_json_dir, f"daily_pred_station_{sid}.json")]
+    )
+    all_daily_predictions = [pred_dict for pred_dict in results if pred_dict is not None]
 
     if all_daily_predictions:
         summary_df = pd.DataFrame(all_daily_predictions)
         summary_path = os.path.join(STATIC_PRED_DIR, "daily_summary_predictions.json")
         summary_df.to_json(summary_path, orient="records")
+        write_compressed_variants(summary_path)
         print(f"✅ Saved daily summary table to: {summary_path}")
     print("--- Daily Prediction Batch Job Complete ---")
 
 
+def _weekly_input(station_id, station_df, scaler):
+    """Daily averages and the scaled last SEQ_LENGTH days for one station (None if too short)."""
+    dates = station_df['timestampDate'].dt.date.rename('date')
+    daily_avg = station_df.groupby(dates)[WEEKLY_FEATURES].mean().dropna().reset_index()
+
+    if len(daily_avg) < SEQ_LENGTH:
+        print(f"⏭️ Skipping {station_id} (Weekly): not enough data.")
+        return None
+
+    future_input_df = daily_avg.iloc[-SEQ_LENGTH:][WEEKLY_FEATURES]
+    return daily_avg, scaler.transform(future_input_df)
+
+
+def _write_weekly_outputs(station_id, daily_avg, predictions_inv, output_plot_dir, output_details_dir):
+    """Writes the weekly details table and plot for one station and returns its summary row."""
+    weekly_avg_pred = np.mean(predictions_inv, axis=0)
+
+    start_date = (daily_avg['date'].max() + timedelta(days=1))
+    end_date = (start_date + timedelta(days=WEEKLY_HORIZON - 1))
+
+    pred_dict = {'stationId': station_id, 'date': f"{start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}"} 
+    pred_dict.update({param: weekly_avg_pred[i] for i, param in enumerate(WEEKLY_FEATURES)})
+
+    pred_df = pd.DataFrame(predictions_inv, columns=WEEKLY_FEATURES).round(3)
+    stats_df = pd.DataFrame({
+        'Avg': pred_df.mean(),
+        'Min': pred_df.min(),
+        'Max': pred_df.max(),
+        'Std': pred_df.std()
+    }).T.round(3)
+
+    pred_df.index = [f"{(start_date + timedelta(days=i)).strftime('%Y-%m-%d')} (Day {i+1})" for i in range(WEEKLY_HORIZON)]
+    full_table_df = pd.concat([pred_df, stats_df])
+    details_path = os.path.join(output_details_dir, f"weekly_details_station_{station_id}.json")
+    full_table_df.to_json(details_path, orient="index") 
+    write_compressed_variants(details_path)
+    print(f"✅ Saved weekly DETAILS table for {station_id}")
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=WEEKLY_FEATURES, 
+        y=weekly_avg_pred,
+        name=f'Predicted Weekly Avg',
+        marker_color='red',
+        mode='lines+markers'
+    ))
+    fig.update_layout(
+        title=f"Station {station_id} - Predicted Weekly Average <br>({start_date.strftime('%b %d')} - {end_date.strftime('%b %d')})",
+        xaxis_tickangle=-45
+    )
+    output_path = os.path.join(output_plot_dir, f"weekly_pred_station_{station_id}.json")
+    fig.write_json(output_path)
+    write_compressed_variants(output_path)
+    print(f"✅ Saved weekly AVG plot for {station_id}")
+
+    return pred_dict
+
+
+def predict_weekly_for_station(station_id, station_df, output_plot_dir, output_details_dir):
+    """7-day rollout, details table and plot for one station; returns its summary row (or None)."""
+    if not model_registry.has_model("weekly", station_id):
+        print(f"⏭️ Skipping {station_id} (Weekly): model or scaler file not found.")
+        return None
+    try:
+        rollout, scaler = get_rollout("weekly", station_id)
+    except Exception as e:
+        print(f"🔴 ERROR loading model for {station_id} (Weekly): {e}")
+        return None
+
+    prepared = _weekly_input(station_id, station_df, scaler)
+    if prepared is None:
+        return None
+    daily_avg, future_input_scaled = prepared
+
+    # The whole horizon in one call (each day's prediction feeds the next)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        predictions_scaled = rollout(future_input_scaled[None], WEEKLY_HORIZON)[0]
+
+    predictions_inv = scaler.inverse_transform(predictions_scaled)
+    return _write_weekly_outputs(station_id, daily_avg, predictions_inv, output_plot_dir, output_details_dir)
+
+
+def predict_weekly_batched(station_items, output_plot_dir, output_details_dir):
+    """
+    7-day rollouts for many stations at once: stations with same-shaped
+    models are stacked and rolled out together (see models.lstm_engine).
+    Returns one summary row (or None) per station.
+    """
+    results, groups = _collect_stackable(
+        "weekly", station_items, _weekly_input,
+        fallback=lambda sid, df: predict_weekly_for_station(sid, df, output_plot_dir, output_details_dir)
+    )
+    for members in groups.values():
+        stacked = stack_weights([member[4] for member in members])
+        predictions_scaled = stacked_rollout(stacked, np.stack([member[5] for member in members]), WEEKLY_HORIZON)
+        print(f"   Rolled out {len(members)} station(s) in one stacked pass.")
+        for (i, station_id, daily_avg, scaler, _, _), station_pred in zip(members, predictions_scaled):
+            try:
+                predictions_inv = scaler.inverse_transform(station_pred)
+                results[i] = _write_weekly_outputs(station_id, daily_avg, predictions_inv, output_plot_dir, output_details_dir)
+            except Exception as e:
+                print(f"🔴 ERROR processing station {station_id} in predict_weekly_batched: {e}")
+    return results
+
+
 def create_weekly_prediction_plots(
     output_plot_dir=os.path.join(STATIC_PRED_DIR, "weekly"), 
-    output_details_dir=os.path.join(STATIC_PRED_DIR, "weekly_details")
+    output_details_dir=os.path.join(STATIC_PRED_DIR, "weekly_details"),
+    workers=None,
+    batched=None
 ):
     print("--- Starting Weekly Prediction Batch Job ---")
     os.makedirs(output_plot_dir, exist_ok=True)
@@ -142,100 +361,28 @@ def create_weekly_prediction_plots(
         print("🔴 Cannot run weekly predictions: feature list not loaded.")
         return
 
-    conn = None # Initialize conn
     try:
-        conn = sqlite3.connect(DB_PATH)
-        df = pd.read_sql_query("SELECT * FROM water_records", conn) # Read as text
-        df['timestampDate'] = pd.to_datetime(df['timestampDate'], errors='coerce') # Convert manually
+        station_views = list(iter_station_views(DB_PATH)) # Shared, typed frame (read once per run)
     except Exception as e:
         print(f"🔴 ERROR: Could not read from database. {e}")
         return # Exit if data can't be read
-    finally:
-        if conn: # Only close if connection was successful
-            conn.close()
-            
-    df['date'] = pd.to_datetime(df['timestampDate']).dt.date
-    stations = df['stationId'].unique()
-
-    all_weekly_predictions = [] 
-
-    for station_id in stations:
-        model_path = os.path.join(WEEKLY_MODEL_DIR, f"weekly_model_station_{station_id}.h5")
-        scaler_path = os.path.join(WEEKLY_MODEL_DIR, f"weekly_scaler_station_{station_id}.pkl")
-        
-        if not (os.path.exists(model_path) and os.path.exists(scaler_path)):
-            print(f"⏭️ Skipping {station_id} (Weekly): model or scaler file not found.")
-            continue
-        try:
-            model = load_model(model_path, compile=False)
-            scaler = joblib.load(scaler_path)
-        except Exception as e:
-            print(f"🔴 ERROR loading model for {station_id} (Weekly): {e}")
-            continue
 
-        station_df = df[df['stationId'] == station_id].sort_values('date')
-        daily_avg = station_df.groupby('date', as_index=False)[WEEKLY_FEATURES].mean().dropna()
-
-        if len(daily_avg) < SEQ_LENGTH:
-            print(f"⏭️ Skipping {station_id} (Weekly): not enough data.")
-            continue
-            
-        future_input_df = daily_avg.iloc[-SEQ_LENGTH:][WEEKLY_FEATURES]
-        future_input_scaled = scaler.transform(future_input_df)
-        predictions_scaled = []
-
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore")
-            for _ in range(7): 
-                X_pred = future_input_scaled.reshape((1, SEQ_LENGTH, len(WEEKLY_FEATURES)))
-                y_pred_scaled = model.predict(X_pred)[0]
-                predictions_scaled.append(y_pred_scaled)
-                future_input_scaled = np.vstack([future_input_scaled[1:], y_pred_scaled])
-
-        predictions_inv = scaler.inverse_transform(predictions_scaled)
-        weekly_avg_pred = np.mean(predictions_inv, axis=0)
-        
-        start_date = (daily_avg['date'].max() + timedelta(days=1))
-        end_date = (start_date + timedelta(days=6))
-        
-        pred_dict = {'stationId': station_id, 'date': f"{start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}"} 
-        pred_dict.update({param: weekly_avg_pred[i] for i, param in enumerate(WEEKLY_FEATURES)})
-        all_weekly_predictions.append(pred_dict)
-
-        pred_df = pd.DataFrame(predictions_inv, columns=WEEKLY_FEATURES).round(3)
-        stats_df = pd.DataFrame({
-            'Avg': pred_df.mean(),
-            'Min': pred_df.min(),
-            'Max': pred_df.max(),
-            'Std': pred_df.std()
-        }).T.round(3)
-        
-        pred_df.index = [f"{(start_date + timedelta(days=i)).strftime('%Y-%m-%d')} (Day {i+1})" for i in range(7)]
-        full_table_df = pd.concat([pred_df, stats_df])
-        details_path = os.path.join(output_details_dir, f"weekly_details_station_{station_id}.json")
-        full_table_df.to_json(details_path, orient="index") 
-        print(f"✅ Saved weekly DETAILS table for {station_id}")
-
-        fig = go.Figure()
-        fig.add_trace(go.Scatter(
-            x=WEEKLY_FEATURES, 
-            y=weekly_avg_pred,
-            name=f'Predicted Weekly Avg',
-            marker_color='red',
-            mode='lines+markers'
-        ))
-        fig.update_layout(
-            title=f"Station {station_id} - Predicted Weekly Average <br>({start_date.strftime('%b %d')} - {end_date.strftime('%b %d')})",
-            xaxis_tickangle=-45
-        )
-        output_path = os.path.join(output_plot_dir, f"weekly_pred_station_{station_id}.json")
-        fig.write_json(output_path)
-        print(f"✅ Saved weekly AVG plot for {station_id}")
+    # Stations with unchanged readings and model files reuse last run's summary row
+    batched = BATCHED_WEEKLY if batched is None else batched
+    results = run_incremental_per_station(
+        "weekly_predictions", predict_weekly_batched if batched else predict_weekly_for_station, station_views,
+        args=(output_plot_dir, output_details_dir), workers=workers, batched=batched,
+        version=lambda sid: f"{JOB_VERSION}|{model_registry.file_hash('weekly', sid)}",
+        outputs=lambda sid: [os.path.join(output_plot_dir, f"weekly_pred_station_{sid}.json"),
+                             os.path.join(output_details_dir, f"weekly_details_station_{sid}.json")]
+    )
+    all_weekly_predictions = [pred_dict for pred_dict in results if pred_dict is not None]
 
     if all_weekly_predictions:
         summary_df = pd.DataFrame(all_weekly_predictions)
         summary_path = os.path.join(STATIC_PRED_DIR, "weekly_summary_predictions.json")
         summary_df.to_json(summary_path, orient="records")
+        write_compressed_variants(summary_path)
         print(f"✅ Saved weekly summary table to: {summary_path}")
     print("--- Weekly Prediction Batch Job Complete ---")
 
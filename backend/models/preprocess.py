@@ -15,6 +15,118 @@ os.makedirs(DB_DIR, exist_ok=True)
 # --- END FIX ---
 
 TABLE_NAME = "water_records"
+# Running per-station/per-parameter sums and counts, kept in step with
+# water_records by update_pipeline so NaN filling never rescans history.
+STATS_TABLE_NAME = "parameter_stats"
+META_COLS = ['stationId', 'stationName', 'location', 'timestamp', 'timestampDate', 'id']
+
+def ensure_parameter_stats(con):
+    """
+    Creates the statistics table if needed, seeding it from the existing
+    water_records rows in the same step. Never commits: creation and seeding
+    belong to the caller's transaction (and are rolled back with it).
+    """
+    exists = con.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (STATS_TABLE_NAME,)
+    ).fetchone() is not None
+    if exists:
+        return
+    if not con.in_transaction:
+        con.execute("BEGIN") # So the CREATE below is not auto-committed ahead of the seed
+    con.execute(f"""
+    CREATE TABLE IF NOT EXISTS "{STATS_TABLE_NAME}" (
+        "stationId" TEXT,
+        "parameter" TEXT,
+        "total" REAL NOT NULL DEFAULT 0,
+        "count" INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY ("stationId", "parameter")
+    );
+    """)
+
+    table_info = con.execute(f'PRAGMA table_info("{TABLE_NAME}")').fetchall()
+    param_cols = [
+        row[1] for row in table_info
+        if row[1] not in META_COLS and any(t in (row[2] or '').upper() for t in ('REAL', 'INT', 'FLOAT', 'NUM', 'DOUBLE'))
+    ]
+    if not param_cols:
+        return
+    print(f"Seeding '{STATS_TABLE_NAME}' from existing '{TABLE_NAME}' rows (one-time)...")
+    for col in param_cols:
+        con.execute(f"""
+        INSERT OR REPLACE INTO "{STATS_TABLE_NAME}" ("stationId", "parameter", "total", "count")
+        SELECT CAST("stationId" AS TEXT), ?, TOTAL("{col}"), COUNT("{col}")
+        FROM "{TABLE_NAME}" GROUP BY "stationId"
+        """, (col,))
+
+def has_row_key(con):
+    """
+    True if water_records has a primary key or unique index on exactly
+    (stationId, timestampDate), i.e. INSERT OR REPLACE replaces rows. Tables
+    created by pandas to_sql (scripts/import_old_data.py) have none, and
+    there the insert appends.
+    """
+    key = {"stationId", "timestampDate"}
+    table_info = con.execute(f'PRAGMA table_info("{TABLE_NAME}")').fetchall()
+    if {row[1] for row in table_info if row[5]} == key:
+        return True
+    for index in con.execute(f'PRAGMA index_list("{TABLE_NAME}")').fetchall():
+        if index[2]: # unique
+            index_cols = {row[2] for row in con.execute(f'PRAGMA index_info("{index[1]}")').fetchall()}
+            if index_cols == key:
+                return True
+    return False
+
+def load_parameter_stats(con):
+    """Returns the running statistics as a DataFrame (stationId, parameter, total, count)."""
+    ensure_parameter_stats(con)
+    return pd.read_sql_query(f'SELECT "stationId", "parameter", "total", "count" FROM "{STATS_TABLE_NAME}"', con)
+
+def summarize_parameters(df: pd.DataFrame, param_cols):
+    """Per-station sum and count of the non-null values in param_cols (long format)."""
+    long_df = df.assign(stationId=df['stationId'].astype(str)).melt(
+        id_vars=['stationId'], value_vars=list(param_cols), var_name='parameter', value_name='value'
+    )
+    long_df['value'] = pd.to_numeric(long_df['value'], errors='coerce')
+    long_df = long_df.dropna(subset=['value'])
+    return long_df.groupby(['stationId', 'parameter'])['value'].agg(total='sum', count='count').reset_index()
+
+def update_parameter_stats(con, df_batch: pd.DataFrame, param_cols):
+    """
+    Adds a batch that is about to be written to water_records to the running
+    statistics, subtracting any existing rows the batch will replace.
+    Must run on the same connection (and transaction) as the insert, before it.
+    """
+    ensure_parameter_stats(con)
+    table_cols = {row[1] for row in con.execute(f'PRAGMA table_info("{TABLE_NAME}")').fetchall()}
+    param_cols = [col for col in param_cols if col in table_cols]
+    if not param_cols:
+        return
+
+    # Rows with the same key are replaced, so their old values leave the totals
+    # (without a unique key the insert appends, and nothing is replaced)
+    quoted_cols = ', '.join(f'"{col}"' for col in ['stationId'] + param_cols)
+    replaced_rows = []
+    batch_keys = df_batch[['stationId', 'timestampDate']].itertuples(index=False) if has_row_key(con) else []
+    for station_id, timestamp_date in batch_keys:
+        row = con.execute(
+            f'SELECT {quoted_cols} FROM "{TABLE_NAME}" WHERE "stationId" = ? AND "timestampDate" = ?',
+            (str(station_id), timestamp_date)
+        ).fetchone()
+        if row is not None:
+            replaced_rows.append(row)
+
+    delta = summarize_parameters(df_batch, param_cols)
+    if replaced_rows:
+        replaced = summarize_parameters(pd.DataFrame(replaced_rows, columns=['stationId'] + param_cols), param_cols)
+        replaced[['total', 'count']] *= -1
+        delta = pd.concat([delta, replaced]).groupby(['stationId', 'parameter'], as_index=False)[['total', 'count']].sum()
+
+    con.executemany(f"""
+    INSERT INTO "{STATS_TABLE_NAME}" ("stationId", "parameter", "total", "count") VALUES (?, ?, ?, ?)
+    ON CONFLICT ("stationId", "parameter") DO UPDATE SET
+        "total" = "total" + excluded."total",
+        "count" = "count" + excluded."count"
+    """, [(sid, param, float(total), int(count)) for sid, param, total, count in delta.itertuples(index=False)])
 
 def organize_records(df: pd.DataFrame):
     # Pivot: stationId + timestamp + timestampDate → columns = parameterName
@@ -51,32 +163,38 @@ def clean_and_fill(df_new: pd.DataFrame):
         print("🟡 No valid data remaining after timestamp parsing.")
         return df_new
 
-    # --- 1. Load historical data (for mean reference) ---
+    # --- 1. Load running statistics (for mean reference) ---
     try:
-        df_hist = pd.read_sql(f"SELECT * FROM {TABLE_NAME}", conn)
+        stats_df = load_parameter_stats(conn)
+        conn.commit() # This connection owns the statistics table if it created it here
     except Exception as e:
-        print(f"Warning: Could not load historical data for mean calc. {e}")
-        df_hist = pd.DataFrame()
+        print(f"Warning: Could not load parameter statistics for mean calc. {e}")
+        stats_df = pd.DataFrame(columns=['stationId', 'parameter', 'total', 'count'])
     finally:
         conn.close()
 
     # --- 2. Drop too-incomplete rows in new data ---
     df_new = df_new[df_new.isnull().sum(axis=1) <= 3].copy()
-    
-    numeric_cols = df_new.select_dtypes(include=['number']).columns
-
-    # --- 3. Combine historical + new (only for computing means) ---
-    if not df_hist.empty:
-        hist_numeric_cols = df_hist.select_dtypes(include=['number']).columns
-        # Ensure we only use common columns
-        common_cols = list(set(numeric_cols) & set(hist_numeric_cols))
-        combined = pd.concat([df_hist[common_cols], df_new[common_cols]], ignore_index=True)
-        col_means = combined.mean()
-    else:
-        col_means = df_new[numeric_cols].mean()
-
-    # --- 4. Fill missing numeric values in the new batch ---
-    df_new[numeric_cols] = df_new[numeric_cols].fillna(col_means)
+    if df_new.empty:
+        return df_new
+
+    numeric_cols = [c for c in df_new.select_dtypes(include=['number']).columns if c not in META_COLS]
+    if not numeric_cols:
+        return df_new
+
+    # --- 3. Combine historical + new statistics (only for computing means) ---
+    combined = pd.concat([stats_df, summarize_parameters(df_new, numeric_cols)], ignore_index=True)
+    combined = combined[combined['parameter'].isin(numeric_cols)]
+    # float: an empty statistics table has object columns, which would turn filled columns into objects
+    combined = combined.groupby(['stationId', 'parameter'])[['total', 'count']].sum().astype(float)
+    station_means = (combined['total'] / combined['count'].where(combined['count'] > 0)).unstack('parameter')
+    param_totals = combined.groupby(level='parameter').sum()
+    global_means = param_totals['total'] / param_totals['count'].where(param_totals['count'] > 0)
+
+    # --- 4. Fill missing numeric values: station mean first, then overall mean ---
+    row_station_means = station_means.reindex(index=df_new['stationId'].astype(str), columns=numeric_cols)
+    row_station_means.index = df_new.index
+    df_new[numeric_cols] = df_new[numeric_cols].fillna(row_station_means).fillna(global_means)
 
     # Note: Standardization is removed here.
     # Each model (classification, LSTM) should handle its own scaling
@@ -0,0 +1,132 @@
+# models/station_scheduler.py
+import os
+import time
+import threading
+import multiprocessing
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+
+# --- CONFIGURATION ---
+# Worker processes for per-station work (1 = run serially in this process)
+DEFAULT_WORKERS = int(os.environ.get("BATCH_WORKERS", os.cpu_count() or 1))
+# TensorFlow/BLAS threads per worker, so N workers don't oversubscribe the cores
+TF_THREADS_PER_WORKER = int(os.environ.get("TF_THREADS_PER_WORKER", 1))
+
+
+# Per-thread sink for per-station timings (set by the batch orchestrator)
+_timing_context = threading.local()
+
+
+@contextmanager
+def collect_station_timings():
+    """
+    Collects {station_id: seconds} for every run_per_station call made by the
+    current thread inside the block (repeated stations are summed).
+    """
+    timings = {}
+    previous = getattr(_timing_context, 'timings', None)
+    _timing_context.timings = timings
+    try:
+        yield timings
+    finally:
+        _timing_context.timings = previous
+
+
+# Set in each worker before the job's code runs (see _init_worker)
+WORKER_THREAD_VARS = ("TF_NUM_INTRAOP_THREADS", "TF_NUM_INTEROP_THREADS", "OMP_NUM_THREADS",
+                      "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS")
+
+# Optional: caps BLAS pools that are already loaded when the initializer runs
+try:
+    from threadpoolctl import threadpool_limits
+    THREADPOOLCTL_AVAILABLE = True
+except ImportError:
+    THREADPOOLCTL_AVAILABLE = False
+
+_shared_pool = None # Set by shared_worker_pool()
+
+
+def _init_worker(threads):
+    """
+    Pool initializer: caps the worker's math-library threads. The spawn
+    bootstrap may already have imported numpy (run_all_batch_jobs imports
+    pandas), so its BLAS pool is capped with threadpoolctl; TensorFlow, OpenMP
+    and matplotlib are first imported by the job code, after this has run, and
+    read the environment variables.
+    """
+    for var in WORKER_THREAD_VARS:
+        os.environ[var] = str(threads)
+    os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+    os.environ.setdefault("MPLBACKEND", "Agg") # Workers have no display
+    if THREADPOOLCTL_AVAILABLE:
+        threadpool_limits(limits=threads)
+
+
+def _new_pool(workers):
+    # Spawned (not forked) workers: TensorFlow state is not fork-safe
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                               initializer=_init_worker, initargs=(TF_THREADS_PER_WORKER,))
+
+
+@contextmanager
+def shared_worker_pool(workers=None):
+    """
+    One process pool for every run_per_station call inside the block, from
+    any thread: concurrent jobs share the workers, and the libraries and
+    models a worker has loaded are reused instead of loaded again per job.
+    """
+    global _shared_pool
+    workers = DEFAULT_WORKERS if workers is None else workers
+    if workers <= 1:
+        yield None
+        return
+    pool = _new_pool(workers)
+    _shared_pool = pool
+    try:
+        yield pool
+    finally:
+        _shared_pool = None
+        pool.shutdown()
+
+
+def _run_task(func, station_id, station_df, args):
+    """Returns (result, seconds) for one station."""
+    start = time.perf_counter()
+    try:
+        result = func(station_id, station_df, *args)
+    except Exception as e:
+        print(f"🔴 ERROR processing station {station_id} in {func.__name__}: {e}")
+        result = None
+    return result, time.perf_counter() - start
+
+
+def run_per_station(func, station_items, args=(), workers=None):
+    """
+    Runs func(station_id, station_df, *args) for every (station_id, station_df)
+    pair and returns the results in input order (None for stations that failed).
+    With more than one worker the stations are spread over a process pool
+    (the shared one inside shared_worker_pool, else one for this call);
+    func must then be a module-level function so workers can import it.
+    """
+    station_items = list(station_items)
+    workers = DEFAULT_WORKERS if workers is None else workers
+    workers = max(1, min(workers, len(station_items)))
+
+    station_ids = [station_id for station_id, _ in station_items]
+    if workers == 1:
+        outcomes = [_run_task(func, station_id, station_df, args) for station_id, station_df in station_items]
+    else:
+        print(f"   Running {len(station_items)} stations on {workers} worker processes ({TF_THREADS_PER_WORKER} thread(s) each)...")
+        n = len(station_items)
+        task_args = (_run_task, [func] * n, station_ids, [station_df for _, station_df in station_items], [args] * n)
+        if _shared_pool is not None:
+            outcomes = list(_shared_pool.map(*task_args))
+        else:
+            with _new_pool(workers) as pool:
+                outcomes = list(pool.map(*task_args))
+
+    timings = getattr(_timing_context, 'timings', None)
+    if timings is not None:
+        for station_id, (_, seconds) in zip(station_ids, outcomes):
+            timings[station_id] = timings.get(station_id, 0.0) + seconds
+    return [result for result, _ in outcomes]
@@ -10,6 +10,7 @@ import json
 import os
 import warnings
 from datetime import datetime
+from models.data_access import iter_station_slices
 
 warnings.filterwarnings("ignore")
 
@@ -42,7 +43,6 @@ def create_weekly_prediction_plots(db_path, output_json_dir):
         'Water Temperature', 'Water Turbidity', 'pH'
     ]
     parameter_cols = [p for p in all_params if p in df.columns]
-    stations = df['stationId'].unique()
     seq_length = 7 # 7 weeks
     epochs = 30
 
@@ -54,9 +54,8 @@ def create_weekly_prediction_plots(db_path, output_json_dir):
         return np.array(xs), np.array(ys)
 
     # --- 2. Loop through stations, train, predict, and save plot ---
-    for station_id in stations:
+    for station_id, station_df in iter_station_slices(df, sort_by=['timestampDate']):
         print(f"Processing station: {station_id}...")
-        station_df = df[df['stationId'] == station_id].sort_values('timestampDate')
         
         # Resample to weekly mean
         weekly_avg = station_df.set_index('timestampDate')[parameter_cols].resample('W').mean().reset_index()
@@ -1,19 +1,242 @@
 # run_all_batch_jobs.py
+import os
+import sys
+import json
 import time
-from models.daynight_analysis import run_day_night_analysis
-from models.anomaly_detection import run_anomaly_detection
-from models.predictions import create_daily_prediction_plots, create_weekly_prediction_plots
-from models.correlation_analysis import run_correlation_analysis # <-- (NEW) IMPORT
+import argparse
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from models.data_access import load_water_records, clear_cache, DB_PATH
+from models.station_scheduler import collect_station_timings, shared_worker_pool, DEFAULT_WORKERS
+from models import incremental
+
+# --- Build Absolute Paths ---
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# --- CONFIGURATION (Using Absolute Paths) ---
+REPORT_PATH = os.path.join(BACKEND_DIR, "reports/batch_run_report.json")
+DEFAULT_PARALLEL_JOBS = 3 # Jobs running at the same time (sharing the --workers processes)
+
+# --- JOB RUNNERS ---
+# Job modules are imported when their job runs, not when this script is imported:
+# spawned worker processes re-import this script, and only the workers of a job
+# that needs TensorFlow or matplotlib should pay for importing them.
+def _run_day_night(workers):
+    from models.daynight_analysis import run_day_night_analysis
+    return run_day_night_analysis(workers=workers)
+
+
+def _run_anomaly(workers):
+    from models.anomaly_detection import run_anomaly_detection
+    return run_anomaly_detection(workers=workers)
+
+
+def _run_daily_predictions(workers):
+    from models.predictions import create_daily_prediction_plots
+    return create_daily_prediction_plots(workers=workers)
+
+
+def _run_weekly_predictions(workers):
+    from models.predictions import create_weekly_prediction_plots
+    return create_weekly_prediction_plots(workers=workers)
+
+
+def _run_correlation(workers):
+    from models.correlation_analysis import run_correlation_analysis
+    return run_correlation_analysis(workers=workers)
+
+
+# --- JOB GRAPH ---
+# Each job declares what it reads and writes. A job waits for every selected
+# job that writes one of its inputs; jobs with no path between them run
+# concurrently. 'records_frame' is the shared in-memory read of water_records.
+JOBS = [
+    {
+        "name": "load_data",
+        "run": lambda workers: load_water_records(DB_PATH),
+        "inputs": ["database/water_quality.db"],
+        "outputs": ["records_frame"],
+    },
+    {
+        "name": "day_night",
+        "run": _run_day_night,
+        "inputs": ["records_frame"],
+        "outputs": ["static/daynight"],
+    },
+    {
+        "name": "anomaly",
+        "run": _run_anomaly,
+        "inputs": ["records_frame"],
+        "outputs": ["static/anomaly/anomaly_heatmap.json"],
+    },
+    {
+        "name": "daily_predictions",
+        "run": _run_daily_predictions,
+        "inputs": ["records_frame", "models_store/lstm_daily"],
+        "outputs": ["static/predictions/daily", "static/predictions/daily_summary_predictions.json"],
+    },
+    {
+        "name": "weekly_predictions",
+        "run": _run_weekly_predictions,
+        "inputs": ["records_frame", "models_store/lstm_weekly"],
+        "outputs": ["static/predictions/weekly", "static/predictions/weekly_details",
+                    "static/predictions/weekly_summary_predictions.json"],
+    },
+    {
+        "name": "correlation",
+        "run": _run_correlation,
+        "inputs": ["records_frame"],
+        "outputs": ["static/correlation"],
+    },
+]
+JOB_NAMES = [job["name"] for job in JOBS]
+
+
+def resolve_dependencies(jobs):
+    """Returns {job_name: set of job names it must wait for} among the given jobs."""
+    producers = {}
+    for job in jobs:
+        for output in job["outputs"]:
+            producers.setdefault(output, set()).add(job["name"])
+
+    deps = {}
+    for job in jobs:
+        deps[job["name"]] = {
+            producer for item in job["inputs"] for producer in producers.get(item, ())
+            if producer != job["name"]
+        }
+    return deps
+
+
+def select_jobs(only=None, skip=None):
+    """Filters JOBS by --only / --skip, keeping declaration order."""
+    unknown = [name for name in (only or []) + (skip or []) if name not in JOB_NAMES]
+    if unknown:
+        raise ValueError(f"Unknown job(s): {', '.join(unknown)}. Available: {', '.join(JOB_NAMES)}")
+    selected = [job for job in JOBS if not only or job["name"] in only]
+    return [job for job in selected if job["name"] not in (skip or [])]
+
+
+def _run_job(job, workers):
+    """Runs one job in the current thread and returns its report entry."""
+    started = datetime.now()
+    start = time.perf_counter()
+    entry = {"status": "ok", "started_at": started.isoformat(timespec='seconds')}
+    print(f"--- ▶️ Job '{job['name']}' started ---")
+    with collect_station_timings() as station_timings:
+        try:
+            job["run"](workers)
+        except Exception as e:
+            print(f"🔴 ERROR: Job '{job['name']}' failed: {e}")
+            entry["status"] = "failed"
+            entry["error"] = str(e)
+    entry["seconds"] = round(time.perf_counter() - start, 3)
+    entry["finished_at"] = datetime.now().isoformat(timespec='seconds')
+    if station_timings:
+        entry["stations"] = {sid: round(sec, 3) for sid, sec in station_timings.items()}
+    print(f"--- {'✅' if entry['status'] == 'ok' else '🔴'} Job '{job['name']}' {entry['status']} ({entry['seconds']:.2f}s) ---")
+    return entry
+
+
+def run_jobs(jobs, workers=None, parallel_jobs=DEFAULT_PARALLEL_JOBS):
+    """
+    Runs the jobs in dependency order, up to parallel_jobs at a time.
+    Every job's per-station work goes to one pool of `workers` processes,
+    created once for the run, so concurrent jobs do not oversubscribe the
+    machine and no job pays for spawning its own workers.
+    Returns {job_name: report entry}.
+    """
+    deps = resolve_dependencies(jobs)
+    total_workers = DEFAULT_WORKERS if workers is None else workers
+    parallel_jobs = max(1, parallel_jobs)
+
+    report = {}
+    pending = {job["name"]: job for job in jobs}
+    running = {}
+    with shared_worker_pool(total_workers), ThreadPoolExecutor(max_workers=parallel_jobs) as pool:
+        while pending or running:
+            for name in list(pending):
+                if any(report.get(dep, {}).get("status") in ("failed", "skipped") for dep in deps[name]):
+                    print(f"⏭️ Skipping job '{name}': a dependency did not complete.")
+                    report[name] = {"status": "skipped", "error": "dependency did not complete"}
+                    del pending[name]
+                elif all(dep in report for dep in deps[name]):
+                    running[pool.submit(_run_job, pending.pop(name), total_workers)] = name
+            if not running:
+                if pending:
+                    raise ValueError(f"Circular job dependencies: {', '.join(pending)}")
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                report[running.pop(future)] = future.result()
+    return {job["name"]: report[job["name"]] for job in jobs}
+
+
+def write_report(report, path=REPORT_PATH):
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"📝 Run report written to: {path}")
+    except Exception as e:
+        print(f"⚠️ Could not write run report to {path}: {e}")
+
+
+def _split_names(values):
+    """Accepts repeated and comma-separated job names."""
+    return [name.strip() for value in (values or []) for name in value.split(',') if name.strip()]
+
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run all daily batch jobs.")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes for per-station work (default: BATCH_WORKERS env or CPU count; 1 = serial)")
+    parser.add_argument("--parallel-jobs", type=int, default=DEFAULT_PARALLEL_JOBS,
+                        help=f"Independent jobs run at the same time (default: {DEFAULT_PARALLEL_JOBS})")
+    parser.add_argument("--only", action="append", metavar="JOB",
+                        help=f"Run only these jobs (repeat or comma-separate). Jobs: {', '.join(JOB_NAMES)}")
+    parser.add_argument("--skip", action="append", metavar="JOB", help="Skip these jobs (repeat or comma-separate)")
+    parser.add_argument("--force", action="store_true",
+                        help="Recompute every station, ignoring the incremental manifests")
+    parser.add_argument("--batched-daily", action="store_true",
+                        help="Predict all stations' next day in one stacked pass instead of one model call per station")
+    parser.add_argument("--batched-weekly", action="store_true",
+                        help="Roll out all stations' 7-day forecasts together instead of station by station")
+    parser.add_argument("--report", default=REPORT_PATH, help="Where to write the JSON run report")
+    args = parser.parse_args()
+
+    try:
+        jobs = select_jobs(_split_names(args.only), _split_names(args.skip))
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.force:
+        incremental.FORCE_RECOMPUTE = True
+    from models import predictions
+    if args.batched_daily:
+        predictions.BATCHED_DAILY = True
+    if args.batched_weekly:
+        predictions.BATCHED_WEEKLY = True
+
     start_time = time.time()
+    started_at = datetime.now().isoformat(timespec='seconds')
     print("--- 🚀 Starting All Daily Batch Jobs ---")
-    
-    run_day_night_analysis()
-    run_anomaly_detection()
-    create_daily_prediction_plots()
-    create_weekly_prediction_plots()
-    run_correlation_analysis() # <-- (NEW) ADD TO LIST
-    
+
+    job_reports = run_jobs(jobs, workers=args.workers, parallel_jobs=args.parallel_jobs)
+    clear_cache() # All jobs above share one read of water_records
+
     end_time = time.time()
-    print(f"--- ✅ All Daily Batch Jobs Complete (Total time: {end_time - start_time:.2f}s) ---")
\ No newline at end of file
+    failed = [name for name, entry in job_reports.items() if entry["status"] != "ok"]
+    write_report({
+        "started_at": started_at,
+        "finished_at": datetime.now().isoformat(timespec='seconds'),
+        "total_seconds": round(end_time - start_time, 3),
+        "workers": args.workers if args.workers is not None else DEFAULT_WORKERS,
+        "parallel_jobs": args.parallel_jobs,
+        "jobs": job_reports,
+    }, args.report)
+
+    if failed:
+        print(f"--- 🔴 Batch Jobs Finished With Failures: {', '.join(failed)} (Total time: {end_time - start_time:.2f}s) ---")
+        sys.exit(1)
+    print(f"--- ✅ All Daily Batch Jobs Complete (Total time: {end_time - start_time:.2f}s) ---")
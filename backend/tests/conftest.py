@@ -0,0 +1,56 @@
+# tests/conftest.py
+# Makes the backend modules importable the way the app imports them (from models import ...),
+# and the scraper (cpcb_scraper.py, at the repository root). Also a stub classifier for the
+# classification and API tests.
+import os
+import sys
+import numpy as np
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_DIR = os.path.dirname(BACKEND_DIR)
+for path in (BACKEND_DIR, REPO_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+class StubClassifierModel:
+    """
+    Stands in for the Keras classifier: 'Good' when pH >= 7, else 'Bad'
+    (softmax over [pH - 7, 7 - pH]). Counts forward passes and rows scored.
+    """
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, X, batch_size=None, verbose=0):
+        self.calls.append(len(X))
+        logits = np.stack([X[:, 0] - 7.0, 7.0 - X[:, 0]], axis=1)
+        exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+        return exp / exp.sum(axis=1, keepdims=True)
+
+
+class _IdentityScaler:
+    def transform(self, X):
+        return np.asarray(X, dtype=float)
+
+
+class _LabelEncoder:
+    classes_ = np.array(["Good", "Bad"])
+
+    def inverse_transform(self, indices):
+        return self.classes_[np.asarray(indices)]
+
+
+@pytest.fixture
+def stub_classifier(monkeypatch):
+    """models.classification with a loaded stub model over the features pH and Dissolved Oxygen."""
+    from models import classification
+    stub = StubClassifierModel()
+    monkeypatch.setattr(classification, "features", ["pH", "Dissolved Oxygen"])
+    monkeypatch.setattr(classification, "model", stub)
+    monkeypatch.setattr(classification, "scaler", _IdentityScaler())
+    monkeypatch.setattr(classification, "label_encoder", _LabelEncoder())
+    monkeypatch.setattr(classification, "model_version", "stub-1")
+    classification.clear_memo()
+    yield stub
+    classification.clear_memo()
@@ -0,0 +1,152 @@
+# tests/test_api.py
+# Flask endpoints of main.py, through the test client.
+import gzip
+import json
+import pytest
+
+
+@pytest.fixture(scope="module")
+def app_module():
+    mp = pytest.MonkeyPatch()
+    mp.setenv("CLASSIFIER_WARMUP", "lazy") # The stub classifier stands in for the real model
+    import main
+    yield main
+    mp.undo()
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
+
+
+# --- /api/classify/batch ---
+
+def test_batch_endpoint_streams_a_json_array_with_row_indices(client, stub_classifier, monkeypatch, app_module):
+    monkeypatch.setattr(app_module, "CLASSIFY_BATCH_CHUNK_SIZE", 2)
+    records = [{"pH": 7.8, "Dissolved Oxygen": 6.5}, {"pH": "bad", "Dissolved Oxygen": 5}, {"pH": 6.1, "Dissolved Oxygen": 4.0}]
+    response = client.post("/api/classify/batch", json=records)
+    assert response.status_code == 200 and response.headers["X-Total-Rows"] == "3"
+    results = json.loads(response.get_data(as_text=True))
+    assert [(r["index"], r["status"]) for r in results] == [(0, "success"), (1, "error"), (2, "success")]
+    assert [results[0]["class"], results[2]["class"]] == ["Good", "Bad"]
+    assert stub_classifier.calls == [1, 1] # One forward pass per chunk of valid rows
+
+
+def test_batch_endpoint_ndjson_in_and_out(client, stub_classifier):
+    body = '{"pH": 7.8, "Dissolved Oxygen": 6.5}\n{"pH": 6.1, "Dissolved Oxygen": 4.0}\n'
+    response = client.post("/api/classify/batch?format=ndjson", data=body, content_type="application/x-ndjson")
+    assert response.status_code == 200 and response.mimetype == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [(r["index"], r["class"]) for r in lines] == [(0, "Good"), (1, "Bad")]
+
+
+def test_batch_endpoint_accepts_csv(client, stub_classifier):
+    response = client.post("/api/classify/batch", data="pH,Dissolved Oxygen\n7.8,6.5\n", content_type="text/csv")
+    assert [r["class"] for r in response.get_json()] == ["Good"]
+
+
+def test_batch_endpoint_rejects_oversized_and_malformed_bodies(client, stub_classifier, monkeypatch, app_module):
+    monkeypatch.setattr(app_module, "CLASSIFY_BATCH_MAX_ROWS", 2)
+    response = client.post("/api/classify/batch", json=[{"pH": 7.0, "Dissolved Oxygen": 5.0}] * 3)
+    assert response.status_code == 413
+    assert stub_classifier.calls == [] # Rejected before scoring
+    assert client.post("/api/classify/batch", json={"pH": 7.0}).status_code == 400
+    assert client.post("/api/classify/batch", json=[]).status_code == 400
+
+
+# --- /api/classify/stats ---
+
+def test_classify_stats_reports_memo_counters(client, stub_classifier):
+    sample = {"pH": 7.8, "Dissolved Oxygen": 6.5}
+    for records in ([sample, sample], [sample]):
+        client.post("/api/classify/batch", json=records).get_data() # Results are scored as they stream
+    stats = client.get("/api/classify/stats").get_json()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 2, 1)
+    assert stats["model_version"] == "stub-1"
+
+
+# --- LATEST SNAPSHOT CACHE ---
+
+def test_snapshot_is_rebuilt_only_when_the_data_version_changes(app_module, stub_classifier, monkeypatch, tmp_path):
+    db_path, csv_path = tmp_path / "water_quality.db", tmp_path / "locations.csv"
+    db_path.write_bytes(b"v1")
+    csv_path.write_text("station_id\n101\n")
+    monkeypatch.setattr(app_module, "DB_PATH", str(db_path))
+    monkeypatch.setattr(app_module, "LOCATIONS_CSV_PATH", str(csv_path))
+    monkeypatch.setattr(app_module, "_snapshot_cache", {})
+    builds = []
+    def builder():
+        builds.append(1)
+        return {"build": len(builds)}, 200
+
+    assert app_module.get_cached_snapshot("test", builder) == ({"build": 1}, 200)
+    assert app_module.get_cached_snapshot("test", builder) == ({"build": 1}, 200)
+    db_path.write_bytes(b"v2, rewritten by the pipeline")
+    assert app_module.get_cached_snapshot("test", builder) == ({"build": 2}, 200)
+    # The classes in /api/stations come from the model, so a new model version is new data
+    monkeypatch.setattr(app_module.classification, "model_version", "stub-2")
+    assert app_module.get_cached_snapshot("test", builder) == ({"build": 3}, 200)
+    assert len(builds) == 3
+
+
+def test_uncacheable_snapshots_are_rebuilt(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, "_snapshot_cache", {})
+    results = iter([({"error": "db"}, 500), (["Medium fallback"], 200, False), (["classified"], 200, True)])
+    builder = lambda: next(results)
+    assert app_module.get_cached_snapshot("test", builder) == ({"error": "db"}, 500)
+    assert app_module.get_cached_snapshot("test", builder) == (["Medium fallback"], 200)
+    assert app_module.get_cached_snapshot("test", builder) == (["classified"], 200)
+    assert app_module.get_cached_snapshot("test", builder) == (["classified"], 200) # Cached
+
+
+# --- PRE-GENERATED ARTIFACTS (serve_artifact) ---
+
+@pytest.fixture
+def daily_artifact(app_module, monkeypatch, tmp_path):
+    """A daily prediction artifact with a precomputed .gz, served from a temporary directory."""
+    from models.artifacts import write_compressed_variants
+    monkeypatch.setattr(app_module, "DAILY_PRED_DIR", str(tmp_path))
+    path = tmp_path / "daily_pred_station_101.json"
+    path.write_bytes(b'{"data": [1, 2, 3], "layout": {}}')
+    write_compressed_variants(str(path))
+    return path
+
+
+def test_artifact_revalidates_with_etag(client, daily_artifact):
+    first = client.get("/api/predictions/daily/101", headers={"Accept-Encoding": "identity"})
+    assert first.status_code == 200 and first.data == daily_artifact.read_bytes()
+    assert first.headers["Vary"] == "Accept-Encoding" and first.headers["Cache-Control"] == "no-cache"
+    etag = first.headers["ETag"]
+
+    second = client.get("/api/predictions/daily/101", headers={"Accept-Encoding": "identity", "If-None-Match": etag})
+    assert second.status_code == 304 and second.data == b"" and second.headers["ETag"] == etag
+
+    daily_artifact.write_bytes(b'{"data": [4], "layout": {}}') # Rewritten by the batch job
+    third = client.get("/api/predictions/daily/101", headers={"Accept-Encoding": "identity", "If-None-Match": etag})
+    assert third.status_code == 200 and third.headers["ETag"] != etag
+
+
+def test_artifact_encoding_follows_accept_encoding(client, daily_artifact):
+    plain = client.get("/api/predictions/daily/101", headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in plain.headers
+
+    gzipped = client.get("/api/predictions/daily/101", headers={"Accept-Encoding": "gzip"})
+    assert gzipped.headers["Content-Encoding"] == "gzip"
+    assert gzipped.data == (daily_artifact.parent / (daily_artifact.name + ".gz")).read_bytes() # The precomputed copy
+    assert gzip.decompress(gzipped.data) == daily_artifact.read_bytes()
+    # Each representation has its own ETag, so a cached gzip body never matches a plain request
+    assert gzipped.headers["ETag"] != plain.headers["ETag"]
+    assert client.get("/api/predictions/daily/101", headers={
+        "Accept-Encoding": "identity", "If-None-Match": gzipped.headers["ETag"]}).status_code == 200
+
+
+def test_stale_precomputed_variant_is_ignored(client, daily_artifact):
+    stale = daily_artifact.parent / (daily_artifact.name + ".gz")
+    stale.write_bytes(gzip.compress(b'{"data": "from an older run"}'))
+    response = client.get("/api/predictions/daily/101", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert gzip.decompress(response.data) == daily_artifact.read_bytes()
+
+
+def test_missing_artifact_is_404(client, daily_artifact):
+    assert client.get("/api/predictions/daily/999").status_code == 404
@@ -0,0 +1,131 @@
+# tests/test_classification.py
+# models.classification with a stub model (see conftest.stub_classifier).
+import time
+import threading
+import pandas as pd
+import pytest
+from models import classification
+
+SAMPLES = [
+    {"pH": 7.8, "Dissolved Oxygen": 6.5},
+    {"pH": 6.1, "Dissolved Oxygen": 4.0},
+    {"pH": 7.2, "Dissolved Oxygen": 7.1},
+]
+
+
+# --- BATCH SCORING ---
+
+def test_batch_matches_single_row_results(stub_classifier, monkeypatch):
+    monkeypatch.setattr(classification, "CLASSIFY_MEMO_SIZE", 0)
+    single = [classification.predict_water_quality(sample) for sample in SAMPLES]
+    batch = classification.predict_water_quality_batch(SAMPLES)
+    assert [r["class"] for r in batch] == ["Good", "Bad", "Good"]
+    for one, many in zip(single, batch):
+        assert one["class"] == many["class"] and one["insights"] == many["insights"]
+        assert many["probabilities"] == pytest.approx(one["probabilities"])
+    assert stub_classifier.calls[-1] == len(SAMPLES) # One forward pass for the batch
+
+
+def test_one_bad_row_does_not_fail_the_rest(stub_classifier):
+    records = [SAMPLES[0], {"pH": "n/a", "Dissolved Oxygen": 5.0}, {"pH": 6.0}, SAMPLES[2]]
+    results = classification.predict_water_quality_batch(records)
+    assert [r["status"] for r in results] == ["success", "error", "error", "success"]
+    assert results[1]["message"] == "Missing or invalid numeric value for: pH"
+    assert results[2]["message"] == "Missing or invalid numeric value for: Dissolved Oxygen"
+    assert stub_classifier.calls == [2] # Only the valid rows reach the model
+
+
+def test_batch_without_a_loaded_model_reports_every_row(stub_classifier, monkeypatch):
+    monkeypatch.setattr(classification, "ensure_loaded", lambda: False)
+    results = classification.predict_water_quality_batch(SAMPLES)
+    assert [r["status"] for r in results] == ["error"] * len(SAMPLES)
+
+
+# --- REQUEST COALESCING ---
+
+def _coalesced_concurrently(samples):
+    results = [None] * len(samples)
+    def call(i):
+        results[i] = classification.predict_water_quality_coalesced(samples[i])
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(len(samples))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    return results
+
+
+def test_concurrent_requests_share_a_forward_pass(stub_classifier, monkeypatch):
+    monkeypatch.setattr(classification, "CLASSIFY_MEMO_SIZE", 0)
+    monkeypatch.setattr(classification, "CLASSIFY_MAX_WAIT_MS", 300)
+    results = _coalesced_concurrently(SAMPLES)
+    assert [r["class"] for r in results] == ["Good", "Bad", "Good"]
+    assert sum(stub_classifier.calls) == len(SAMPLES) and len(stub_classifier.calls) < len(SAMPLES)
+
+
+def test_failed_batch_scores_each_request_on_its_own(stub_classifier, monkeypatch):
+    def failing_batch(records, raise_errors=False):
+        assert raise_errors # The coalescer must not get per-row error dicts for a failed matrix
+        raise RuntimeError("matrix failed")
+    monkeypatch.setattr(classification, "predict_water_quality_batch", failing_batch)
+    monkeypatch.setattr(classification, "CLASSIFY_MAX_WAIT_MS", 100)
+    results = _coalesced_concurrently(SAMPLES[:2])
+    assert [r["class"] for r in results] == ["Good", "Bad"]
+
+
+def test_timed_out_request_is_scored_directly_and_skipped_by_the_batch(stub_classifier, monkeypatch):
+    release, batched = threading.Event(), []
+    def stalled_batch(records, raise_errors=False):
+        batched.append([r["pH"] for r in records])
+        release.wait(5)
+        return classification.predict_water_quality_frame(pd.DataFrame.from_records(records), raise_errors)
+    monkeypatch.setattr(classification, "predict_water_quality_batch", stalled_batch)
+    monkeypatch.setattr(classification, "CLASSIFY_QUEUE_TIMEOUT_S", 0.2)
+    monkeypatch.setattr(classification, "CLASSIFY_MAX_WAIT_MS", 1)
+    try:
+        # The first request stalls the coalescer, the second times out while queued behind it
+        first = threading.Thread(target=classification.predict_water_quality_coalesced, args=(SAMPLES[0],))
+        first.start()
+        while not batched:
+            time.sleep(0.01)
+        result = classification.predict_water_quality_coalesced(SAMPLES[1])
+        assert result["class"] == "Bad" # Scored directly after the timeout
+    finally:
+        release.set()
+    first.join(5)
+    # Let the coalescer drain the queue: the abandoned request is not scored again
+    monkeypatch.setattr(classification, "CLASSIFY_QUEUE_TIMEOUT_S", 5)
+    assert classification.predict_water_quality_coalesced(SAMPLES[2])["class"] == "Good"
+    assert batched == [[7.8], [7.2]]
+
+
+# --- RESULT MEMO ---
+
+def test_repeated_inputs_come_from_the_memo(stub_classifier):
+    classification.predict_water_quality_batch(SAMPLES[:2])
+    results = classification.predict_water_quality_batch([SAMPLES[0], SAMPLES[2], SAMPLES[2]])
+    assert stub_classifier.calls == [2, 1] # Only the new vector is scored, once
+    assert [r["class"] for r in results] == ["Good", "Good", "Good"]
+    stats = classification.get_memo_stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 4, 3)
+
+    results[0]["probabilities"]["Good"] = -1 # Callers get copies
+    assert classification.predict_water_quality(SAMPLES[0])["probabilities"]["Good"] > 0.5
+
+
+def test_memo_is_invalidated_by_a_new_model_version(stub_classifier, monkeypatch):
+    classification.predict_water_quality(SAMPLES[0])
+    monkeypatch.setattr(classification, "model_version", "stub-2")
+    classification.predict_water_quality(SAMPLES[0])
+    assert stub_classifier.calls == [1, 1]
+    classification.reset_classifier()
+    assert classification.get_memo_stats()["size"] == 0
+
+
+def test_memo_rounding_and_size_limit(stub_classifier, monkeypatch):
+    monkeypatch.setattr(classification, "CLASSIFY_MEMO_DECIMALS", 1)
+    monkeypatch.setattr(classification, "CLASSIFY_MEMO_SIZE", 2)
+    classification.predict_water_quality_batch([{"pH": 7.81, "Dissolved Oxygen": 6.5}, {"pH": 7.84, "Dissolved Oxygen": 6.5}])
+    assert stub_classifier.calls == [1] # Same key once rounded
+    classification.predict_water_quality_batch(SAMPLES)
+    assert classification.get_memo_stats()["size"] == 2
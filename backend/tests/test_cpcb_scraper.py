@@ -0,0 +1,269 @@
+# tests/test_cpcb_scraper.py
+# Conditional fetches and retries of cpcb_scraper.py against a local stand-in for the CPCB server.
+import os
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import pandas as pd
+import cpcb_scraper
+
+LAST_MODIFIED = "Sat, 01 Nov 2025 12:00:00 GMT"
+
+
+def feed(value, station="101"):
+    return [
+        {"station_id": station, "timestamp": "2025-11-01T10:00:00Z", "ts_value": value,
+         "stationparameter_longname": "pH", "ts_unitsymbol": ""},
+        {"station_id": station, "timestamp": "2025-11-01T10:00:00Z", "ts_value": "7.5",
+         "stationparameter_longname": "Oxygen, dissolved", "ts_unitsymbol": "mg/l"},
+    ]
+
+
+class StandInServer:
+    """
+    Serves {path: JSON body} with an ETag per path, answering 304 to a matching
+    If-None-Match. Statuses queued in failures[path] are returned first, one per request.
+    """
+    def __init__(self):
+        self.bodies, self.failures, self.requests = {}, {}, []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests.append((self.path, dict(self.headers)))
+                failures = server.failures.get(self.path)
+                if failures:
+                    self.send_response(failures.pop(0))
+                    self.send_header("Retry-After", "0")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                body = json.dumps(server.bodies[self.path]).encode()
+                etag = f'"{self.path.strip("/")}-{hash(body) & 0xffff:x}"'
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", etag)
+                self.send_header("Last-Modified", LAST_MODIFIED)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.httpd.server_port}{path}"
+
+    def requests_to(self, path):
+        return [headers for request_path, headers in self.requests if request_path == path]
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def server():
+    stand_in = StandInServer()
+    yield stand_in
+    stand_in.close()
+
+
+@pytest.fixture
+def github_output(tmp_path, monkeypatch):
+    """File the scraper's workflow step outputs are written to."""
+    path = tmp_path / "github_output"
+    monkeypatch.setenv("GITHUB_OUTPUT", str(path))
+    return path
+
+
+@pytest.fixture
+def scraper(tmp_path, monkeypatch, github_output):
+    """cpcb_scraper with its files under tmp_path, no retry backoff and no database ingest."""
+    output_dir = tmp_path / "scraped_data"
+    monkeypatch.setattr(cpcb_scraper, "OUTPUT_DIR", str(output_dir))
+    monkeypatch.setattr(cpcb_scraper, "OUTPUT_JSON_FILE", str(output_dir / "latest_cpcb_data.json"))
+    monkeypatch.setattr(cpcb_scraper, "FETCH_STATE_FILE", str(output_dir / "latest_cpcb_fetch_state.json"))
+    monkeypatch.setattr(cpcb_scraper, "LAYER_CACHE_DIR", str(output_dir / "layer_cache"))
+    monkeypatch.setattr(cpcb_scraper, "LOCATIONS_CSV_PATH", str(tmp_path / "no_locations.csv"))
+    monkeypatch.setattr(cpcb_scraper, "FETCH_BACKOFF", 0.0)
+    monkeypatch.setattr(cpcb_scraper, "_session", None) # Rebuilt with the settings above
+    monkeypatch.setattr(cpcb_scraper, "CONDITIONAL_FETCH", True)
+    monkeypatch.setattr(cpcb_scraper, "STREAMING_FETCH", False)
+    monkeypatch.setattr(cpcb_scraper, "DIRECT_INGEST", False)
+    monkeypatch.setattr(cpcb_scraper, "FULL_RESOLUTION", False)
+    monkeypatch.setattr(cpcb_scraper, "WRITE_JSON", True)
+    monkeypatch.delenv("SCRAPER_LAYERS", raising=False)
+    return cpcb_scraper
+
+
+def step_outputs(github_output):
+    if not github_output.exists():
+        return {}
+    return dict(line.split("=", 1) for line in github_output.read_text().splitlines())
+
+
+# --- CONDITIONAL FETCH ---
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_200_then_304_with_persisted_validators(scraper, server, monkeypatch, streaming):
+    monkeypatch.setattr(scraper, "STREAMING_FETCH", streaming)
+    server.bodies["/layer"] = feed("7.1")
+    url = server.url("/layer")
+
+    fetch_state = scraper.load_fetch_state()
+    df, entry = scraper.fetch_layer("water_quality", url, fetch_state)
+    assert entry["status"] == "ok" and len(df) == 2
+    assert fetch_state[url]["etag"] and fetch_state[url]["last_modified"] == LAST_MODIFIED
+    scraper.save_fetch_state(fetch_state)
+
+    # Next run: validators come back from disk and are sent with the request
+    df, entry = scraper.fetch_layer("water_quality", url, scraper.load_fetch_state())
+    assert df is scraper.NOT_MODIFIED and entry["status"] == "not_modified"
+    first, second = server.requests_to("/layer")
+    assert "If-None-Match" not in first
+    assert second["If-None-Match"] == fetch_state[url]["etag"]
+    assert second["If-Modified-Since"] == LAST_MODIFIED
+
+
+@pytest.mark.parametrize("status", [429, 500, 503])
+def test_retries_429_and_5xx(scraper, server, status):
+    server.bodies["/layer"] = feed("7.1")
+    server.failures["/layer"] = [status, status]
+    data = scraper.fetch_data(server.url("/layer"))
+    assert len(data) == 2
+    assert len(server.requests_to("/layer")) == 3
+
+
+def test_gives_up_after_the_retry_budget(scraper, server, monkeypatch):
+    monkeypatch.setattr(scraper, "FETCH_RETRIES", 2)
+    server.bodies["/layer"] = feed("7.1")
+    server.failures["/layer"] = [503] * 5
+    assert scraper.fetch_data(server.url("/layer")) == []
+    assert len(server.requests_to("/layer")) == 3 # First try + 2 retries
+
+
+# --- WHOLE RUN ---
+
+def test_unchanged_feed_sets_not_modified_output(scraper, server, monkeypatch, github_output):
+    server.bodies["/layer"] = feed("7.1")
+    monkeypatch.setattr(scraper, "LAYER_CATALOG", {"water_quality": server.url("/layer")})
+
+    scraper.main()
+    saved = json.loads(open(scraper.OUTPUT_JSON_FILE).read())
+    assert saved[0]["pH"] == 7.1
+    assert server.url("/layer") in json.loads(open(scraper.FETCH_STATE_FILE).read())
+    assert "not_modified" not in step_outputs(github_output)
+
+    scraper.main()
+    assert step_outputs(github_output).get("not_modified") == "true"
+
+    # A changed feed is fetched in full again
+    server.bodies["/layer"] = feed("6.4")
+    github_output.unlink()
+    scraper.main()
+    assert "not_modified" not in step_outputs(github_output)
+    assert json.loads(open(scraper.OUTPUT_JSON_FILE).read())[0]["pH"] == 6.4
+
+
+def saved_ph(scraper):
+    return {row["stationId"]: row["pH"] for row in json.loads(open(scraper.OUTPUT_JSON_FILE).read())}
+
+
+def test_mixed_200_and_304_reuses_cached_layer(scraper, server, monkeypatch, github_output):
+    server.bodies["/a"], server.bodies["/b"] = feed("7.1", station="101"), feed("8.0", station="202")
+    monkeypatch.setattr(scraper, "LAYER_CATALOG", {"a": server.url("/a"), "b": server.url("/b")})
+    scraper.main()
+
+    server.bodies["/b"] = feed("6.2", station="202")
+    scraper.main()
+    assert "not_modified" not in step_outputs(github_output)
+    assert saved_ph(scraper) == {"101": 7.1, "202": 6.2}
+    # Layer a answered 304 and came from the cache: no unconditional refetch
+    first, second = server.requests_to("/a")
+    assert "If-None-Match" in second
+    assert len(server.requests_to("/b")) == 2
+
+
+def test_mixed_200_and_304_refetches_layer_without_cache(scraper, server, monkeypatch):
+    server.bodies["/a"], server.bodies["/b"] = feed("7.1", station="101"), feed("8.0", station="202")
+    monkeypatch.setattr(scraper, "LAYER_CATALOG", {"a": server.url("/a"), "b": server.url("/b")})
+    scraper.main()
+
+    os.remove(scraper._layer_cache_path("a"))
+    server.bodies["/b"] = feed("6.2", station="202")
+    scraper.main()
+    assert saved_ph(scraper) == {"101": 7.1, "202": 6.2}
+    conditional, unconditional = server.requests_to("/a")[1:]
+    assert "If-None-Match" in conditional and "If-None-Match" not in unconditional
+    assert os.path.exists(scraper._layer_cache_path("a")) # Cached again for the next run
+
+
+def test_cached_layer_round_trips_and_latency_goes_to_step_summary(scraper, server, monkeypatch, tmp_path):
+    summary = tmp_path / "step_summary.md"
+    monkeypatch.setenv("GITHUB_STEP_SUMMARY", str(summary))
+    server.bodies["/a"], server.bodies["/b"] = feed("7.1", station="101"), feed("8.0", station="202")
+    monkeypatch.setattr(scraper, "LAYER_CATALOG", {"a": server.url("/a"), "b": server.url("/b")})
+    scraper.main()
+
+    fresh = scraper.fetch_layers(scraper.LAYER_CATALOG, {})[0]["a"]
+    cached = scraper.load_layer_frame("a", server.url("/a"))
+    pd.testing.assert_frame_equal(cached.reset_index(drop=True), fresh.reset_index(drop=True), check_dtype=False)
+    assert cached["stationId"].tolist() == ["101", "101"]
+    assert scraper.load_layer_frame("a", server.url("/other")) is None # Catalog URL changed
+
+    lines = summary.read_text().splitlines()
+    assert lines[0] == "| Layer | Status | Rows | Seconds |"
+    assert [line.split(" | ")[:3] for line in lines[2:]] == [["| a", "ok", "2"], ["| b", "ok", "2"]]
+
+
+# --- FULL-RESOLUTION INGEST ---
+
+def test_full_resolution_stores_samples_and_snapshot(scraper, server, monkeypatch, tmp_path):
+    pytest.importorskip("sklearn") # models.preprocess
+    import sqlite3
+    import update_pipeline
+    from models import preprocess
+    db_path = str(tmp_path / "water_quality.db")
+    monkeypatch.setattr(update_pipeline, "DB_PATH", db_path)
+    monkeypatch.setattr(preprocess, "DB_PATH", db_path)
+    monkeypatch.setattr(scraper, "FULL_RESOLUTION", True)
+
+    readings = feed("7.1") + [{"station_id": "101", "timestamp": "2025-11-01T11:00:00Z", "ts_value": "7.3",
+                               "stationparameter_longname": "pH", "ts_unitsymbol": ""}]
+    server.bodies["/layer"] = readings
+    monkeypatch.setattr(scraper, "LAYER_CATALOG", {"water_quality": server.url("/layer")})
+    scraper.main()
+
+    con = sqlite3.connect(db_path)
+    try:
+        assert con.execute('SELECT COUNT(*) FROM "measurements"').fetchone()[0] == 3 # Every sample
+        # water_records gets the latest-per-station snapshot, not one sparse row per timestamp
+        rows = con.execute('SELECT "timestampDate", "pH", "Dissolved Oxygen" FROM "water_records"').fetchall()
+        assert rows == [("2025-11-01T11:00:00", 7.3, 7.5)]
+        assert con.execute('SELECT COUNT(*) FROM "station_latest"').fetchone()[0] == 1
+    finally:
+        con.close()
+    assert os.path.exists(scraper.FETCH_STATE_FILE) # Everything was saved
+
+
+def test_full_resolution_keeps_validators_when_the_snapshot_fails(scraper, server, monkeypatch):
+    pytest.importorskip("sklearn")
+    import update_pipeline
+    monkeypatch.setattr(scraper, "FULL_RESOLUTION", True)
+    monkeypatch.setattr(update_pipeline, "store_samples", lambda samples: len(samples))
+    monkeypatch.setattr(update_pipeline, "preprocess_and_store_data", lambda *args, **kwargs: 0)
+    server.bodies["/layer"] = feed("7.1")
+    monkeypatch.setattr(scraper, "LAYER_CATALOG", {"water_quality": server.url("/layer")})
+    scraper.main()
+    assert not os.path.exists(scraper.FETCH_STATE_FILE) # Next run fetches the feed in full again
@@ -0,0 +1,59 @@
+# tests/test_data_access.py
+# Which rows the batch jobs get from models.data_access.
+import sqlite3
+import pandas as pd
+import pytest
+from models import data_access
+from models.measurement_store import append_samples
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """water_records with one hourly snapshot row, plus the feed samples behind it in the long store."""
+    path = str(tmp_path / "water_quality.db")
+    con = sqlite3.connect(path)
+    con.execute('CREATE TABLE water_records ("stationId" TEXT, "timestamp" TEXT, "timestampDate" TIMESTAMP, '
+                '"pH" REAL, "Dissolved Oxygen" REAL, PRIMARY KEY ("stationId", "timestampDate"))')
+    con.execute("INSERT INTO water_records VALUES ('101', '2025-11-01 11:00:00', '2025-11-01T11:00:00', 7.3, 7.5)")
+    append_samples(con, pd.DataFrame({
+        "stationId": ["101"] * 4,
+        "parameter": ["pH", "Dissolved Oxygen", "pH", "pH"],
+        "timestampDate": pd.to_datetime(["2025-11-01 10:00", "2025-11-01 10:00", "2025-11-01 10:30", "2025-11-01 11:00"]),
+        "value": [7.1, 7.5, 7.2, 7.3],
+    }))
+    con.commit()
+    con.close()
+    yield path
+    data_access.clear_cache()
+
+
+def _station_frame(db_path):
+    views = dict(data_access.iter_station_views(db_path))
+    return views["101"]
+
+
+def test_hourly_snapshot_by_default(db_path, monkeypatch):
+    monkeypatch.setattr(data_access, "FULL_RESOLUTION", False)
+    station_df = _station_frame(db_path)
+    assert list(station_df["timestampDate"]) == [pd.Timestamp("2025-11-01 11:00")]
+
+
+def test_full_resolution_jobs_see_every_sample(db_path, monkeypatch):
+    monkeypatch.setattr(data_access, "FULL_RESOLUTION", True)
+    station_df = _station_frame(db_path)
+    assert list(station_df["timestampDate"]) == list(pd.to_datetime(["2025-11-01 10:00", "2025-11-01 10:30", "2025-11-01 11:00"]))
+    assert station_df["pH"].tolist() == pytest.approx([7.1, 7.2, 7.3])
+    assert pd.isna(station_df["Dissolved Oxygen"].iloc[1]) # Not read at 10:30
+    assert set(data_access.get_parameter_columns(station_df)) == {"pH", "Dissolved Oxygen"}
+
+
+def test_full_resolution_without_the_store_reads_water_records(tmp_path, monkeypatch):
+    path = str(tmp_path / "water_quality.db")
+    con = sqlite3.connect(path)
+    con.execute('CREATE TABLE water_records ("stationId" TEXT, "timestampDate" TIMESTAMP, "pH" REAL)')
+    con.execute("INSERT INTO water_records VALUES ('101', '2025-11-01T11:00:00', 7.3)")
+    con.commit()
+    con.close()
+    monkeypatch.setattr(data_access, "FULL_RESOLUTION", True)
+    assert len(data_access.load_water_records(path)) == 1
+    data_access.clear_cache()
@@ -0,0 +1,84 @@
+# tests/test_incremental.py
+# Per-station manifests that let batch jobs skip stations whose input has not changed.
+import os
+import pandas as pd
+import pytest
+from models import incremental
+
+
+@pytest.fixture
+def manifest_dir(tmp_path, monkeypatch):
+    path = tmp_path / "batch_manifest"
+    monkeypatch.setattr(incremental, "MANIFEST_DIR", str(path))
+    monkeypatch.setattr(incremental, "FORCE_RECOMPUTE", False)
+    return path
+
+
+def _station(values):
+    return pd.DataFrame({
+        "timestampDate": pd.date_range("2025-11-01", periods=len(values), freq="h"),
+        "pH": values,
+    })
+
+
+class Job:
+    """A per-station job that records which stations it ran for."""
+    def __init__(self, out_dir=None):
+        self.ran, self.out_dir = [], out_dir
+
+    def __call__(self, station_id, station_df):
+        self.ran.append(station_id)
+        if self.out_dir is not None:
+            (self.out_dir / f"{station_id}.json").write_text("{}")
+        return {"station": station_id, "mean": float(station_df["pH"].mean())}
+
+
+def _run(job, items, **kwargs):
+    return incremental.run_incremental_per_station("test_job", job, items, workers=1, **kwargs)
+
+
+def test_unchanged_station_is_skipped_with_its_stored_result(manifest_dir):
+    items = [("101", _station([7.0, 7.2])), ("202", _station([6.0]))]
+    first = _run(Job(), items)
+    assert (manifest_dir / "test_job.json").exists()
+
+    job = Job()
+    items[1] = ("202", _station([6.0, 6.4])) # New reading for 202 only
+    second = _run(job, items)
+    assert job.ran == ["202"]
+    assert second[0] == first[0] == {"station": "101", "mean": pytest.approx(7.1)}
+    assert second[1]["mean"] == pytest.approx(6.2)
+
+
+def test_force_recomputes_every_station(manifest_dir, monkeypatch):
+    items = [("101", _station([7.0])), ("202", _station([6.0]))]
+    _run(Job(), items)
+    monkeypatch.setattr(incremental, "FORCE_RECOMPUTE", True)
+    job = Job()
+    _run(job, items)
+    assert job.ran == ["101", "202"]
+
+
+def test_new_version_or_missing_output_recomputes(manifest_dir, tmp_path):
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+    outputs = lambda station_id: [str(out_dir / f"{station_id}.json")]
+    items = [("101", _station([7.0])), ("202", _station([6.0]))]
+    _run(Job(out_dir), items, version="1", outputs=outputs)
+
+    os.remove(out_dir / "202.json")
+    job = Job(out_dir)
+    _run(job, items, version="1", outputs=outputs)
+    assert job.ran == ["202"]
+
+    job = Job(out_dir)
+    _run(job, items, version="2", outputs=outputs) # e.g. a retrained model
+    assert job.ran == ["101", "202"]
+
+
+def test_failed_station_is_retried(manifest_dir):
+    items = [("101", _station([7.0]))]
+    _run(lambda station_id, station_df: None, items) # No result: not recorded
+    job = Job()
+    _run(job, items)
+    assert job.ran == ["101"]
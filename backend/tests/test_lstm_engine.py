@@ -0,0 +1,222 @@
+# tests/test_lstm_engine.py
+# The NumPy engine against a plain reference LSTM and, when TensorFlow is
+# installed, against Keras itself.
+import os
+import warnings
+import numpy as np
+import pytest
+from models import lstm_engine
+from models.lstm_engine import (
+    ACTIVATIONS, lstm_dense_forward, lstm_dense_rollout, stack_weights, stacked_forward,
+    stacked_rollout, dense_stack_forward, save_weights_npz, load_weights_npz
+)
+
+os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+
+TOLERANCE = 1e-5
+KERAS_TOLERANCE = 1e-4 # Same as models/export_weights.py
+
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+def random_lstm_dense(rng, features=3, units=5, outputs=3, recurrent_activation='sigmoid'):
+    def rand(*shape):
+        return rng.normal(scale=0.5, size=shape).astype(np.float32)
+    return {
+        'activation': 'tanh',
+        'recurrent_activation': recurrent_activation,
+        'dense_activation': 'linear',
+        'kernel': rand(features, 4 * units),
+        'recurrent_kernel': rand(units, 4 * units),
+        'bias': rand(4 * units),
+        'dense_kernel': rand(units, outputs),
+        'dense_bias': rand(outputs),
+    }
+
+
+def reference_lstm_dense(weights, X, rec_act=_sigmoid):
+    """Textbook LSTM, one sequence and one gate at a time (Keras gate order i, f, c, o)."""
+    units = weights['recurrent_kernel'].shape[0]
+    gates = [slice(k * units, (k + 1) * units) for k in range(4)]
+    results = []
+    for sequence in np.asarray(X, dtype=np.float64):
+        h, c = np.zeros(units), np.zeros(units)
+        for x in sequence:
+            i, f, g, o = (x @ weights['kernel'][:, s] + h @ weights['recurrent_kernel'][:, s] + weights['bias'][s]
+                          for s in gates)
+            c = rec_act(f) * c + rec_act(i) * np.tanh(g)
+            h = rec_act(o) * np.tanh(c)
+        results.append(h @ weights['dense_kernel'] + weights['dense_bias'])
+    return np.array(results)
+
+
+# --- PURE NUMPY ---
+
+def test_forward_matches_reference_lstm():
+    rng = np.random.default_rng(0)
+    weights = random_lstm_dense(rng)
+    X = rng.random((4, 6, 3), dtype=np.float32)
+    np.testing.assert_allclose(lstm_dense_forward(weights, X), reference_lstm_dense(weights, X), atol=TOLERANCE)
+
+
+def test_gate_order_is_input_forget_cell_output():
+    # Swapping the forget and cell blocks must change the output; otherwise the
+    # reference comparison above could not tell a wrong gate order apart.
+    rng = np.random.default_rng(1)
+    weights = random_lstm_dense(rng)
+    units = weights['recurrent_kernel'].shape[0]
+    order = np.r_[0:units, 2 * units:3 * units, units:2 * units, 3 * units:4 * units]
+    swapped = dict(weights, kernel=weights['kernel'][:, order],
+                   recurrent_kernel=weights['recurrent_kernel'][:, order], bias=weights['bias'][order])
+    X = rng.random((2, 5, 3), dtype=np.float32)
+    assert not np.allclose(lstm_dense_forward(swapped, X), reference_lstm_dense(weights, X), atol=1e-3)
+
+
+def test_hard_sigmoid_definitions():
+    x = np.array([-4.0, -3.0, -2.5, 0.0, 1.5, 2.5, 3.0, 4.0], dtype=np.float32)
+    # Keras 3: relu6(x + 3) / 6
+    np.testing.assert_allclose(ACTIVATIONS['hard_sigmoid'](x), np.minimum(np.maximum(x + 3, 0), 6) / 6)
+    # tf.keras 2.x: clip(0.2 * x + 0.5, 0, 1)
+    np.testing.assert_allclose(ACTIVATIONS['hard_sigmoid_keras2'](x), [0, 0, 0, 0.5, 0.8, 1, 1, 1])
+
+
+def test_forward_with_hard_sigmoid_gates():
+    rng = np.random.default_rng(2)
+    X = rng.random((3, 4, 3), dtype=np.float32)
+    for name in ('hard_sigmoid', 'hard_sigmoid_keras2'):
+        weights = random_lstm_dense(rng, recurrent_activation=name)
+        np.testing.assert_allclose(lstm_dense_forward(weights, X),
+                                   reference_lstm_dense(weights, X, rec_act=ACTIVATIONS[name]), atol=TOLERANCE)
+
+
+def test_rollout_matches_sliding_window_forward():
+    rng = np.random.default_rng(3)
+    weights = random_lstm_dense(rng)
+    X = rng.random((2, 4, 3), dtype=np.float32)
+    window, expected = X.copy(), []
+    for _ in range(5):
+        prediction = lstm_dense_forward(weights, window)
+        expected.append(prediction)
+        window = np.concatenate([window[:, 1:], prediction[:, None]], axis=1)
+    np.testing.assert_allclose(lstm_dense_rollout(weights, X, 5), np.stack(expected, axis=1), atol=TOLERANCE)
+
+
+def test_stacked_matches_per_model():
+    rng = np.random.default_rng(4)
+    models = [random_lstm_dense(rng) for _ in range(3)]
+    X = rng.random((3, 4, 3), dtype=np.float32)
+    stacked = stack_weights(models)
+    np.testing.assert_allclose(stacked_forward(stacked, X),
+                               np.concatenate([lstm_dense_forward(w, X[i:i + 1]) for i, w in enumerate(models)]),
+                               atol=TOLERANCE)
+    np.testing.assert_allclose(stacked_rollout(stacked, X, 4),
+                               np.concatenate([lstm_dense_rollout(w, X[i:i + 1], 4) for i, w in enumerate(models)]),
+                               atol=TOLERANCE)
+
+
+def test_stack_rejects_mixed_activations():
+    rng = np.random.default_rng(5)
+    with pytest.raises(ValueError):
+        stack_weights([random_lstm_dense(rng), random_lstm_dense(rng, recurrent_activation='hard_sigmoid')])
+
+
+def test_dense_stack_forward():
+    rng = np.random.default_rng(6)
+    layers = [
+        {'kernel': rng.normal(size=(4, 8)).astype(np.float32), 'bias': rng.normal(size=8).astype(np.float32), 'activation': 'relu'},
+        {'kernel': rng.normal(size=(8, 3)).astype(np.float32), 'bias': rng.normal(size=3).astype(np.float32), 'activation': 'softmax'},
+    ]
+    X = rng.random((5, 4), dtype=np.float32)
+    hidden = np.maximum(X @ layers[0]['kernel'] + layers[0]['bias'], 0)
+    logits = hidden @ layers[1]['kernel'] + layers[1]['bias']
+    expected = np.exp(logits) / np.exp(logits).sum(axis=1, keepdims=True)
+    np.testing.assert_allclose(dense_stack_forward({'layers': layers}, X), expected, atol=TOLERANCE)
+
+
+def test_npz_round_trip(tmp_path):
+    rng = np.random.default_rng(7)
+    weights = random_lstm_dense(rng, recurrent_activation='hard_sigmoid_keras2')
+    path = str(tmp_path / 'model.npz')
+    save_weights_npz(weights, path, 'abc123')
+    loaded = load_weights_npz(path)
+    assert loaded['source_sha1'] == 'abc123'
+    assert loaded['recurrent_activation'] == 'hard_sigmoid_keras2'
+    X = rng.random((2, 4, 3), dtype=np.float32)
+    np.testing.assert_allclose(lstm_dense_forward(loaded, X), lstm_dense_forward(weights, X))
+
+
+@pytest.mark.parametrize('keras_version, expected', [('2.15.0', 'hard_sigmoid_keras2'), ('3.4.1', 'hard_sigmoid'), (None, 'hard_sigmoid')])
+def test_npz_hard_sigmoid_follows_the_exported_keras_version(tmp_path, keras_version, expected):
+    rng = np.random.default_rng(8)
+    weights = dict(random_lstm_dense(rng, recurrent_activation='hard_sigmoid'), keras_version=keras_version)
+    path = str(tmp_path / 'model.npz')
+    save_weights_npz(weights, path, 'abc123')
+    assert load_weights_npz(path)['recurrent_activation'] == expected
+
+
+# --- PARITY WITH KERAS (skipped without TensorFlow) ---
+
+def _keras_lstm_dense(keras, seq_length, features, units, recurrent_activation, seed):
+    keras.utils.set_random_seed(seed)
+    model = keras.Sequential([
+        keras.Input(shape=(seq_length, features)),
+        keras.layers.LSTM(units, recurrent_activation=recurrent_activation),
+        keras.layers.Dense(features),
+    ])
+    # Non-zero biases, so the bias layout is exercised too
+    kernel, recurrent_kernel, bias = model.layers[0].get_weights()
+    model.layers[0].set_weights([kernel, recurrent_kernel, np.linspace(-0.5, 0.5, bias.size).astype(np.float32)])
+    return model
+
+
+def _predict(model, X):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return model.predict(X, verbose=0)
+
+
+@pytest.mark.parametrize('recurrent_activation', ['sigmoid', 'hard_sigmoid'])
+def test_lstm_dense_forward_matches_keras(recurrent_activation):
+    tf = pytest.importorskip('tensorflow')
+    model = _keras_lstm_dense(tf.keras, 6, 3, 8, recurrent_activation, seed=0)
+    weights = lstm_engine.extract_lstm_dense(model)
+    X = np.random.default_rng(0).random((16, 6, 3), dtype=np.float32)
+    np.testing.assert_allclose(lstm_dense_forward(weights, X), _predict(model, X), atol=KERAS_TOLERANCE)
+
+
+def test_stacked_rollout_matches_keras():
+    tf = pytest.importorskip('tensorflow')
+    models = [_keras_lstm_dense(tf.keras, 5, 3, 6, 'sigmoid', seed=seed) for seed in range(3)]
+    X = np.random.default_rng(1).random((3, 5, 3), dtype=np.float32)
+    steps = 4
+
+    expected = []
+    for model, sequence in zip(models, X):
+        window, predictions = sequence[None], []
+        for _ in range(steps):
+            prediction = _predict(model, window)
+            predictions.append(prediction[0])
+            window = np.concatenate([window[:, 1:], prediction[:, None]], axis=1)
+        expected.append(predictions)
+
+    stacked = stack_weights([lstm_engine.extract_lstm_dense(model) for model in models])
+    np.testing.assert_allclose(stacked_rollout(stacked, X, steps), np.array(expected), atol=KERAS_TOLERANCE)
+
+
+def test_dense_stack_forward_matches_keras():
+    tf = pytest.importorskip('tensorflow')
+    keras = tf.keras
+    keras.utils.set_random_seed(0)
+    model = keras.Sequential([
+        keras.Input(shape=(7,)),
+        keras.layers.Dense(16, activation='relu'),
+        keras.layers.Dropout(0.3),
+        keras.layers.Dense(8, activation='tanh'),
+        keras.layers.Dense(4, activation='softmax'),
+    ])
+    weights = lstm_engine.extract_dense_stack(model)
+    assert weights['keras_version'] == keras.__version__ # From the model's own package
+    X = np.random.default_rng(2).random((32, 7), dtype=np.float32)
+    np.testing.assert_allclose(dense_stack_forward(weights, X), _predict(model, X), atol=KERAS_TOLERANCE)
@@ -0,0 +1,59 @@
+# tests/test_measurement_store.py
+# Backfilled (possibly imputed) values in the long-format store.
+import sqlite3
+import pandas as pd
+import pytest
+from models import measurement_store
+from models.measurement_store import append_samples, ensure_measurement_store, read_parameter_series
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """water_records as clean_and_fill leaves it: the 10:00 Dissolved Oxygen was filled in."""
+    path = str(tmp_path / "water_quality.db")
+    con = sqlite3.connect(path)
+    con.execute('CREATE TABLE water_records ("stationId" TEXT, "timestampDate" TIMESTAMP, "pH" REAL, "Dissolved Oxygen" REAL)')
+    con.execute("INSERT INTO water_records VALUES ('101', '2025-11-01T10:00:00', 7.1, 6.0)")
+    con.commit()
+    con.close()
+    return path
+
+
+def _flags(con):
+    return con.execute(
+        'SELECT p."name", m."value", m."backfilled" FROM "measurements" m '
+        'JOIN "parameters" p ON p."parameter_key" = m."parameter_key" ORDER BY p."name"'
+    ).fetchall()
+
+
+def test_backfilled_values_are_flagged_until_measured(db_path):
+    con = sqlite3.connect(db_path)
+    ensure_measurement_store(con)
+    assert _flags(con) == [("Dissolved Oxygen", 6.0, 1), ("pH", 7.1, 1)]
+
+    # The feed confirms the pH reading: same value, but now known to be measured
+    written = append_samples(con, pd.DataFrame({
+        "stationId": ["101"], "parameter": ["pH"],
+        "timestampDate": pd.to_datetime(["2025-11-01 10:00"]), "value": [7.1],
+    }))
+    con.commit()
+    con.close()
+    assert written == 1
+
+    measured = read_parameter_series("Dissolved Oxygen", db_path=db_path, include_backfilled=False)
+    assert measured.empty
+    assert read_parameter_series("Dissolved Oxygen", db_path=db_path)["value"].tolist() == [6.0]
+    assert read_parameter_series("pH", db_path=db_path, include_backfilled=False)["value"].tolist() == [7.1]
+
+
+def test_store_without_the_flag_is_migrated(db_path):
+    con = sqlite3.connect(db_path)
+    con.execute(f'CREATE TABLE "{measurement_store.MEASUREMENTS_TABLE}" ("station_key" INTEGER NOT NULL, '
+                '"parameter_key" INTEGER NOT NULL, "ts" INTEGER NOT NULL, "value" REAL NOT NULL, '
+                'PRIMARY KEY ("station_key", "parameter_key", "ts")) WITHOUT ROWID')
+    con.execute('CREATE TABLE "parameters" ("parameter_key" INTEGER PRIMARY KEY, "name" TEXT NOT NULL UNIQUE)')
+    con.execute("INSERT INTO parameters VALUES (1, 'pH')")
+    con.execute("INSERT INTO measurements VALUES (1, 1, 1761991200, 7.1)")
+    ensure_measurement_store(con)
+    assert _flags(con) == [("pH", 7.1, 1)]
+    con.close()
@@ -0,0 +1,93 @@
+# tests/test_preprocess.py
+# Running NaN-fill statistics (parameter_stats) kept in step with water_records.
+import sqlite3
+import pandas as pd
+import pytest
+
+preprocess = pytest.importorskip("models.preprocess") # Needs scikit-learn
+
+PARAMS = ["pH", "Dissolved Oxygen"]
+
+
+@pytest.fixture
+def con():
+    con = sqlite3.connect(":memory:")
+    con.execute('CREATE TABLE water_records ("stationId" TEXT, "timestamp" TEXT, "timestampDate" TIMESTAMP, '
+                '"pH" REAL, "Dissolved Oxygen" REAL, PRIMARY KEY ("stationId", "timestampDate"))')
+    con.executemany("INSERT INTO water_records VALUES (?, ?, ?, ?, ?)", [
+        ("101", "2025-11-01 10:00:00", "2025-11-01T10:00:00", 7.1, 6.0),
+        ("101", "2025-11-01 11:00:00", "2025-11-01T11:00:00", 7.3, None),
+        ("202", "2025-11-01 10:00:00", "2025-11-01T10:00:00", 6.5, 5.5),
+    ])
+    con.commit()
+    yield con
+    con.close()
+
+
+def _stats(con):
+    rows = con.execute('SELECT "stationId", "parameter", "total", "count" FROM parameter_stats').fetchall()
+    return {(sid, param): (pytest.approx(total), count) for sid, param, total, count in rows if count}
+
+
+def _full_rescan(con):
+    """What the statistics must equal: sums and counts over the whole table."""
+    stats = {}
+    for param in PARAMS:
+        for sid, total, count in con.execute(
+            f'SELECT CAST("stationId" AS TEXT), TOTAL("{param}"), COUNT("{param}") FROM water_records GROUP BY "stationId"'
+        ):
+            if count:
+                stats[(sid, param)] = (pytest.approx(total), count)
+    return stats
+
+
+def _write(con, batch):
+    """The pipeline's order: update the statistics, then INSERT OR REPLACE, in one transaction."""
+    preprocess.update_parameter_stats(con, batch, PARAMS)
+    quoted_cols = ', '.join(f'"{col}"' for col in batch.columns)
+    placeholders = ', '.join(['?'] * len(batch.columns))
+    con.executemany(
+        f'INSERT OR REPLACE INTO water_records ({quoted_cols}) VALUES ({placeholders})',
+        [tuple(None if pd.isna(v) else v for v in row) for row in batch.itertuples(index=False)]
+    )
+    con.commit()
+
+
+def test_seed_is_one_time_and_matches_a_full_scan(con):
+    preprocess.ensure_parameter_stats(con)
+    con.commit()
+    assert _stats(con) == _full_rescan(con)
+    assert _stats(con)[("101", "Dissolved Oxygen")] == (pytest.approx(6.0), 1) # NULLs are not counted
+
+    con.execute("INSERT INTO water_records VALUES ('202', '', '2025-11-01T11:00:00', 7.0, 5.0)")
+    preprocess.ensure_parameter_stats(con) # Already seeded: not rebuilt from the table
+    assert _stats(con)[("202", "pH")] == (pytest.approx(6.5), 1)
+
+
+def test_replacing_a_row_matches_a_full_rescan(con):
+    preprocess.ensure_parameter_stats(con)
+    batch = pd.DataFrame({
+        "stationId": ["101", "303"],
+        "timestamp": ["2025-11-01 11:00:00", "2025-11-01 11:00:00"],
+        "timestampDate": ["2025-11-01T11:00:00", "2025-11-01T11:00:00"],
+        "pH": [7.9, 8.0], # 101 at 11:00 already exists: its old 7.3 must leave the total
+        "Dissolved Oxygen": [6.4, None],
+    })
+    _write(con, batch)
+    assert con.execute("SELECT COUNT(*) FROM water_records").fetchone()[0] == 4
+    assert _stats(con) == _full_rescan(con)
+    assert _stats(con)[("101", "pH")] == (pytest.approx(7.1 + 7.9), 2)
+
+
+def test_table_without_a_row_key_appends(con):
+    con.execute("DROP TABLE water_records")
+    con.execute('CREATE TABLE water_records ("stationId" TEXT, "timestamp" TEXT, "timestampDate" TIMESTAMP, '
+                '"pH" REAL, "Dissolved Oxygen" REAL)') # As pandas to_sql creates it
+    con.execute("INSERT INTO water_records VALUES ('101', '', '2025-11-01T11:00:00', 7.3, 6.0)")
+    assert not preprocess.has_row_key(con)
+    preprocess.ensure_parameter_stats(con)
+    batch = pd.DataFrame({"stationId": ["101"], "timestamp": [""], "timestampDate": ["2025-11-01T11:00:00"],
+                          "pH": [7.9], "Dissolved Oxygen": [6.2]})
+    _write(con, batch) # The same key is appended, not replaced, so both rows count
+    assert _stats(con) == _full_rescan(con)
+    assert _stats(con)[("101", "pH")] == (pytest.approx(7.3 + 7.9), 2)
@@ -60,7 +60,7 @@ from datetime import datetime
 # If it doesn't exist or do that, we'll need to add that logic here.
 # For now, let's assume it exists and works on a DataFrame.
 try:
-    from models.preprocess import clean_and_fill
+    from models.preprocess import clean_and_fill, update_parameter_stats
     PREPROCESS_AVAILABLE = True
 except ImportError:
     print("Warning: 'models.preprocess.clean_and_fill' not found. Basic cleaning will be applied.")
@@ -92,6 +92,8 @@ except ImportError:
         return df
 
 
+from models.measurement_store import store_measurements, append_samples, refresh_station_latest
+
 # --- Configuration ---
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 BACKEND_DIR = SCRIPT_DIR
@@ -103,31 +105,65 @@ TABLE_NAME = "water_records"
 # --- Use the JSON file generated by the scraper ---
 SCRAPED_DATA_JSON = os.path.join(BACKEND_DIR, "static/scraped_data/latest_cpcb_data.json")
 
-def preprocess_and_store_data():
-    """
-    Reads the latest scraped JSON data, processes it using clean_and_fill,
-    and stores it in the SQLite DB.
-    """
-    print(f"[{datetime.now()}] --- Starting Database Update Pipeline ---")
-
-    # --- 1. Read Scraped JSON Data ---
+def read_scraped_json():
+    """Reads the scraper's JSON snapshot into a DataFrame (None if it cannot be read)."""
     print(f"Reading scraped data from: {SCRAPED_DATA_JSON}")
     if not os.path.exists(SCRAPED_DATA_JSON):
         print(f"🔴 ERROR: Scraped data file not found at {SCRAPED_DATA_JSON}. Cannot update database.")
-        return
+        return None
 
     try:
         # Read directly into pandas DataFrame
         df = pd.read_json(SCRAPED_DATA_JSON, orient='records')
-        if df.empty:
-            print("🟡 Scraped data file is empty. No data to update.")
-            return
         print(f"Loaded {len(df)} records from JSON.")
+        return df
     except ValueError as e: # Catch JSON parsing errors specifically
         print(f"🔴 ERROR: Failed to parse JSON file '{SCRAPED_DATA_JSON}': {e}")
-        return
+        return None
     except Exception as e:
         print(f"🔴 ERROR: Failed to read JSON file: {e}")
+        return None
+
+def store_samples(samples_df):
+    """
+    Appends full-resolution samples from the scraper (stationId, parameter,
+    timestampDate, value) to the long-format store, deduplicated on
+    (station, parameter, timestamp). Returns the number of samples inserted
+    or changed, or None if they could not be stored.
+    """
+    print(f"Appending {len(samples_df)} samples to the long-format store...")
+    try:
+        with sqlite3.connect(DB_PATH) as con:
+            sample_count = append_samples(con, samples_df)
+            con.commit()
+        print(f"✅ Success: {sample_count} new/changed samples stored ({len(samples_df) - sample_count} already present).")
+        return sample_count
+    except Exception as e:
+        print(f"🔴 ERROR: Failed to store samples: {e}")
+        return None
+
+def preprocess_and_store_data(snapshot_df=None, store_long=True):
+    """
+    Reads the latest scraped JSON data, processes it using clean_and_fill,
+    and stores it in the SQLite DB.
+    snapshot_df: the scraper's typed snapshot (stationId, timestamp as datetime,
+    one float column per parameter), stored directly instead of reading the JSON.
+    store_long: also write the cleaned rows to the long-format store (off when
+    the raw samples were already stored with store_samples).
+    Returns the number of records stored (0/None if nothing was stored).
+    """
+    print(f"[{datetime.now()}] --- Starting Database Update Pipeline ---")
+
+    # --- 1. Read Scraped JSON Data (unless handed over in-process by the scraper) ---
+    if snapshot_df is not None:
+        df = snapshot_df
+        print(f"Received {len(df)} records from the scraper.")
+    else:
+        df = read_scraped_json()
+        if df is None:
+            return
+    if df.empty:
+        print("🟡 Scraped data is empty. No data to update.")
         return
 
     # --- 2. Clean Data ---
@@ -186,6 +222,7 @@ def preprocess_and_store_data():
             create_table_sql = f"""
             CREATE TABLE IF NOT EXISTS "{TABLE_NAME}" (
                 "stationId" TEXT,
+                "timestamp" TEXT,
                 "timestampDate" TIMESTAMP,
                 {cols_sql},
                 PRIMARY KEY ("stationId", "timestampDate")
@@ -193,6 +230,25 @@ def preprocess_and_store_data():
             """
             cur.execute(create_table_sql)
 
+            # Every parameter goes to the long-format store, which needs no schema change
+            # for new ones; the wide table only takes the columns it already has.
+            if store_long:
+                # The values as scraped (before clean_and_fill's NaN filling), like full-resolution samples
+                raw_values = df.assign(timestampDate=pd.to_datetime(df['timestamp'], errors='coerce'))
+                raw_cols = [col for col in param_cols if col in raw_values.columns]
+                measurement_count = store_measurements(con, raw_values, raw_cols)
+                print(f"Stored {measurement_count} measurements in the long-format store.")
+            wide_cols = {row[1] for row in cur.execute(f'PRAGMA table_info("{TABLE_NAME}")').fetchall()}
+            new_params = [col for col in param_cols if col not in wide_cols]
+            if new_params:
+                print(f"🟡 Parameters not in '{TABLE_NAME}' (kept in the long-format store only): {', '.join(new_params)}")
+            # Also drops "timestamp" for tables created before it was part of the schema
+            df_to_store = df_to_store[[col for col in df_to_store.columns if col in wide_cols]]
+
+            # Keep the running NaN-fill statistics in the same transaction as the insert
+            if PREPROCESS_AVAILABLE:
+                update_parameter_stats(con, df_to_store, param_cols)
+
             # Insert or Replace using loop for better control and error handling
             print(f"Inserting/updating {len(df_to_store)} records into '{TABLE_NAME}'...")
             cols_placeholders = ', '.join(['?'] * len(df_to_store.columns))
@@ -203,6 +259,8 @@ def preprocess_and_store_data():
             data_tuples = [tuple(x) for x in df_to_store.to_numpy()]
 
             cur.executemany(sql, data_tuples)
+            # Keep the per-station latest-reading table in step with the new rows
+            refresh_station_latest(con, df_to_store['stationId'])
             con.commit() # Commit changes
             inserted_count = cur.rowcount if cur.rowcount >= 0 else len(df_to_store) # executemany might return -1
 
@@ -214,6 +272,7 @@ def preprocess_and_store_data():
         print(f"🔴 ERROR: Failed to store data in database: {e}")
 
     print("--- Database Update Pipeline Finished ---")
+    return inserted_count
 
 # Allow running this script directly
 if __name__ == "__main__":
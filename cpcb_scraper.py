@@ -85,6 +85,16 @@ import warnings
 from datetime import datetime
 import json # <-- Add json import
 import os   # <-- Add os import
+import sys
+import re
+import time
+import codecs
+import gzip
+import threading
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # Suppress InsecureRequestWarning
 warnings.simplefilter("ignore", category=requests.packages.urllib3.exceptions.InsecureRequestWarning)
@@ -96,19 +106,191 @@ OUTPUT_DIR = "backend/static/scraped_data"
 OUTPUT_JSON_FILE = os.path.join(OUTPUT_DIR, "latest_cpcb_data.json")
 # Optional: Path to location data for merging names/states
 LOCATIONS_CSV_PATH = "backend/data/cpcb_station_locations.csv"
+# ETag / Last-Modified of the last fetch that was saved, per URL. Sent back on the next
+# run so an unchanged feed answers 304 and the rest of the run is skipped.
+FETCH_STATE_FILE = os.path.join(OUTPUT_DIR, "latest_cpcb_fetch_state.json")
+CONDITIONAL_FETCH = os.environ.get("SCRAPER_CONDITIONAL_FETCH", "1") == "1"
+# Processed frame of each layer as of its last 200, reused when only some layers answer 304.
+# Kept between workflow runs in an Actions cache (not committed); a missing entry
+# only means that layer is refetched in full.
+LAYER_CACHE_DIR = os.path.join(OUTPUT_DIR, "layer_cache")
+# Direct ingest: hand the typed snapshot to backend/update_pipeline.py in this process
+# instead of having it re-read (and re-parse) the JSON file. The JSON is still written
+# for the frontend unless SCRAPER_WRITE_JSON=0.
+DIRECT_INGEST = os.environ.get("SCRAPER_DIRECT_INGEST", "0") == "1"
+WRITE_JSON = os.environ.get("SCRAPER_WRITE_JSON", "1") == "1"
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend")
+# Full-resolution ingest: store every distinct (station, parameter, timestamp) reading
+# in the feed in the long-format store (in-process, like direct ingest) instead of only
+# the latest value per station/parameter stamped with the station's newest timestamp.
+# water_records and the JSON snapshot for the frontend get the usual snapshot. The
+# workflow then skips its JSON ingest (see .github/workflows/scraper.yml).
+FULL_RESOLUTION = os.environ.get("SCRAPER_FULL_RESOLUTION", "0") == "1"
+
+# --- Layer catalog ---
+# CPCB data layers scraped in one run (name -> layer number on the server). All
+# layers go through the same processing and pivot. Extra parameter groups or
+# historical windows can be added here or with SCRAPER_LAYERS="name=number,...".
+CPCB_LAYER_URL = "https://rtwqmsdb1.cpcb.gov.in/data/internet/layers/{layer}/index.json"
+LAYER_CATALOG = {
+    "water_quality": 10,
+}
+LAYER_FETCH_WORKERS = int(os.environ.get("SCRAPER_LAYER_WORKERS", 4))  # Layers fetched at once
+FETCH_PER_HOST_LIMIT = int(os.environ.get("SCRAPER_PER_HOST_LIMIT", 2)) # ...of which at most this many per host
+
+# --- Fetch settings ---
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.36'
+}
+FETCH_TIMEOUT = (10, 60) # (connect, read) seconds
+FETCH_RETRIES = int(os.environ.get("SCRAPER_RETRIES", 4))
+FETCH_BACKOFF = float(os.environ.get("SCRAPER_BACKOFF", 2.0)) # Waits 2s, 4s, 8s... between retries
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+NOT_MODIFIED = object() # Returned by fetch_data when the server answers 304
+# Streaming mode: parse the feed while it downloads and process it in chunks of
+# STREAM_CHUNK_RECORDS entries, instead of response.json() on the whole payload
+STREAMING_FETCH = os.environ.get("SCRAPER_STREAMING", "0") == "1"
+STREAM_CHUNK_RECORDS = int(os.environ.get("SCRAPER_STREAM_CHUNK_RECORDS", 20000))
+STREAM_READ_BYTES = 64 * 1024
+
+_session = None
+
+
+def get_session():
+    """Shared pooled session; retries connection errors and 429/5xx with exponential backoff."""
+    global _session
+    if _session is None:
+        retry = Retry(
+            total=FETCH_RETRIES,
+            backoff_factor=FETCH_BACKOFF,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(["GET"]),
+            respect_retry_after_header=True,
+            raise_on_status=False, # Hand the last response to raise_for_status below
+        )
+        adapter = HTTPAdapter(max_retries=retry, pool_connections=4, pool_maxsize=8)
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update(HEADERS)
+        session.verify = False # SSL verification disabled, as before
+        _session = session
+    return _session
+
+
+def load_fetch_state():
+    """{url: {"etag", "last_modified"}} saved by the last successful run ({} if none)."""
+    try:
+        with open(FETCH_STATE_FILE, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        print(f"⚠️ Warning: Could not read fetch state ({e}); fetching unconditionally.")
+        return {}
+
+
+def save_fetch_state(fetch_state):
+    try:
+        os.makedirs(OUTPUT_DIR, exist_ok=True)
+        with open(FETCH_STATE_FILE, 'w') as f:
+            json.dump(fetch_state, f, indent=2, sort_keys=True)
+    except Exception as e:
+        print(f"⚠️ Warning: Could not write fetch state: {e}")
+
+
+def _layer_cache_path(name):
+    return os.path.join(LAYER_CACHE_DIR, f"{name}.json.gz")
+
+
+def save_layer_frames(frames, layers):
+    """
+    Keeps each freshly fetched layer's processed frame (and its URL) for runs
+    where it answers 304, as gzipped JSON rows (values keep their JSON types).
+    """
+    for name, frame in frames.items():
+        try:
+            os.makedirs(LAYER_CACHE_DIR, exist_ok=True)
+            rows = frame.assign(timestampDate=frame['timestampDate'].dt.strftime('%Y-%m-%dT%H:%M:%S'))
+            with gzip.open(_layer_cache_path(name), 'wt', encoding='utf-8') as f:
+                json.dump({"url": layers[name], "columns": list(rows.columns), "rows": rows.to_numpy().tolist()}, f)
+        except Exception as e:
+            print(f"⚠️ Warning: Could not cache layer '{name}': {e}")
+
+
+def load_layer_frame(name, url):
+    """The frame save_layer_frames kept for this layer and URL, or None."""
+    try:
+        with gzip.open(_layer_cache_path(name), 'rt', encoding='utf-8') as f:
+            cached = json.load(f)
+        if cached.get("url") != url:
+            return None
+        frame = pd.DataFrame(cached["rows"], columns=cached["columns"])
+        frame['timestampDate'] = pd.to_datetime(frame['timestampDate'], format='%Y-%m-%dT%H:%M:%S')
+        frame['value'] = frame['value'].astype(float)
+        return frame
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"⚠️ Warning: Could not read cached layer '{name}': {e}")
+        return None
+
+
+def _set_step_output(name, value):
+    """Exposes a value to later workflow steps when running in GitHub Actions."""
+    output_path = os.environ.get("GITHUB_OUTPUT")
+    if output_path:
+        with open(output_path, 'a') as f:
+            f.write(f"{name}={value}\n")
+
+
+def _write_layer_summary(layer_report):
+    """Per-layer status, rows and fetch latency as a table in the GitHub Actions run summary."""
+    summary_path = os.environ.get("GITHUB_STEP_SUMMARY")
+    if not summary_path:
+        return
+    lines = ["| Layer | Status | Rows | Seconds |", "| --- | --- | ---: | ---: |"]
+    lines += [f"| {name} | {entry['status']} | {entry['rows']} | {entry['seconds']:.2f} |"
+              for name, entry in layer_report.items()]
+    with open(summary_path, 'a') as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def _conditional_headers(url, fetch_state):
+    headers = {}
+    validators = (fetch_state or {}).get(url, {})
+    if validators.get("etag"):
+        headers['If-None-Match'] = validators["etag"]
+    if validators.get("last_modified"):
+        headers['If-Modified-Since'] = validators["last_modified"]
+    return headers
+
+
+def _remember_validators(url, response, fetch_state):
+    if fetch_state is not None:
+        fetch_state[url] = {
+            "etag": response.headers.get('ETag'),
+            "last_modified": response.headers.get('Last-Modified'),
+        }
 
 
 # Function to fetch data (SSL verification disabled)
-def fetch_data(url: str):
-    """Fetches JSON data from the specified URL, disabling SSL verification."""
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.36'
-    }
+def fetch_data(url: str, fetch_state=None):
+    """
+    Fetches JSON data from the specified URL, disabling SSL verification.
+    With fetch_state (see load_fetch_state) the request is conditional: returns
+    NOT_MODIFIED on 304, and on 200 stores the new validators in fetch_state.
+    """
     try:
-        response = requests.get(url, headers=headers, verify=False, timeout=60) # Increased timeout
+        response = get_session().get(url, headers=_conditional_headers(url, fetch_state), timeout=FETCH_TIMEOUT)
+        if response.status_code == 304:
+            print(f"⏭️ Data at {url} not modified since the last run.")
+            return NOT_MODIFIED
         response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
         print(f"Successfully fetched data from {url}")
-        return response.json()
+        data = response.json()
+        _remember_validators(url, response, fetch_state)
+        return data
     except requests.exceptions.Timeout:
         print(f"🔴 ERROR: Request timed out fetching data from {url}.")
         return []
@@ -116,81 +298,305 @@ def fetch_data(url: str):
         print(f"🔴 ERROR: Request failed: {e}")
         return []
 
+# Mapping for parameter names (from CPCB long name to desired column name)
+PARAMETER_MAPPING = {
+    "River Stage": "Water Level",
+    "Oxygen, dissolved": "Dissolved Oxygen",
+    "Temperature, water": "Water Temperature",
+    "pH": "pH",
+    "Turbidity": "Water Turbidity",
+    "Ammonia": "Ammonia",
+    "Nitrate": "Nitrate",
+    "Conductivity": "Conductivity",
+    "Biochemical Oxygen Demand (BOD)": "BOD",
+    "Chemical Oxygen Demand (COD)": "COD",
+    "Chloride": "Chloride", # Added based on Analysis.tsx logs
+    "Total Organic Carbon": "Total Organic Carbon", # Added based on Analysis.tsx logs
+    "Depth": "Depth" # Added based on Analysis.tsx logs
+    # Add more mappings as discovered in CPCB data
+}
+# Mapping for specific units if needed (otherwise uses scraped unit)
+UNIT_MAPPING = {
+    "River Stage": "m",
+    "Temperature, water": "°C",
+    "pH": "Unitless", # Example
+    # Add others if necessary
+}
+# Raw feed fields read by process_data
+RAW_FIELDS = ["station_id", "timestamp", "ts_value", "stationparameter_longname", "ts_unitsymbol"]
+
+
+def _map_categories(values, mapping):
+    """Applies mapping (falling back to the value itself) once per distinct value, not once per row."""
+    categorical = pd.Categorical(values)
+    mapped = np.array([mapping.get(c, c) for c in categorical.categories], dtype=object)
+    result = np.full(len(categorical), "", dtype=object) # Missing (code -1) -> ""
+    present = categorical.codes >= 0
+    result[present] = mapped[categorical.codes[present]]
+    return result
+
+
 # Function to process raw data entries
 def process_data(data):
-    """Processes raw data entries, standardizes parameter names, and parses timestamps/values."""
-    # Mapping for parameter names (from CPCB long name to desired column name)
-    parameter_mapping = {
-        "River Stage": "Water Level",
-        "Oxygen, dissolved": "Dissolved Oxygen",
-        "Temperature, water": "Water Temperature",
-        "pH": "pH",
-        "Turbidity": "Water Turbidity",
-        "Ammonia": "Ammonia",
-        "Nitrate": "Nitrate",
-        "Conductivity": "Conductivity",
-        "Biochemical Oxygen Demand (BOD)": "BOD",
-        "Chemical Oxygen Demand (COD)": "COD",
-        "Chloride": "Chloride", # Added based on Analysis.tsx logs
-        "Total Organic Carbon": "Total Organic Carbon", # Added based on Analysis.tsx logs
-        "Depth": "Depth" # Added based on Analysis.tsx logs
-        # Add more mappings as discovered in CPCB data
-    }
-    # Mapping for specific units if needed (otherwise uses scraped unit)
-    unit_mapping = {
-        "River Stage": "m",
-        "Temperature, water": "°C",
-        "pH": "Unitless", # Example
-        # Add others if necessary
-    }
-    processed_data = []
+    """
+    Processes raw data entries, standardizes parameter names, and parses timestamps/values.
+    Works column-wise on the whole feed; returns a DataFrame with stationId,
+    timestampDate, value, unit and parameterName, dropping entries with a missing
+    or invalid timestamp, value or station id.
+    """
     print(f"Processing {len(data)} raw entries...")
-    for dat in data:
-        timestamp_str = dat.get("timestamp", "")
-        parameter_long_name = dat.get("stationparameter_longname", "")
-        # Standardize parameter name using mapping, fallback to original
-        parameter_name = parameter_mapping.get(parameter_long_name, parameter_long_name)
-        value_str = dat.get("ts_value", "")
-        station_id_str = dat.get("station_id", "")
-
-        # --- Timestamp Parsing ---
-        timestamp_date = None
-        if timestamp_str:
-            try:
-                timestamp_date = datetime.strptime(timestamp_str, "%Y-%m-%dT%H:%M:%S.%fZ") # Try with milliseconds
-            except ValueError:
+    raw_df = pd.DataFrame.from_records(data, columns=RAW_FIELDS) if len(data) else pd.DataFrame(columns=RAW_FIELDS)
+    processed_df = _process_frame(raw_df)
+    print(f"Successfully processed {len(processed_df)} valid entries.")
+    return processed_df
+
+
+def _process_frame(raw_df):
+    """process_data on a frame of RAW_FIELDS columns (one row per raw entry)."""
+    # --- Timestamp Parsing --- ('...T..:..:..Z' with or without milliseconds, in one pass)
+    timestamp_date = pd.to_datetime(raw_df["timestamp"], format="ISO8601", utc=True, errors="coerce").dt.tz_localize(None)
+    # --- Value Parsing --- (non-numeric values are invalid for pivoting)
+    value = pd.to_numeric(raw_df["ts_value"], errors="coerce")
+    # --- Station ID Check ---
+    station_id = raw_df["station_id"]
+    valid = timestamp_date.notna() & value.notna() & station_id.notna() & (station_id.astype(str) != "")
+
+    long_names = raw_df["stationparameter_longname"].fillna("")
+    unit = long_names.map(UNIT_MAPPING).fillna(raw_df["ts_unitsymbol"]).fillna("")
+
+    processed_df = pd.DataFrame({
+        "stationId": station_id, # Kept as scraped
+        "timestampDate": timestamp_date,
+        "value": value.astype(float),
+        "unit": unit,
+        "parameterName": _map_categories(long_names, PARAMETER_MAPPING), # Use standardized name
+    })[valid.to_numpy()].reset_index(drop=True)
+    return processed_df
+
+
+# --- STREAMING FETCH ---
+_JSON_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+def iter_json_array(chunks):
+    """
+    Yields the elements of a top-level JSON array from an iterable of byte
+    chunks as soon as each element is complete, so the whole document is
+    never held in memory. Raises ValueError on malformed or truncated input.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    chunks = iter(chunks)
+    buffer, pos = "", 0
+    state = "start" # start -> open ('[' read) -> value <-> comma -> end
+    while state != "end":
+        chunk = next(chunks, None)
+        eof = chunk is None
+        # Drop what was consumed; only a partial element is carried over
+        buffer = buffer[pos:] + text_decoder.decode(b"" if eof else chunk, final=eof)
+        pos = 0
+        while state != "end":
+            pos = _JSON_WHITESPACE.match(buffer, pos).end()
+            if pos >= len(buffer):
+                break
+            char = buffer[pos]
+            if state == "start":
+                if char != '[':
+                    raise ValueError(f"Expected a JSON array, got {char!r}")
+                state, pos = "open", pos + 1
+            elif char == ']' and state in ("open", "value"):
+                state, pos = "end", pos + 1
+            elif state == "value":
+                if char != ',':
+                    raise ValueError(f"Unexpected {char!r} in JSON array")
+                state, pos = "comma", pos + 1
+            else:
                 try:
-                    timestamp_date = datetime.strptime(timestamp_str, "%Y-%m-%dT%H:%M:%SZ") # Try without milliseconds
-                except ValueError:
-                    # print(f"Skipping invalid timestamp format: {timestamp_str}") # Reduce noise
-                    continue # Skip record if timestamp is invalid
-        else:
-            continue # Skip if timestamp is missing
-
-        # --- Value Parsing ---
-        value = None
-        if value_str is not None: # Check explicitly for None
-            try:
-                value = float(value_str)
-            except (ValueError, TypeError):
-                 # print(f"Skipping invalid value for {parameter_name} at station {station_id_str}: '{value_str}'") # Reduce noise
-                 continue # Skip record if value is invalid (treat non-numeric as invalid for pivoting)
+                    item, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if eof or char in ',]':
+                        raise
+                    break # Element continues in the next chunk
+                if not eof and (end == len(buffer) or buffer[end] not in ' \t\n\r,]'):
+                    break # A bare number may continue in the next chunk (e.g. '12' + '.5')
+                yield item
+                state, pos = "value", end
+        if eof and state != "end":
+            raise ValueError("Truncated JSON array")
+
+
+def process_records_chunked(records, chunk_records=STREAM_CHUNK_RECORDS):
+    """
+    process_data over an iterable of raw entries, chunk_records at a time:
+    entries are copied field by field into preallocated column buffers, and
+    each full buffer is processed into the (much smaller) typed frame.
+    """
+    buffers = {field: np.empty(chunk_records, dtype=object) for field in RAW_FIELDS}
+    processed, filled, total = [], 0, 0
+
+    def flush(count):
+        raw_df = pd.DataFrame({field: buffers[field][:count].copy() for field in RAW_FIELDS})
+        processed.append(_process_frame(raw_df))
+
+    for record in records:
+        if not isinstance(record, dict):
+            continue
+        for field in RAW_FIELDS:
+            buffers[field][filled] = record.get(field)
+        filled += 1
+        total += 1
+        if filled == chunk_records:
+            flush(filled)
+            filled = 0
+    if filled or not processed:
+        flush(filled)
+
+    processed_df = pd.concat(processed, ignore_index=True)
+    print(f"Processed {total} raw entries in {len(processed)} chunk(s); {len(processed_df)} valid entries.")
+    return processed_df
+
+
+def fetch_data_streaming(url: str, fetch_state=None, chunk_records=STREAM_CHUNK_RECORDS):
+    """
+    fetch_data + process_data in one pass: the response is parsed as it
+    downloads (iter_json_array) and processed chunk_records entries at a time.
+    Returns the processed DataFrame, NOT_MODIFIED on 304, or None on failure.
+    """
+    try:
+        with get_session().get(url, headers=_conditional_headers(url, fetch_state),
+                               timeout=FETCH_TIMEOUT, stream=True) as response:
+            if response.status_code == 304:
+                print(f"⏭️ Data at {url} not modified since the last run.")
+                return NOT_MODIFIED
+            response.raise_for_status()
+            print(f"Streaming data from {url}...")
+            records = iter_json_array(response.iter_content(chunk_size=STREAM_READ_BYTES))
+            processed_df = process_records_chunked(records, chunk_records)
+        _remember_validators(url, response, fetch_state)
+        return processed_df
+    except requests.exceptions.Timeout:
+        print(f"🔴 ERROR: Request timed out fetching data from {url}.")
+    except requests.exceptions.RequestException as e:
+        print(f"🔴 ERROR: Request failed: {e}")
+    except ValueError as e:
+        print(f"🔴 ERROR: Invalid JSON from {url}: {e}")
+    return None
+
+# --- MULTI-LAYER FETCH ---
+_host_limits = {}
+_host_limits_lock = threading.Lock()
+
+
+def get_layer_catalog():
+    """{layer name: url} from LAYER_CATALOG plus SCRAPER_LAYERS ("name=number" or "name=url", comma-separated)."""
+    layers = dict(LAYER_CATALOG)
+    for item in os.environ.get("SCRAPER_LAYERS", "").split(','):
+        name, _, layer = item.strip().partition('=')
+        if name and layer:
+            layers[name] = layer
+    return {name: layer if "://" in str(layer) else CPCB_LAYER_URL.format(layer=layer)
+            for name, layer in layers.items()}
+
+
+def _host_limit(url):
+    host = urlsplit(url).netloc
+    with _host_limits_lock:
+        if host not in _host_limits:
+            _host_limits[host] = threading.BoundedSemaphore(FETCH_PER_HOST_LIMIT)
+        return _host_limits[host]
+
+
+def fetch_layer(name, url, fetch_state=None):
+    """
+    Fetches and processes one layer, holding one of its host's slots.
+    Returns (processed DataFrame / NOT_MODIFIED / None, report entry).
+    """
+    with _host_limit(url):
+        start = time.perf_counter()
+        if STREAMING_FETCH:
+            df = fetch_data_streaming(url, fetch_state) # Already processed, chunk by chunk
         else:
-            continue # Skip if value is missing
-
-        # --- Station ID Check ---
-        if not station_id_str:
-            continue # Skip if station ID is missing
-
-        processed_data.append({
-            "stationId": station_id_str, # Keep as string
-            "timestampDate": timestamp_date, # Parsed datetime object
-            "value": value, # Store as float
-            "unit": unit_mapping.get(parameter_long_name, dat.get("ts_unitsymbol", "")),
-            "parameterName": parameter_name # Use standardized name
-        })
-    print(f"Successfully processed {len(processed_data)} valid entries.")
-    return processed_data
+            raw_data = fetch_data(url, fetch_state)
+            df = NOT_MODIFIED if raw_data is NOT_MODIFIED else (process_data(raw_data) if raw_data else None)
+        seconds = time.perf_counter() - start
+
+    if df is NOT_MODIFIED:
+        status = "not_modified"
+    else:
+        status = "failed" if df is None else "ok"
+    entry = {"url": url, "status": status, "seconds": round(seconds, 3),
+             "rows": len(df) if status == "ok" else 0}
+    print(f"{'✅' if status != 'failed' else '🔴'} Layer '{name}': {status}, {entry['rows']} valid entries in {seconds:.2f}s")
+    return df, entry
+
+
+def fetch_layers(layers, fetch_state=None):
+    """
+    Fetches {name: url} layers concurrently (LAYER_FETCH_WORKERS threads, at most
+    FETCH_PER_HOST_LIMIT requests per host). Returns ({name: frame}, {name: report entry}).
+    """
+    with ThreadPoolExecutor(max_workers=max(1, min(LAYER_FETCH_WORKERS, len(layers)))) as pool:
+        futures = {name: pool.submit(fetch_layer, name, url, fetch_state) for name, url in layers.items()}
+        results = {name: future.result() for name, future in futures.items()}
+    return ({name: df for name, (df, _) in results.items()},
+            {name: entry for name, (_, entry) in results.items()})
+
+
+def _import_update_pipeline():
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR) # update_pipeline imports models.* from backend/
+    try:
+        import update_pipeline
+        return update_pipeline
+    except Exception as e:
+        print(f"🔴 ERROR: Could not import the database update pipeline: {e}")
+        return None
+
+
+def ingest_snapshot(snapshot_df):
+    """
+    Stores the snapshot (stationId, timestamp as datetime, float parameter
+    columns) through update_pipeline.preprocess_and_store_data in this process.
+    Returns the number of records stored (0 on failure).
+    """
+    pipeline = _import_update_pipeline()
+    if pipeline is None:
+        return 0
+    return pipeline.preprocess_and_store_data(snapshot_df) or 0
+
+
+def build_full_resolution_samples(df):
+    """
+    From processed entries, returns every distinct (stationId, parameter,
+    timestampDate) reading with its value (the last one wins on repeats).
+    """
+    samples = df.rename(columns={'parameterName': 'parameter'})[['stationId', 'parameter', 'timestampDate', 'value']]
+    return samples.assign(stationId=samples['stationId'].astype(str)).drop_duplicates(
+        subset=['stationId', 'parameter', 'timestampDate'], keep='last')
+
+
+def ingest_samples(df, snapshot_df):
+    """
+    Full-resolution ingest in this process: appends every distinct sample to the
+    long-format store, then stores the usual latest-per-station snapshot through
+    the pipeline (water_records, NaN-fill statistics, station_latest). The
+    per-timestamp readings are not NaN-filled: most hold only a few parameters.
+    Returns the number of new/changed samples, or None on failure.
+    """
+    samples = build_full_resolution_samples(df)
+    print(f"Full-resolution ingest: {len(samples)} samples from {samples['stationId'].nunique()} stations...")
+    pipeline = _import_update_pipeline()
+    if pipeline is None:
+        return None
+    sample_count = pipeline.store_samples(samples)
+    if sample_count is None:
+        return None
+    # The samples already hold these readings, so the snapshot skips the long store
+    if not pipeline.preprocess_and_store_data(snapshot_df, store_long=False):
+        print("🔴 ERROR: Samples were stored, but the snapshot could not be written to the database.")
+        return None
+    return sample_count
+
 
 # Function to load location data from CSV
 def load_location_data(filepath):
@@ -213,23 +619,77 @@ def load_location_data(filepath):
         print(f"🔴 ERROR: Error loading location data from {filepath}: {e}")
         return None
 
+def save_snapshot_json(final_df):
+    """Writes the snapshot to OUTPUT_JSON_FILE for the frontend; returns True on success."""
+    print(f"Preparing to save {len(final_df)} records to {OUTPUT_JSON_FILE}...")
+    final_df = final_df.copy()
+    # Format the timestamp string for JSON output
+    final_df['timestamp'] = final_df['timestamp'].dt.strftime('%Y-%m-%d %H:%M:%S')
+    # Handle potential NaN/NaT values -> convert to None for JSON compatibility
+    final_df = final_df.replace({np.nan: None, pd.NaT: None})
+    output_data = final_df.to_dict(orient='records')
+
+    try:
+        # Create directory if it doesn't exist
+        os.makedirs(OUTPUT_DIR, exist_ok=True)
+        # Write the JSON file, overwriting the previous one
+        with open(OUTPUT_JSON_FILE, 'w') as f:
+            json.dump(output_data, f, indent=2) # Use indent for readability
+        print(f"✅ Data saved successfully to '{OUTPUT_JSON_FILE}'!")
+        return True
+    except Exception as e:
+        print(f"🔴 ERROR: Failed to write JSON file: {e}")
+        return False
+
 def main():
     """Main function to fetch, process, pivot, merge, and save data."""
-    url = "https://rtwqmsdb1.cpcb.gov.in/data/internet/layers/10/index.json"
-    print(f"[{datetime.now()}] --- Starting CPCB Scraper ---")
-    raw_data = fetch_data(url)
-
-    if not raw_data:
+    layers = get_layer_catalog()
+    print(f"[{datetime.now()}] --- Starting CPCB Scraper ({len(layers)} layer(s)) ---")
+    # Only ask for "changed since" when the output from that fetch is still on disk
+    # (with the JSON disabled, the state is only saved once the data is in the database)
+    use_conditional = CONDITIONAL_FETCH and (os.path.exists(OUTPUT_JSON_FILE) or not WRITE_JSON)
+    fetch_state = load_fetch_state() if use_conditional else {}
+    frames, layer_report = fetch_layers(layers, fetch_state)
+
+    unchanged = [name for name, frame in frames.items() if frame is NOT_MODIFIED]
+    if len(unchanged) == len(frames):
+        _write_layer_summary(layer_report)
+        _set_step_output("not_modified", "true")
+        print(f"[{datetime.now()}] --- CPCB Scraper Finished (no new data) ---")
+        return
+    # The snapshot is rebuilt from every layer: unchanged ones reuse the frame kept
+    # from their last 200, and are refetched in full only if there is none
+    uncached = []
+    for name in unchanged:
+        cached = load_layer_frame(name, layers[name])
+        if cached is None:
+            uncached.append(name)
+        else:
+            frames[name] = cached
+            layer_report[name].update(status="cached", rows=len(cached))
+            print(f"⏭️ Layer '{name}': reusing {len(cached)} cached entries")
+    if uncached:
+        print(f"Refetching unchanged layer(s) with no cached frame: {', '.join(uncached)}")
+        refreshed_state = {} # Unconditional request; its validators replace the old ones
+        refetched, refetch_report = fetch_layers({name: layers[name] for name in uncached}, refreshed_state)
+        fetch_state.update(refreshed_state)
+        frames.update(refetched)
+        layer_report.update(refetch_report)
+    fetched_frames = {name: frames[name] for name, entry in layer_report.items() if entry["status"] == "ok"}
+    _write_layer_summary(layer_report)
+
+    frames = [frame for frame in frames.values() if frame is not None and frame is not NOT_MODIFIED]
+    if not frames:
         print("No data fetched. Exiting.")
         return
-
-    mapped_data = process_data(raw_data)
-    if not mapped_data:
+    failed = [name for name, entry in layer_report.items() if entry["status"] not in ("ok", "cached")]
+    if failed:
+        print(f"⚠️ Warning: Continuing without layer(s): {', '.join(failed)}")
+    df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    if df.empty:
         print("No data processed successfully. Exiting.")
         return
 
-    df = pd.DataFrame(mapped_data)
-
     # --- Pivot the data ---
     print("Pivoting data to get latest value per station/parameter...")
     # Drop rows where essential columns might be missing after processing
@@ -260,8 +720,8 @@ def main():
     # --- Add latest overall timestamp per station ---
     print("Adding latest timestamp per station...")
     latest_timestamps = latest_data.groupby('stationId')['timestampDate'].max().reset_index()
-    # Format the timestamp string for JSON output
-    latest_timestamps['timestamp'] = latest_timestamps['timestampDate'].dt.strftime('%Y-%m-%d %H:%M:%S')
+    # Kept as datetime for direct ingest; formatted as a string when saving the JSON
+    latest_timestamps['timestamp'] = latest_timestamps['timestampDate']
 
     # Merge timestamp back into the pivoted data
     pivoted_df = pd.merge(pivoted_df, latest_timestamps[['stationId', 'timestamp']], on='stationId', how='left')
@@ -292,21 +752,21 @@ def main():
          print("Location data skipped.")
 
 
-    # --- Save as JSON ---
-    print(f"Preparing to save {len(final_df)} records to {OUTPUT_JSON_FILE}...")
-    # Handle potential NaN/NaT values -> convert to None for JSON compatibility
-    final_df = final_df.replace({np.nan: None, pd.NaT: None})
-    output_data = final_df.to_dict(orient='records')
+    # --- Store in the database (direct ingest) ---
+    saved = True
+    if FULL_RESOLUTION:
+        saved = ingest_samples(df, final_df) is not None
+    elif DIRECT_INGEST:
+        print(f"Handing {len(final_df)} records to the database update pipeline...")
+        saved = ingest_snapshot(final_df) > 0
 
-    try:
-        # Create directory if it doesn't exist
-        os.makedirs(OUTPUT_DIR, exist_ok=True)
-        # Write the JSON file, overwriting the previous one
-        with open(OUTPUT_JSON_FILE, 'w') as f:
-            json.dump(output_data, f, indent=2) # Use indent for readability
-        print(f"✅ Data saved successfully to '{OUTPUT_JSON_FILE}'!")
-    except Exception as e:
-        print(f"🔴 ERROR: Failed to write JSON file: {e}")
+    # --- Save as JSON ---
+    if WRITE_JSON:
+        saved = save_snapshot_json(final_df) and saved
+    if saved:
+        # Validators (and the frames they describe) are kept only once the data has been saved
+        save_fetch_state(fetch_state)
+        save_layer_frames(fetched_frames, layers)
 
     print(f"[{datetime.now()}] --- CPCB Scraper Finished ---")
 